@@ -0,0 +1,212 @@
+import contextvars
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Optional
+from metrics import metrics
+
+# Admission control for LLM work. Requests are admitted or rejected once, up
+# front: at most LLM_MAX_REQUESTS requests run LLM work at a time, and a
+# request beyond that is rejected with Overloaded, which the API turns into a
+# 503 with Retry-After instead of piling more work onto a rate-limited
+# provider. Each session also gets one turn at a time; an overlapping turn is
+# rejected with SessionBusy (429). Within admitted requests, at most
+# LLM_MAX_CONCURRENCY crew kickoffs run at once in this process and at most
+# SESSION_MAX_LLM_CONCURRENCY per session. At most LLM_MAX_QUEUE further
+# calls wait for a slot; a call that finds the queue full fails at once with
+# Overloaded. A waiting call gives up after LLM_QUEUE_TIMEOUT_S (or less,
+# when its stage's deadline is nearer) with QueueTimeout. Both are
+# rejections: the pipeline doesn't answer them with a fallback, so the API
+# sends a 503 with Retry-After. Hedged and speculative calls can be rejected
+# too; that only reaches the client if the answer was waiting on that call.
+
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "8"))
+LLM_MAX_QUEUE = int(os.getenv("LLM_MAX_QUEUE", "32"))
+LLM_QUEUE_TIMEOUT_S = float(os.getenv("LLM_QUEUE_TIMEOUT_S", "5"))
+# Requests admitted at once. Each mostly runs one LLM call at a time; hedged and
+# speculative calls can add more, which the LLM_MAX_QUEUE cap bounds
+LLM_MAX_REQUESTS = int(os.getenv("LLM_MAX_REQUESTS", str(LLM_MAX_CONCURRENCY + LLM_MAX_QUEUE)))
+SESSION_MAX_CONCURRENT_TURNS = int(os.getenv("SESSION_MAX_CONCURRENT_TURNS", "1"))
+# LLM calls one session can have running at once (speculative and hedged calls included)
+SESSION_MAX_LLM_CONCURRENCY = int(os.getenv("SESSION_MAX_LLM_CONCURRENCY", "4"))
+# Seconds clients are told to wait before retrying a rejected request
+OVERLOAD_RETRY_AFTER_S = int(os.getenv("OVERLOAD_RETRY_AFTER_S", "5"))
+SESSION_BUSY_RETRY_AFTER_S = int(os.getenv("SESSION_BUSY_RETRY_AFTER_S", "1"))
+
+llm_queue_depth = metrics.gauge(
+    'dealerbot_llm_queue_depth', 'LLM calls waiting for a concurrency slot')
+llm_in_flight = metrics.gauge(
+    'dealerbot_llm_in_flight', 'LLM calls currently running')
+requests_admitted = metrics.gauge(
+    'dealerbot_admitted_requests', 'Requests currently admitted to run LLM work')
+llm_queue_wait = metrics.histogram(
+    'dealerbot_llm_queue_wait_ms', 'Time LLM calls waited for a concurrency slot in milliseconds')
+admission_rejections = metrics.counter(
+    'dealerbot_admission_rejections_total', 'Work rejected by admission control', ('reason',))
+llm_queue_timeouts = metrics.counter(
+    'dealerbot_llm_queue_timeouts_total', 'LLM calls that gave up waiting for a concurrency slot', ('limit',))
+
+# Session whose request is running, so LLM calls can be limited per session
+_current_session: contextvars.ContextVar[Optional[str]] = contextvars.ContextVar(
+    'dealerbot_admitted_session', default=None)
+
+class Rejected(Exception):
+    """Work turned away by admission control; carries the HTTP status and Retry-After."""
+    status_code = 503
+
+    def __init__(self, message: str, retry_after: int):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+class Overloaded(Rejected):
+    """Too much LLM work queued in this process."""
+
+class SessionBusy(Rejected):
+    status_code = 429
+
+class QueueTimeout(Rejected):
+    """An admitted request's LLM call waited too long for a concurrency slot."""
+
+class RequestAdmission:
+    """Admits or rejects whole requests, so admitted ones don't fail with 503 halfway through."""
+
+    def __init__(self, limit: int = LLM_MAX_REQUESTS):
+        self.limit = limit
+        self._active = 0
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def admit(self, session_id: Optional[str] = None):
+        with self._lock:
+            if self._active >= self.limit:
+                admission_rejections.inc(reason='request_limit')
+                raise Overloaded("The assistant is busy right now, please try again shortly", OVERLOAD_RETRY_AFTER_S)
+            self._active += 1
+            requests_admitted.set(self._active)
+        token = _current_session.set(session_id)
+        try:
+            yield
+        finally:
+            _current_session.reset(token)
+            with self._lock:
+                self._active -= 1
+                requests_admitted.set(self._active)
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {'admitted': self._active, 'limit': self.limit}
+
+class ConcurrencyLimiter:
+    """Counting semaphore, global and per session, with a bounded, time-limited wait queue."""
+
+    def __init__(self, limit: int = LLM_MAX_CONCURRENCY, session_limit: int = SESSION_MAX_LLM_CONCURRENCY,
+                 timeout_s: float = LLM_QUEUE_TIMEOUT_S, max_queue: int = LLM_MAX_QUEUE):
+        self.limit = limit
+        self.session_limit = session_limit
+        self.max_queue = max_queue
+        self.timeout_s = timeout_s
+        self._active = 0
+        self._waiting = 0
+        self._sessions: Dict[str, int] = {}
+        self._condition = threading.Condition()
+
+    def _full(self, session_id: Optional[str]) -> Optional[str]:
+        """Which limit a new call would exceed, if any."""
+        if session_id and self._sessions.get(session_id, 0) >= self.session_limit:
+            return 'session'
+        if self._active >= self.limit:
+            return 'global'
+        return None
+
+    @contextmanager
+    def slot(self, timeout_s: Optional[float] = None):
+        """Hold a slot for one LLM call; waits at most `timeout_s` (capped at LLM_QUEUE_TIMEOUT_S).
+
+        Raises Overloaded when max_queue calls are already waiting, QueueTimeout when the wait runs out.
+        """
+        start = time.perf_counter()
+        session_id = _current_session.get()
+        with self._condition:
+            if self._full(session_id):
+                if self._waiting >= self.max_queue:
+                    admission_rejections.inc(reason='queue_full')
+                    raise Overloaded("The assistant is busy right now, please try again shortly",
+                                     OVERLOAD_RETRY_AFTER_S)
+                self._waiting += 1
+                llm_queue_depth.set(self._waiting)
+                deadline = start + min(self.timeout_s, timeout_s if timeout_s is not None else self.timeout_s)
+                try:
+                    while True:
+                        limit = self._full(session_id)
+                        if limit is None:
+                            break
+                        remaining = deadline - time.perf_counter()
+                        if remaining <= 0:
+                            llm_queue_wait.observe((time.perf_counter() - start) * 1000)
+                            llm_queue_timeouts.inc(limit=limit)
+                            raise QueueTimeout(f"No {limit} LLM slot freed up in {time.perf_counter() - start:.1f}s",
+                                               OVERLOAD_RETRY_AFTER_S)
+                        self._condition.wait(remaining)
+                finally:
+                    self._waiting -= 1
+                    llm_queue_depth.set(self._waiting)
+            self._active += 1
+            if session_id:
+                self._sessions[session_id] = self._sessions.get(session_id, 0) + 1
+            llm_in_flight.set(self._active)
+        llm_queue_wait.observe((time.perf_counter() - start) * 1000)
+        try:
+            yield
+        finally:
+            with self._condition:
+                self._active -= 1
+                if session_id:
+                    remaining_calls = self._sessions.pop(session_id) - 1
+                    if remaining_calls:
+                        self._sessions[session_id] = remaining_calls
+                llm_in_flight.set(self._active)
+                # Waiters may be held by different limits, so wake them all to recheck
+                self._condition.notify_all()
+
+    def has_capacity(self) -> bool:
+        """Whether a call started now would run without queueing."""
+        with self._condition:
+            return self._active < self.limit and not self._waiting
+
+    def stats(self) -> Dict[str, int]:
+        with self._condition:
+            return {'in_flight': self._active, 'queued': self._waiting, 'limit': self.limit,
+                    'max_queue': self.max_queue, 'session_limit': self.session_limit,
+                    'sessions': len(self._sessions)}
+
+class SessionTurns:
+    """Turns in progress per session; a session can't start more than `limit` at once."""
+
+    def __init__(self, limit: int = SESSION_MAX_CONCURRENT_TURNS):
+        self.limit = limit
+        self._active: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def turn(self, session_id: Optional[str]):
+        if not session_id:
+            yield
+            return
+        with self._lock:
+            if self._active.get(session_id, 0) >= self.limit:
+                admission_rejections.inc(reason='session_busy')
+                raise SessionBusy("Still working on your previous message", SESSION_BUSY_RETRY_AFTER_S)
+            self._active[session_id] = self._active.get(session_id, 0) + 1
+        try:
+            yield
+        finally:
+            with self._lock:
+                remaining = self._active.pop(session_id) - 1
+                if remaining:
+                    self._active[session_id] = remaining
+
+# Global limiters
+request_admission = RequestAdmission()
+llm_limiter = ConcurrencyLimiter()
+session_turns = SessionTurns()
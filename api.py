@@ -1,24 +1,43 @@
-from fastapi import FastAPI, HTTPException, Request, status
+from fastapi import FastAPI, HTTPException, Request, Response, status
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import JSONResponse
+from fastapi.concurrency import run_in_threadpool
 import json
 import os
+import time
 from pathlib import Path
 from dotenv import load_dotenv
 from dealerbot import query_dealerbot_agent, compare_vehicles
 from submit_form import submit_inquiry
-from database import store_chat, fetch_all_chats
+from database import store_chat, fetch_all_chats, create_table
 from session_manager import session_manager
 from feedback import FeedbackManager
+from inventory_store import inventory_store
+from inventory_views import (
+    chat_vehicle, parse_fields, project, dict_getter, paginate,
+    build_etag, cache_headers, is_not_modified, resolve_vehicles
+)
+from comparison_cache import comparison_cache, chat_comparison_tables
+from search_index import search_indexes, SEARCH_FIELDS
+from facets import facet_indexes, facet_latency
+from availability import availability_stats
+from model_registry import model_registry
+from prompt_builder import prompt_stats
+from metrics import metrics, render_prometheus
+from tracing import start_trace, current_labels
+from admission import Rejected, session_turns, llm_limiter, request_admission
+from deadlines import DeadlineExceeded
+from speculation import speculation_stats
+from response_cache import response_cache, rendered_response, FastJSONResponse
 from typing import Dict, Any, Optional
 
 SCRIPT_DIR = Path(__file__).parent
-VEHICLE_DATA = SCRIPT_DIR / "vehicle_data.json"
 
 load_dotenv()  # Loads the variables from .env
 PRODUCTION_MODE = os.getenv("PRODUCTION_MODE", "false").lower() == "true"
 
-app = FastAPI()
+# Dynamic responses are encoded with the fast JSON encoder
+app = FastAPI(default_response_class=FastJSONResponse)
 
 # CORS configuration
 origins = [
@@ -42,8 +61,40 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+request_latency = metrics.histogram(
+    'dealerbot_request_latency_ms', 'HTTP request latency in milliseconds', ('path', 'route', 'status'))
+
+@app.middleware("http")
+async def trace_requests(request: Request, call_next):
+    """Run every request under a trace and report its latency per path and route."""
+    trace_id = request.headers.get('x-trace-id') or request.headers.get('x-request-id')
+    with start_trace(request.url.path, trace_id) as trace:
+        start = time.perf_counter()
+        status_code = 500
+        try:
+            response = await call_next(request)
+            status_code = response.status_code
+            response.headers['X-Trace-Id'] = trace.trace_id
+            return response
+        finally:
+            # Use the route template (/vehicle/{vin}) so VINs don't become label values
+            route = request.scope.get('route')
+            path = getattr(route, 'path', request.url.path if route else 'unmatched')
+            request_latency.observe((time.perf_counter() - start) * 1000,
+                                    path=path, route=trace.route or path, status=status_code)
+
 # Initialize feedback manager
-feedback_manager = FeedbackManager()
+feedback_manager = FeedbackManager(os.getenv("DEALERBOT_FEEDBACK_DB", "dealerbot.db"))
+
+# Add the routing label columns to an existing messages table; store_chat writes them
+create_table()
+
+# Load the inventory now and pick up new versions off the request path
+inventory_store.start()
+
+def rejection(e: Rejected) -> HTTPException:
+    """HTTP response for work turned away by admission control."""
+    return HTTPException(status_code=e.status_code, detail=str(e), headers={"Retry-After": str(e.retry_after)})
 
 @app.post("/user_query")
 async def handle_query(request: Request):
@@ -66,8 +117,12 @@ async def handle_query(request: Request):
         if not session_id:
             session_id = session_manager.create_session()
         
-        # Process the query using the dealerbot agent with session context
-        response = query_dealerbot_agent(user_query, session_id)
+        # Process the query using the dealerbot agent with session context. The
+        # pipeline blocks on LLM calls, so it runs in a worker thread to keep
+        # the event loop free and let identical queries coalesce. The request is
+        # admitted or turned away here, before any LLM work is spent on it
+        with session_turns.turn(session_id), request_admission.admit(session_id):
+            response = await run_in_threadpool(query_dealerbot_agent, user_query, session_id)
 
         # --- Consistent response structure ---
         response_type = "formatted"
@@ -86,13 +141,17 @@ async def handle_query(request: Request):
             # If response is a string, treat as formatted message
             message = response
 
-        # Save the user query and response to the database with roles
+        # Save the user query and response to the database with roles; the
+        # user row also carries the routing labels the LLM produced for it
+        labels = current_labels()
         try:
             store_chat([
                 {
                     "role": "user",
                     "message": user_query,
-                    "session_id": session_id
+                    "session_id": session_id,
+                    "route": labels.get("route"),
+                    "all_vehicles": labels.get("all_vehicles")
                 },
                 {
                     "role": "bot",
@@ -110,6 +169,8 @@ async def handle_query(request: Request):
             "session_id": session_id
         }
 
+    except Rejected as e:
+        raise rejection(e)
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -120,7 +181,8 @@ async def handle_query(request: Request):
 async def handle_vehicle_comparison(request: Request):
     """
     Handle vehicle comparison requests.
-    Expects a JSON array of vehicle data objects to compare.
+    Expects a JSON array of VINs to compare. Vehicle objects with a 'vin'
+    are still accepted; the vehicles are always resolved from the inventory.
     """
     try:
         data = await request.json()
@@ -138,15 +200,23 @@ async def handle_vehicle_comparison(request: Request):
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail="At least two vehicles are required for comparison"
             )
+
+        vehicles = resolve_vehicles(inventory_store.current(), vehicles_data)
+        if len(vehicles) < 2:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Couldn't find matching vehicles"
+            )
             
         # Compare the vehicles with session context
-        comparison = compare_vehicles(vehicles_data, session_id)
+        with request_admission.admit(session_id):
+            comparison = await run_in_threadpool(compare_vehicles, vehicles, session_id)
         
         # Update session with comparison data if session exists
         if session_id:
             session_manager.update_session(session_id, {
                 'last_comparison': comparison,
-                'last_vehicles': vehicles_data
+                'last_vehicles': [vehicle.to_dict() for vehicle in vehicles]
             })
         
         # Parse the comparison response
@@ -162,6 +232,12 @@ async def handle_vehicle_comparison(request: Request):
                 detail="Failed to parse comparison response"
             )
             
+    except Rejected as e:
+        raise rejection(e)
+    except DeadlineExceeded as e:
+        raise HTTPException(status_code=status.HTTP_504_GATEWAY_TIMEOUT, detail=str(e))
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -293,27 +369,59 @@ async def handle_feedback(request: Request):
             detail=str(e)
         )
 
-@app.get("/all_vehicles")
-async def get_all_vehicles():
+async def inventory_page(request: Request, endpoint: str, build_vehicle, limit: Optional[int],
+                   cursor: Optional[str], fields: Optional[str]):
     """
-    Get all vehicles from the scraped data
+    Build a paginated, projected inventory listing with ETag/Last-Modified
+    headers taken from the snapshot version. Returns a 304 response when the
+    client's copy is still current, otherwise a pre-rendered body.
     """
+    snapshot = inventory_store.current()
     try:
-        # Load vehicle data directly from the JSON file
-        with open(VEHICLE_DATA, "r", encoding='utf-8') as file:
-            vehicle_data = json.load(file)
-        
-        # Flatten the data structure
-        all_vehicles = []
-        for category in vehicle_data.values():
-            if isinstance(category, dict):
-                all_vehicles.extend(category.values())
-        
+        field_list = parse_fields(fields)
+        start, end, next_cursor = paginate(len(snapshot.records), snapshot.version, limit, cursor)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+
+    # Keyed by what the page contains, not by how the client spelled the query
+    variant = f"{endpoint}|{','.join(field_list or [])}|{start}:{end}"
+    etag = build_etag(snapshot, variant)
+    headers = cache_headers(snapshot, etag)
+    if is_not_modified(snapshot, etag, request.headers.get('if-none-match'),
+                       request.headers.get('if-modified-since')):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+
+    def build():
+        vehicles = [build_vehicle(record, field_list) for record in snapshot.records[start:end]]
         return {
             "success": True,
-            "count": len(all_vehicles),
-            "vehicles": all_vehicles
+            "count": len(vehicles),
+            "total": len(snapshot.records),
+            "vehicles": vehicles,
+            "next_cursor": next_cursor
         }
+
+    # The body only changes with the snapshot, so it is encoded and compressed once,
+    # off the event loop
+    rendered = await run_in_threadpool(response_cache.get_or_render, snapshot.version, etag, build,
+                                       lambda: inventory_store.current().version)
+    return rendered_response(rendered, request.headers.get('accept-encoding'), headers)
+
+@app.get("/all_vehicles")
+async def get_all_vehicles(request: Request, limit: Optional[int] = None, cursor: Optional[str] = None,
+                           fields: Optional[str] = None):
+    """
+    Get all vehicles from the scraped data.
+    Supports limit/cursor pagination and a fields= projection, e.g.
+    fields=vin,price,parsed_name[model]
+    """
+    def build_vehicle(record, field_list):
+        return project(record.field, field_list) if field_list else record.to_dict()
+
+    try:
+        return await inventory_page(request, "all_vehicles", build_vehicle, limit, cursor, fields)
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -326,21 +434,30 @@ async def get_vehicle_by_vin(vin: str):
     Get a specific vehicle by its VIN
     """
     try:
-        # Load vehicle data directly from the JSON file
-        with open(VEHICLE_DATA, "r", encoding='utf-8') as file:
-            vehicle_data = json.load(file)
-        
-        # Search through all categories for the vehicle with matching VIN
-        for category in vehicle_data.values():
-            if isinstance(category, dict):
-                for vehicle in category.values():
-                    if isinstance(vehicle, dict) and vehicle.get("vin") == vin:
-                        return vehicle
-        
+        vehicle = inventory_store.current().get_vehicle(vin)
+    except Exception as e:
         raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Vehicle not found"
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Failed to load vehicle data: {str(e)}"
         )
+
+    if vehicle:
+        return vehicle
+    raise HTTPException(
+        status_code=status.HTTP_404_NOT_FOUND,
+        detail="Vehicle not found"
+    )
+
+@app.get("/inventory/version")
+async def get_inventory_version():
+    """Get the version of the inventory snapshot currently being served"""
+    try:
+        snapshot = inventory_store.current()
+        return {
+            "version": snapshot.version,
+            "published_at": snapshot.published_at.isoformat(),
+            "count": len(snapshot.records)
+        }
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -348,34 +465,17 @@ async def get_vehicle_by_vin(vin: str):
         )
 
 @app.get("/chat_vehicles")
-async def get_chat_vehicles():
+async def get_chat_vehicles(request: Request, limit: Optional[int] = None, cursor: Optional[str] = None,
+                            fields: Optional[str] = None):
     """Get minimal vehicle data optimized for chat display"""
+    def build_vehicle(record, field_list):
+        vehicle = chat_vehicle(record)
+        return project(dict_getter(vehicle), field_list) if field_list else vehicle
+
     try:
-        with open(VEHICLE_DATA, "r", encoding='utf-8') as file:
-            vehicle_data = json.load(file)
-        
-        # Extract minimal data for chat display
-        chat_vehicles = []
-        for category in vehicle_data.values():
-            if isinstance(category, dict):
-                for vehicle in category.values():
-                    chat_vehicles.append({
-                        'vin': vehicle.get('vin'),
-                        'vehicle_name': vehicle.get('vehicle_name'),
-                        'main_image': vehicle.get('main_image'),
-                        'price': vehicle.get('price'),
-                        'parsed_name': vehicle.get('parsed_name', {}),
-                        'specifications': {
-                            k: v for k, v in vehicle.get('specifications', {}).items() 
-                            if k in ['epa_range', 'horsepower', 'drive']
-                        }
-                    })
-        
-        return {
-            "success": True,
-            "count": len(chat_vehicles),
-            "vehicles": chat_vehicles
-        }
+        return await inventory_page(request, "chat_vehicles", build_vehicle, limit, cursor, fields)
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -395,23 +495,9 @@ async def chat_compare_vehicles(request: Request):
                 detail="At least two vehicles are required for comparison"
             )
             
-        # Load full vehicle data
-        with open(VEHICLE_DATA, 'r', encoding='utf-8') as file:
-            all_data = json.load(file)
-        
-        # Flatten all vehicles into a single list
-        all_vehicles = []
-        for category in all_data.values():
-            if isinstance(category, dict):
-                all_vehicles.extend(category.values())
-        
         # Find matching vehicles by VIN
-        vehicles_to_compare = []
-        for vin in vehicles_data:
-            vehicle = next((v for v in all_vehicles 
-                          if isinstance(v, dict) and v.get('vin') == vin), None)
-            if vehicle:
-                vehicles_to_compare.append(vehicle)
+        snapshot = inventory_store.current()
+        vehicles_to_compare = resolve_vehicles(snapshot, vehicles_data)
         
         if len(vehicles_to_compare) < 2:
             raise HTTPException(
@@ -419,47 +505,120 @@ async def chat_compare_vehicles(request: Request):
                 detail="Couldn't find matching vehicles"
             )
         
-        # Define the comparison fields we want to show
-        comparison_fields = [
-            ('Price', lambda v: v.get('price', 'N/A')),
-            ('Year', lambda v: v.get('parsed_name', {}).get('year', 'N/A')),
-            ('Model', lambda v: v.get('parsed_name', {}).get('model', 'N/A')),
-            ('Trim', lambda v: v.get('parsed_name', {}).get('trim', 'N/A')),
-            ('Type', lambda v: v.get('parsed_name', {}).get('vehicle_type', 'N/A')),
-            ('Horsepower', lambda v: v.get('specifications', {}).get('horsepower', 'N/A')),
-            ('EPA Range', lambda v: v.get('specifications', {}).get('epa_range', 'N/A')),
-            ('Torque', lambda v: v.get('specifications', {}).get('torque', 'N/A')),
-            ('Drive', lambda v: v.get('specifications', {}).get('drive', 'N/A')),
-            ('Exterior Color', lambda v: v.get('specifications', {}).get('exterior_color', 'N/A')),
-            ('Warranty', lambda v: v.get('warranty', 'N/A').split('\n')[0] if v.get('warranty') else 'N/A')
-        ]
-        
-        # Build comparison data - FIX: Use actual vehicle names as keys
-        comparison_data = {
-            "headers": ["Feature"] + [v['vehicle_name'] for v in vehicles_to_compare],
-            "rows": []
-        }
-        
-        # Add each comparison field - FIX: Use vehicle names as keys instead of "Vehicle 1", "Vehicle 2"
-        for field_name, getter in comparison_fields:
-            row = {"Feature": field_name}
-            for vehicle in vehicles_to_compare:
-                value = getter(vehicle)
-                # Use the actual vehicle name as the key to match headers
-                row[vehicle['vehicle_name']] = value if value not in [None, ""] else "N/A"
-            comparison_data["rows"].append(row)
+        # Columns are precomputed per snapshot and tables memoized per VIN list
+        comparison_data = chat_comparison_tables.compare(snapshot, vehicles_to_compare)
         
         return {
             "comparison": comparison_data,
             "session_id": data.get('session_id')
         }
             
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=str(e)
         )
 
+@app.get("/search")
+async def search_vehicles(q: str = "", limit: int = 20, field: Optional[str] = None, min_match: float = 0.0):
+    """
+    Full-text search over vehicle features and warranty text.
+    Returns VINs ranked by BM25 score; field= restricts the search to one of
+    features[exterior], features[interior], features[functional] or warranty.
+    """
+    if not q.strip():
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Query cannot be empty")
+    if field is not None and field not in SEARCH_FIELDS:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST,
+                            detail=f"field must be one of {', '.join(SEARCH_FIELDS)}")
+    if not 1 <= limit <= 500:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="limit must be between 1 and 500")
+
+    start = time.perf_counter()
+    snapshot = inventory_store.current()
+    index = search_indexes.get(snapshot)
+    ranked = index.search(q, field, limit, min_match)
+    return {
+        "success": True,
+        "query": q,
+        "version": snapshot.version,
+        "count": len(ranked),
+        "results": [
+            {"vin": index.vins[doc], "vehicle_name": index.names[doc], "score": round(score, 4)}
+            for doc, score in ranked
+        ],
+        "took_ms": round((time.perf_counter() - start) * 1000, 3)
+    }
+
+@app.get("/facets")
+async def get_facets(make: Optional[str] = None, model: Optional[str] = None, year: Optional[str] = None, trim: Optional[str] = None,
+                     vehicle_type: Optional[str] = None, exterior_color: Optional[str] = None,
+                     drive: Optional[str] = None, price_band: Optional[str] = None):
+    """
+    Vehicle counts per make, model, year, trim, vehicle type, exterior color, drive
+    and price band, within the vehicles matching the given filters. Filters
+    match case-insensitive substrings (model=escape); price_band is exact.
+    """
+    start = time.perf_counter()
+    snapshot = inventory_store.current()
+    facets = facet_indexes.get(snapshot)
+    filters = {
+        name: value for name, value in {
+            "make": make, "model": model, "year": year, "trim": trim, "vehicle_type": vehicle_type,
+            "exterior_color": exterior_color, "drive": drive, "price_band": price_band
+        }.items() if value
+    }
+    response = {
+        "success": True,
+        "version": snapshot.version,
+        "total": facets.size,
+        "matched": facets.count(filters),
+        "filters": filters,
+        "facets": facets.counts(filters)
+    }
+    facet_latency.observe((time.perf_counter() - start) * 1000, source='api')
+    return response
+
+@app.get("/comparisons/stats")
+async def get_comparison_stats():
+    """Hit rate and latency of the comparison caches"""
+    return {
+        "compare_vehicles": comparison_cache.stats(),
+        "chat_compare": chat_comparison_tables.cache.stats()
+    }
+
+@app.get("/availability/stats")
+async def get_availability_stats():
+    """How many Inventory Search answers came from templates instead of the LLM"""
+    return availability_stats()
+
+@app.get("/speculation/stats")
+async def get_speculation_stats():
+    """How much speculative routing work was used or wasted, and the latency it saved"""
+    return speculation_stats()
+
+@app.get("/admission/stats")
+async def get_admission_stats():
+    """LLM calls running and queued right now"""
+    return {**llm_limiter.stats(), "requests": request_admission.stats()}
+
+@app.get("/models")
+async def get_models():
+    """Model settings each agent currently runs with"""
+    return model_registry.describe()
+
+@app.get("/metrics")
+async def get_metrics():
+    """Prometheus metrics: request, stage, prompt and cache histograms and counters"""
+    return Response(content=render_prometheus(metrics), media_type="text/plain; version=0.0.4")
+
+@app.get("/prompts/stats")
+async def get_prompt_stats():
+    """Token budgets and per-agent prompt sizes"""
+    return prompt_stats()
+
 if __name__ == "__main__":
     if PRODUCTION_MODE : 
         app.run(ssl_context=("ssl/cert.pem", "ssl/key.pem"), host="0.0.0.0", port=5002)
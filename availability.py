@@ -0,0 +1,168 @@
+import re
+import zlib
+from typing import Dict, List, Any, Optional
+from facets import FacetIndex
+from metrics import metrics
+
+# Deterministic answers to "do you have X in stock?" questions, built from the
+# facet counts instead of two LLM calls (availability sentence + formatting).
+# Phrasing varies between questions but is stable for a given question.
+# Questions with nuance the templates can't express (comparisons, budgets,
+# recommendations, ...) return None so the caller falls back to the LLM.
+
+# Questions longer than this are assumed to ask for more than availability
+MAX_TEMPLATE_QUERY_WORDS = 18
+NUANCE_PATTERN = re.compile(
+    r"\b(why|how|which|recommend\w*|suggest\w*|better|best|compare\w*|vs|versus|differen\w*|cheap\w*|"
+    r"expensive|afford\w*|budget|under|over|less|more|between|finance|financing|lease|leasing|payment\w*|"
+    r"deal|deals|discount\w*|trade|incentive\w*|price|cost|mpg|tow\w*|feature\w*|family|families)\b|\$")
+
+availability_responses = metrics.counter(
+    'dealerbot_availability_responses_total', 'Inventory Search answers by how they were produced', ('source',))
+
+IN_STOCK_TEMPLATES = [
+    "Good news! We have {count} {label} in stock right now.",
+    "Yes, we currently have {count} {label} available.",
+    "We do! There are {count} {label} on the lot at the moment.",
+    "You're in luck: {count} {label} are in stock today.",
+]
+ONE_IN_STOCK_TEMPLATES = [
+    "Good news! We have one {label} in stock right now.",
+    "Yes, we currently have a single {label} available.",
+    "We do! There's one {label} on the lot at the moment.",
+]
+NONE_TEMPLATES = [
+    "Sorry, we don't have any {label} in stock right now.",
+    "Unfortunately there are no {label} available at the moment.",
+    "We're currently out of {label}.",
+]
+ALTERNATIVE_TEMPLATES = [
+    " We do have {count} {label} though.",
+    " The closest match we have is {count} {label}.",
+]
+DETAIL_TEMPLATES = [
+    " They come in {facet} like {values}.",
+    " You can choose from {facet} such as {values}.",
+]
+OFFER_TEMPLATES = [
+    " Would you like to see the details?",
+    " Want me to show you what we have?",
+    " Shall I pull up the details for you?",
+]
+NONE_OFFER_TEMPLATES = [
+    " Would you like me to suggest something similar?",
+    " Can I help you find an alternative?",
+]
+
+# Vehicle types that read as nouns ("3 SUVs"); others are adjectives ("3 electric vehicles")
+BODY_TYPES = {'suv', 'hybrid suv', 'truck', 'van', 'sedan', 'coupe', 'convertible', 'wagon'}
+
+# Facets worth describing when they aren't already filtered on, in order
+DETAIL_FACETS = [('trim', 'trims'), ('exterior_color', 'colors'), ('year', 'model years')]
+DETAIL_VALUES = 3
+
+def _clean(value: str) -> str:
+    return str(value).replace('®', '').replace('™', '').strip()
+
+def _pick(options: List[str], seed: int, slot: int) -> str:
+    return options[(seed + slot) % len(options)]
+
+def _display(facets: FacetIndex, facet: str, value: Any) -> str:
+    """The inventory's spelling of a filter value when it names exactly one value."""
+    wanted = str(value).strip().lower()
+    values = facets.values.get(facet, {})
+    if wanted in values:
+        return _clean(values[wanted][0])
+    matches = [display for key, (display, _) in values.items() if wanted in key]
+    names = list(dict.fromkeys(_clean(display) for display in matches))
+    if len(names) == 1:
+        return names[0]
+    text = _clean(value)
+    return text.title() if text.islower() else text
+
+def _noun(vehicle_type: Optional[str], count: int) -> str:
+    """'SUV', '3 SUVs', '3 electric vehicles', '3 vehicles' ..."""
+    if vehicle_type:
+        vehicle_type = ' '.join(word if word.isupper() else word.lower() for word in vehicle_type.split())
+    if vehicle_type and vehicle_type.lower() in BODY_TYPES:
+        return vehicle_type if count == 1 else f"{vehicle_type}s"
+    noun = 'vehicle' if count == 1 else 'vehicles'
+    return f"{vehicle_type} {noun}" if vehicle_type else noun
+
+def describe(facets: FacetIndex, filters: Dict[str, Any], count: int) -> str:
+    """Name the filtered vehicles: '2025 Escape ST-Line SUVs', 'Blue SUVs', '2024 Ford vehicles' ..."""
+    parts = [_display(facets, facet, filters[facet])
+             for facet in ('year', 'exterior_color', 'make', 'model', 'trim') if facet in filters]
+    if 'model' not in filters:
+        vehicle_type = _display(facets, 'vehicle_type', filters['vehicle_type']) if 'vehicle_type' in filters else None
+        parts.append(_noun(vehicle_type, count))
+    elif count != 1:
+        # "5 Escape" reads wrong; add the body style the matches share, or "vehicles"
+        types = [_clean(value) for value in facets.counts(filters).get('vehicle_type', {})] if count else []
+        body = types[0] if len(types) == 1 and types[0].lower() in BODY_TYPES else None
+        parts.append(_noun(body, count))
+    if 'drive' in filters:
+        parts.append(f"with {_display(facets, 'drive', filters['drive'])}")
+    return ' '.join(parts)
+
+def _join(values: List[str]) -> str:
+    return values[0] if len(values) == 1 else f"{', '.join(values[:-1])} and {values[-1]}"
+
+def has_nuance(user_query: str) -> bool:
+    return len(user_query.split()) > MAX_TEMPLATE_QUERY_WORDS or NUANCE_PATTERN.search(user_query.lower()) is not None
+
+def _alternative(facets: FacetIndex, filters: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """The closest filter set with stock: drop one filter at a time, keeping the model."""
+    for facet in ('exterior_color', 'trim', 'year', 'drive', 'price_band', 'vehicle_type'):
+        if facet in filters and len(filters) > 1:
+            relaxed = {name: value for name, value in filters.items() if name != facet}
+            count = facets.count(relaxed)
+            if count:
+                return {'filters': relaxed, 'count': count}
+    return None
+
+def availability_response(user_query: str, facets: FacetIndex, filters: Optional[Dict[str, Any]]) -> Optional[str]:
+    """A templated availability answer, or None when the question needs the LLM."""
+    # No filters would count the whole inventory, which answers nothing the user asked
+    if not filters or has_nuance(user_query):
+        availability_responses.inc(source='llm')
+        return None
+
+    seed = zlib.crc32(user_query.strip().lower().encode('utf-8'))
+    count = facets.count(filters)
+    if count == 0:
+        response = _pick(NONE_TEMPLATES, seed, 0).format(label=describe(facets, filters, 2))
+        alternative = _alternative(facets, filters)
+        if alternative:
+            response += _pick(ALTERNATIVE_TEMPLATES, seed, 1).format(
+                count=alternative['count'], label=describe(facets, alternative['filters'], alternative['count']))
+            response += _pick(OFFER_TEMPLATES, seed, 2)
+        else:
+            response += _pick(NONE_OFFER_TEMPLATES, seed, 2)
+        availability_responses.inc(source='template')
+        return response
+
+    label = describe(facets, filters, count)
+    if count == 1:
+        response = _pick(ONE_IN_STOCK_TEMPLATES, seed, 0).format(label=label)
+    else:
+        response = _pick(IN_STOCK_TEMPLATES, seed, 0).format(count=count, label=label)
+        counts = facets.counts(filters)
+        for facet, plural in DETAIL_FACETS:
+            values = [_clean(value) for value in counts.get(facet, {}) if value]
+            if facet not in filters and len(values) > 1:
+                response += _pick(DETAIL_TEMPLATES, seed, 1).format(facet=plural, values=_join(values[:DETAIL_VALUES]))
+                break
+    response += _pick(OFFER_TEMPLATES, seed, 2)
+    availability_responses.inc(source='template')
+    return response
+
+def availability_stats() -> Dict[str, Any]:
+    template = availability_responses.value(source='template')
+    llm = availability_responses.value(source='llm')
+    total = template + llm
+    return {
+        'template': template,
+        'llm': llm,
+        'template_hit_rate': round(template / total, 4) if total else 0.0
+    }
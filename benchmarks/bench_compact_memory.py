@@ -0,0 +1,73 @@
+import argparse
+import gc
+import json
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from compact_inventory import CompactVehicle, StringPool
+from synthetic_inventory import generate_inventory
+
+# Compares the memory held by a synthetic inventory loaded as plain dicts (what
+# json.load produces) with the same inventory held as CompactVehicle records.
+
+def _measure(build):
+    # Time without tracemalloc, which slows allocation-heavy code down a lot
+    gc.collect()
+    start = time.perf_counter()
+    build()
+    elapsed = time.perf_counter() - start
+
+    gc.collect()
+    tracemalloc.start()
+    result = build()
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, current, elapsed
+
+def run(count: int, seed: int):
+    print(f"Generating {count} synthetic vehicles...")
+    content = json.dumps(generate_inventory(count, seed), ensure_ascii=False)
+    print(f"Serialized inventory: {len(content.encode('utf-8')) / 1e6:.1f} MB")
+
+    def load_dicts():
+        data = json.loads(content)
+        return [vehicle for category in data.values() for vehicle in category.values()]
+
+    dicts, dict_bytes, dict_time = _measure(load_dicts)
+    del dicts
+
+    def load_compact():
+        pool = StringPool()
+        records = []
+        for category in json.loads(content).values():
+            records.extend(CompactVehicle.from_dict(vehicle, pool) for vehicle in category.values())
+        return records
+
+    records, compact_bytes, compact_time = _measure(load_compact)
+
+    start = time.perf_counter()
+    for record in records:
+        record.to_dict()
+    to_dict_time = time.perf_counter() - start
+
+    report = {
+        "vehicles": count,
+        "dict_mb": round(dict_bytes / 1e6, 1),
+        "compact_mb": round(compact_bytes / 1e6, 1),
+        "reduction": round(1 - compact_bytes / dict_bytes, 3),
+        "dict_load_s": round(dict_time, 2),
+        "compact_load_s": round(compact_time, 2),
+        "to_dict_all_s": round(to_dict_time, 2),
+    }
+    print(json.dumps(report, indent=2))
+    return report
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Memory benchmark for compact vehicle records")
+    parser.add_argument("--count", type=int, default=50000)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+    run(args.count, args.seed)
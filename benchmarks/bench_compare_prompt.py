@@ -0,0 +1,50 @@
+import json
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from inventory_store import InventorySnapshot
+from inventory_views import comparison_table, resolve_vehicles
+from token_budget import count_tokens, clip_to_budget, tiktoken
+from synthetic_inventory import SAMPLE_DATA
+
+# Input size of the compare_vehicles prompt sections: the old full vehicle
+# objects and raw session context versus the compact table and clipped summary.
+# Importing dealerbot needs crewai and an OpenAI key, so the context summary is
+# rebuilt here the same way dealerbot.summarize_user_context does it.
+
+CONTEXT_BUDGET = 150
+
+def _session_context(vehicles, turns: int):
+    history = [{
+        'query': f"What about the {v['vehicle_name']} for a family of four?",
+        'response': "It is a great choice for families. " * 30,
+        'timestamp': '2026-01-01T00:00:00'
+    } for v in (vehicles * turns)[:turns]]
+    return {
+        'last_query': history[-1]['query'],
+        'last_response': history[-1]['response'],
+        'last_vehicles': vehicles,
+        'last_comparison': json.dumps({'summary': "Previous comparison. " * 40}),
+        'conversation_history': history,
+    }
+
+def _summary(context):
+    queries = [msg['query'] for msg in reversed(context['conversation_history'][-5:])]
+    names = [v['vehicle_name'] for v in context['last_vehicles']]
+    return ("Recent questions (newest first): " + " / ".join(queries)
+            + "\nRecently viewed: " + ", ".join(dict.fromkeys(names)))
+
+if __name__ == "__main__":
+    with open(SAMPLE_DATA, 'r', encoding='utf-8') as f:
+        snapshot = InventorySnapshot("sample", json.load(f), None)
+    print(f"tiktoken: {tiktoken is not None}")
+    for count in (2, 3, 4):
+        vehicles = [record.to_dict() for record in snapshot.records[:count]]
+        context = _session_context(vehicles, 12)
+        old_tokens = count_tokens(json.dumps(vehicles, indent=2)) + count_tokens(json.dumps(context))
+        table = comparison_table(resolve_vehicles(snapshot, [v['vin'] for v in vehicles]))
+        new_tokens = count_tokens(table) + count_tokens(clip_to_budget(_summary(context), CONTEXT_BUDGET))
+        print(json.dumps({"vehicles": count, "old_tokens": old_tokens, "new_tokens": new_tokens,
+                          "reduction": round(1 - new_tokens / old_tokens, 3)}))
+    print(table)
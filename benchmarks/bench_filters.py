@@ -0,0 +1,207 @@
+import argparse
+import gc
+import json
+import os
+import random
+import sys
+import time
+import tracemalloc
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict, List, Any, Callable, Tuple
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+# dealerbot is imported for its filter functions only; keep it offline
+os.environ.setdefault("DEALERBOT_LLM_BACKEND", "fake")
+os.environ.setdefault("DEALERBOT_DB_BACKEND", "memory")
+import dealerbot
+from compact_inventory import CompactVehicle, StringPool
+from inventory_store import InventorySnapshot
+from inventory_views import project
+from response_cache import dumps
+from synthetic_inventory import iter_inventory_chunks
+
+# Micro-benchmarks for the inventory filter path on synthetic inventories of
+# 1k to 1M vehicles: single- and multi-key filters through
+# dealerbot.return_vehicle_data and get_vehicle_data, VIN lookups, field
+# projections and JSON serialization, plus the memory held by the snapshot and
+# the peak allocated by each case.
+#
+# Times are the best of --repeat runs. --check compares the results with the
+# stored baseline and exits with status 1 when a case got slower or allocates
+# more than the tolerance allows; --update-baseline rewrites the baseline.
+# Baselines are absolute times on one machine, so they are not committed:
+# record one with --update-baseline on the machine that runs the check, before
+# the change being measured.
+
+BASELINE_PATH = Path(__file__).resolve().parent / "baselines" / "bench_filters.json"
+DEFAULT_SIZES = [1000, 10000, 100000]
+# Cases faster than this are dominated by timer noise and are not compared
+MIN_COMPARABLE_MS = 0.5
+MIN_COMPARABLE_MB = 1.0
+
+class FixedStore:
+    """Serves one snapshot, in place of the file-backed inventory store."""
+
+    def __init__(self, snapshot: InventorySnapshot):
+        self.snapshot = snapshot
+
+    def current(self) -> InventorySnapshot:
+        return self.snapshot
+
+def build_snapshot(count: int, seed: int, memory: bool = False) -> Tuple[InventorySnapshot, Dict[str, float]]:
+    """
+    Build a snapshot chunk by chunk, the way InventorySnapshot flattens a loaded
+    file. Only the conversion to records and the VIN index count towards build_s;
+    generating the synthetic data is reported as generate_s.
+
+    With `memory`, each chunk is converted a second time into a separate pool
+    with tracemalloc on, and the memory left allocated is summed. Tracing only
+    that conversion keeps tracemalloc off the generator and the timed build,
+    which it would otherwise slow down several times over.
+    """
+    snapshot = InventorySnapshot(f"synthetic-{count}", {}, datetime.now(timezone.utc))
+    pool, traced_pool = StringPool(), StringPool()
+    generate_s = build_s = 0.0
+    snapshot_bytes = 0
+    start = time.perf_counter()
+    for chunk in iter_inventory_chunks(count, seed):
+        vehicles = [vehicle for category in chunk.values() for vehicle in category.values()]
+        converted = time.perf_counter()
+        generate_s += converted - start
+        snapshot.records.extend(CompactVehicle.from_dict(vehicle, pool) for vehicle in vehicles)
+        build_s += time.perf_counter() - converted
+        if memory:
+            # Strings already in traced_pool were counted with an earlier chunk
+            tracemalloc.start()
+            records = [CompactVehicle.from_dict(vehicle, traced_pool) for vehicle in vehicles]
+            snapshot_bytes += tracemalloc.get_traced_memory()[0]
+            tracemalloc.stop()
+            del records
+        del chunk, vehicles
+        start = time.perf_counter()
+    snapshot.by_vin = {record.vin: record for record in snapshot.records if isinstance(record.vin, str)}
+    build_s += time.perf_counter() - start
+    stats = {'generate_s': round(generate_s, 2), 'build_s': round(build_s, 2)}
+    if memory:
+        stats['snapshot_mb'] = round((snapshot_bytes + sys.getsizeof(snapshot.by_vin)) / 1e6, 1)
+    return snapshot, stats
+
+def _best_ms(fn: Callable[[], Any], repeat: int) -> float:
+    best = float('inf')
+    for _ in range(repeat):
+        gc.collect()
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best * 1000
+
+def _peak_mb(fn: Callable[[], Any]) -> float:
+    gc.collect()
+    tracemalloc.start()
+    fn()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return peak / 1e6
+
+def cases(snapshot: InventorySnapshot, seed: int) -> Dict[str, Callable[[], Any]]:
+    rng = random.Random(seed)
+    sample = snapshot.records[len(snapshot.records) // 2]
+    model = sample.field('parsed_name[model]')
+    year = sample.field('parsed_name[year]')
+    color = sample.field('specifications[exterior_color]')
+    vins = [record.vin for record in rng.sample(snapshot.records, min(1000, len(snapshot.records)))]
+    projection = ['vin', 'price', 'parsed_name[model]', 'parsed_name[trim]', 'specifications[exterior_color]']
+    page = snapshot.records[:100]
+
+    def get_vehicle_data():
+        # The LLM analysis is fixed so only the filtering and extraction are timed
+        analyze = dealerbot.analyze_vehicle_query
+        dealerbot.analyze_vehicle_query = lambda query: ('price', {'parsed_name[model]': model, 'price': 'Unknown'})
+        try:
+            return dealerbot.get_vehicle_data("How much is it?")
+        finally:
+            dealerbot.analyze_vehicle_query = analyze
+
+    return {
+        'filter_single_key': lambda: dealerbot.return_vehicle_data({'parsed_name[model]': model}),
+        'filter_multi_key': lambda: dealerbot.return_vehicle_data({
+            'parsed_name[model]': model, 'parsed_name[year]': year, 'specifications[exterior_color]': color}),
+        'filter_no_match': lambda: dealerbot.return_vehicle_data({'parsed_name[model]': 'No Such Model'}),
+        'get_vehicle_data': get_vehicle_data,
+        'vin_lookup_x1000': lambda: [snapshot.get_vehicle(vin) for vin in vins],
+        'project_all': lambda: [project(record.field, projection) for record in snapshot.records],
+        'serialize_page_100': lambda: dumps({'vehicles': [record.to_dict() for record in page]}),
+        'serialize_projection_all': lambda: dumps(
+            {'vehicles': [project(record.field, projection) for record in snapshot.records]}),
+    }
+
+def run(sizes: List[int], repeat: int, seed: int, memory: bool) -> Dict[str, Any]:
+    results: Dict[str, Any] = {}
+    original_store = dealerbot.inventory_store
+    for size in sizes:
+        print(f"[Bench] Building {size} synthetic vehicles...", file=sys.stderr)
+        gc.collect()
+        snapshot, report = build_snapshot(size, seed, memory)
+        print(f"[Bench] {size} build: {report}", file=sys.stderr)
+
+        dealerbot.inventory_store = FixedStore(snapshot)
+        try:
+            for name, fn in cases(snapshot, seed).items():
+                entry = {'ms': round(_best_ms(fn, repeat), 3)}
+                if memory:
+                    entry['peak_mb'] = round(_peak_mb(fn), 2)
+                report[name] = entry
+                print(f"[Bench] {size} {name}: {entry}", file=sys.stderr)
+        finally:
+            dealerbot.inventory_store = original_store
+        results[str(size)] = report
+        del snapshot
+    return results
+
+def compare(results: Dict[str, Any], baseline: Dict[str, Any], tolerance: float) -> List[str]:
+    """Describe every case that regressed by more than `tolerance` against the baseline."""
+    regressions = []
+    for size, cases_report in results.items():
+        for name, entry in cases_report.items():
+            base = baseline.get(size, {}).get(name)
+            if not isinstance(entry, dict) or not isinstance(base, dict):
+                continue
+            for metric, floor in (('ms', MIN_COMPARABLE_MS), ('peak_mb', MIN_COMPARABLE_MB)):
+                if metric not in entry or metric not in base:
+                    continue
+                if entry[metric] > base[metric] * (1 + tolerance) and entry[metric] - base[metric] > floor:
+                    regressions.append(f"{size} {name} {metric}: {entry[metric]} vs baseline {base[metric]}")
+    return regressions
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Inventory filter path micro-benchmarks")
+    parser.add_argument("--sizes", type=lambda s: [int(n) for n in s.split(',')], default=DEFAULT_SIZES,
+                        help="Comma-separated inventory sizes, e.g. 1000,10000,100000,1000000")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--no-memory", action="store_true", help="Skip the tracemalloc measurements")
+    parser.add_argument("--baseline", default=str(BASELINE_PATH))
+    parser.add_argument("--check", action="store_true", help="Fail when slower than the baseline")
+    parser.add_argument("--tolerance", type=float, default=0.3, help="Allowed slowdown, 0.3 = 30%%")
+    parser.add_argument("--update-baseline", action="store_true")
+    args = parser.parse_args()
+
+    results = run(args.sizes, args.repeat, args.seed, not args.no_memory)
+    print(json.dumps(results, indent=2))
+
+    baseline_path = Path(args.baseline)
+    if args.update_baseline:
+        baseline = json.loads(baseline_path.read_text(encoding='utf-8')) if baseline_path.exists() else {}
+        baseline.update(results)
+        baseline_path.parent.mkdir(parents=True, exist_ok=True)
+        baseline_path.write_text(json.dumps(baseline, indent=2) + "\n", encoding='utf-8')
+        print(f"[Bench] Baseline written to {baseline_path}", file=sys.stderr)
+    elif args.check:
+        if not baseline_path.exists():
+            sys.exit(f"No baseline at {baseline_path}; run with --update-baseline first")
+        regressions = compare(results, json.loads(baseline_path.read_text(encoding='utf-8')), args.tolerance)
+        if regressions:
+            print("[Bench] Regressions against the baseline:\n  " + "\n  ".join(regressions), file=sys.stderr)
+            sys.exit(1)
+        print("[Bench] No regressions against the baseline", file=sys.stderr)
@@ -0,0 +1,177 @@
+import argparse
+import ast
+import json
+import os
+import sys
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict, List, Any
+
+ROOT_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT_DIR))
+from load_test import percentile
+
+# Replays a query set through dealerbot under different model tier
+# assignments (per-agent model overrides from model_tiers.json) and reports,
+# per tier, end-to-end and per-stage latency and how often each
+# classification stage agrees with the first tier. Use it to find the fastest
+# model that still routes and extracts like the reference.
+#
+# By default it runs offline on the fake LLM backend with a latency per model
+# (--model-latency), which checks the harness and the latency side only: the
+# fake answers the same on every model, so agreement is always 1.0. Run with
+# DEALERBOT_LLM_BACKEND=crewai and an OPENAI_API_KEY for real agreement
+# numbers; every query then costs real API calls per tier.
+
+QUERIES = [
+    "Hi, how are you doing today?",
+    "Do you have any Escape vehicles in stock?",
+    "Are there any 2025 Bronco available?",
+    "What is the horsepower of the Escape ST-Line?",
+    "How much is the 2024 Mustang?",
+    "What colors does the Explorer come in?",
+    "Would you recommend the Bronco Sport for camping?",
+    "Is the Explorer good for a family of five?",
+    "Show me all Escape vehicles",
+    "I'd like to book a test drive",
+    "Tell me a joke",
+    "Does the Maverick have all wheel drive?",
+]
+
+# Stages whose output is a label or a dict, so agreement can be checked exactly
+CLASSIFICATION_STAGES = ('controller', 'all_vehicles', 'data_request', 'interest', 'identifier')
+DEFAULT_MODEL_LATENCY = '{"gpt-4": 900, "gpt-3.5-turbo": 350, "gpt-4o-mini": 300}'
+
+def normalize(key: str, output: str) -> str:
+    if key == 'identifier':
+        try:
+            return repr(sorted(ast.literal_eval(output).items()))
+        except (ValueError, SyntaxError, AttributeError):
+            return output.strip()
+    return output.strip().strip("'\"").lower()
+
+def replay(queries: List[str], repeat: int) -> List[Dict[str, Any]]:
+    """Run every query and record the output and latency of each LLM call it makes."""
+    from dealerbot import query_dealerbot_agent
+    from llm_backend import llm
+    calls: List[Dict[str, Any]] = []
+    run = llm.run
+
+    def recording_run(agent, task):
+        start = time.perf_counter()
+        output = run(agent, task)
+        calls.append({'key': agent.key, 'output': output, 'ms': (time.perf_counter() - start) * 1000})
+        return output
+
+    llm.run = recording_run
+    results = []
+    try:
+        for _ in range(repeat):
+            for query in queries:
+                calls.clear()
+                start = time.perf_counter()
+                query_dealerbot_agent(query)
+                results.append({'query': query, 'ms': (time.perf_counter() - start) * 1000, 'calls': list(calls)})
+    finally:
+        del llm.run
+    return results
+
+def _stage_outputs(result: Dict[str, Any]) -> Dict[str, List[str]]:
+    outputs: Dict[str, List[str]] = {}
+    for call in result['calls']:
+        if call['key'] in CLASSIFICATION_STAGES:
+            outputs.setdefault(call['key'], []).append(normalize(call['key'], call['output']))
+    return outputs
+
+def _latency(values: List[float]) -> Dict[str, float]:
+    values = sorted(values)
+    return {
+        "mean_ms": round(sum(values) / len(values), 1),
+        "p50_ms": round(percentile(values, 0.50), 1),
+        "p95_ms": round(percentile(values, 0.95), 1),
+    }
+
+def summarize(results: List[Dict[str, Any]], reference: List[Dict[str, Any]]) -> Dict[str, Any]:
+    stage_ms: Dict[str, List[float]] = {}
+    for result in results:
+        for call in result['calls']:
+            stage_ms.setdefault(call['key'], []).append(call['ms'])
+
+    # A stage agrees on a query when it produced the same outputs as the reference tier
+    agreed: Dict[str, int] = {}
+    compared: Dict[str, int] = {}
+    for result, expected in zip(results, reference):
+        outputs, expected_outputs = _stage_outputs(result), _stage_outputs(expected)
+        for key in set(outputs) | set(expected_outputs):
+            compared[key] = compared.get(key, 0) + 1
+            agreed[key] = agreed.get(key, 0) + (outputs.get(key) == expected_outputs.get(key))
+
+    stages = {}
+    for key, values in sorted(stage_ms.items()):
+        stages[key] = {"calls": len(values), **_latency(values)}
+        if key in compared:
+            stages[key]["agreement"] = round(agreed[key] / compared[key], 3)
+    return {
+        "queries": len(results),
+        "end_to_end": _latency([result['ms'] for result in results]),
+        "llm_calls_per_query": round(sum(len(result['calls']) for result in results) / len(results), 2),
+        "classification_agreement": round(sum(agreed.values()) / sum(compared.values()), 3) if compared else None,
+        "stages": stages,
+    }
+
+def main(args) -> Dict[str, Any]:
+    from model_registry import model_registry
+    with open(args.tiers, 'r', encoding='utf-8') as f:
+        tiers: Dict[str, Dict[str, Dict[str, Any]]] = json.load(f)
+    if args.only:
+        tiers = {name: tiers[name] for name in args.only}
+    queries = QUERIES
+    if args.queries:
+        queries = [line.strip() for line in Path(args.queries).read_text(encoding='utf-8').splitlines() if line.strip()]
+
+    # Build the inventory indexes and caches before anything is timed
+    replay(queries, args.warmup)
+    reference = None
+    reports = {}
+    for name, assignments in tiers.items():
+        model_registry.override(assignments)
+        results = replay(queries, args.repeat)
+        reference = reference or results
+        reports[name] = {
+            "models": {key: model_registry.get(key).model for key in CLASSIFICATION_STAGES},
+            **summarize(results, reference),
+        }
+        print(f"[ModelTiers] {name}: {reports[name]['end_to_end']['mean_ms']}ms mean, "
+              f"agreement {reports[name]['classification_agreement']}", file=sys.stderr)
+    model_registry.override({})
+    return {
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "llm_backend": os.environ.get("DEALERBOT_LLM_BACKEND"),
+        "reference_tier": next(iter(tiers)),
+        "repeat": args.repeat,
+        "tiers": reports,
+    }
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare model tier assignments on a replayed query set")
+    parser.add_argument("--tiers", default=str(Path(__file__).resolve().parent / "model_tiers.json"),
+                        help="JSON file of {tier name: per-agent overrides}; the first tier is the reference")
+    parser.add_argument("--only", type=lambda s: s.split(','), help="Comma-separated tiers to run, in order")
+    parser.add_argument("--queries", help="Text file with one query per line (default: built-in set)")
+    parser.add_argument("--repeat", type=int, default=1)
+    parser.add_argument("--warmup", type=int, default=1, help="Untimed passes over the queries before the first tier")
+    parser.add_argument("--model-latency", default=DEFAULT_MODEL_LATENCY,
+                        help="Fake backend latency per model in ms, as JSON (sets FAKE_LLM_MODEL_LATENCY_MS)")
+    parser.add_argument("--output", help="Also write the JSON report to this file")
+    args = parser.parse_args()
+
+    # Offline defaults; anything already set in the environment wins
+    os.environ.setdefault("DEALERBOT_LLM_BACKEND", "fake")
+    os.environ.setdefault("DEALERBOT_DB_BACKEND", "memory")
+    os.environ.setdefault("FAKE_LLM_MODEL_LATENCY_MS", args.model_latency)
+    report = main(args)
+    text = json.dumps(report, indent=2)
+    if args.output:
+        Path(args.output).write_text(text + "\n", encoding="utf-8")
+    print(text)
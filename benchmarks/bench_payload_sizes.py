@@ -0,0 +1,45 @@
+import argparse
+import json
+import sys
+from datetime import datetime, timezone
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from inventory_store import InventorySnapshot
+from inventory_views import chat_vehicle, parse_fields, project, dict_getter
+from synthetic_inventory import generate_inventory, SAMPLE_DATA
+
+# Compares /all_vehicles and /chat_vehicles payload sizes before and after
+# pagination and field projection, for the real inventory and a synthetic one.
+
+GRID_FIELDS = "vin,vehicle_name,main_image,price"
+PAGE_SIZE = 24
+
+def _size(vehicles) -> int:
+    body = {"success": True, "count": len(vehicles), "vehicles": vehicles}
+    return len(json.dumps(body, ensure_ascii=False).encode('utf-8'))
+
+def measure(snapshot: InventorySnapshot):
+    records = snapshot.records
+    grid_fields = parse_fields(GRID_FIELDS)
+    chat = [chat_vehicle(record) for record in records]
+    return {
+        "vehicles": len(records),
+        "all_vehicles_bytes": _size([record.to_dict() for record in records]),
+        "all_vehicles_grid_fields_bytes": _size([project(record.field, grid_fields) for record in records]),
+        "all_vehicles_grid_page_bytes": _size([project(record.field, grid_fields) for record in records[:PAGE_SIZE]]),
+        "chat_vehicles_bytes": _size(chat),
+        "chat_vehicles_grid_page_bytes": _size([project(dict_getter(v), grid_fields) for v in chat[:PAGE_SIZE]]),
+    }
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Payload size benchmark for the inventory endpoints")
+    parser.add_argument("--synthetic", type=int, default=5000, help="Size of the synthetic inventory")
+    args = parser.parse_args()
+
+    now = datetime.now(timezone.utc)
+    with open(SAMPLE_DATA, 'r', encoding='utf-8') as f:
+        reports = {"current_inventory": measure(InventorySnapshot("sample", json.load(f), now))}
+    reports[f"synthetic_{args.synthetic}"] = measure(
+        InventorySnapshot("synthetic", generate_inventory(args.synthetic), now))
+    print(json.dumps(reports, indent=2))
@@ -0,0 +1,59 @@
+import argparse
+import json
+import sys
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from fastapi.responses import JSONResponse
+from inventory_store import InventorySnapshot
+from inventory_views import chat_vehicle
+from response_cache import ResponseCache, dumps, brotli, orjson
+from synthetic_inventory import generate_inventory, SAMPLE_DATA
+
+# Per-request cost of /all_vehicles and /chat_vehicles bodies when they are rebuilt
+# and encoded with JSONResponse on every hit versus served from the rendered cache,
+# plus the wire size of each encoding.
+
+def _per_request_ms(fn, repeat: int) -> float:
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return round((time.perf_counter() - start) / repeat * 1000, 3)
+
+def measure(snapshot: InventorySnapshot, repeat: int):
+    report = {"vehicles": len(snapshot.records)}
+    builders = {
+        "all_vehicles": lambda: [record.to_dict() for record in snapshot.records],
+        "chat_vehicles": lambda: [chat_vehicle(record) for record in snapshot.records],
+    }
+    for endpoint, build_vehicles in builders.items():
+        def build():
+            vehicles = build_vehicles()
+            return {"success": True, "count": len(vehicles), "vehicles": vehicles}
+
+        cache = ResponseCache()
+        rendered = cache.get_or_render(snapshot.version, endpoint, build)
+        report[endpoint] = {
+            "rebuild_json_ms": _per_request_ms(lambda: JSONResponse(build()), repeat),
+            "rebuild_fast_json_ms": _per_request_ms(lambda: dumps(build()), repeat),
+            "cached_ms": _per_request_ms(
+                lambda: cache.get_or_render(snapshot.version, endpoint, build).select('gzip, br'), repeat),
+            "bytes": {encoding: len(body) for encoding, body in rendered.encodings.items()},
+        }
+    return report
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Rendered response cache benchmark")
+    parser.add_argument("--synthetic", type=int, default=5000, help="Size of the synthetic inventory")
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    print(f"orjson: {orjson is not None}, brotli: {brotli is not None}")
+    now = datetime.now(timezone.utc)
+    with open(SAMPLE_DATA, 'r', encoding='utf-8') as f:
+        reports = {"current_inventory": measure(InventorySnapshot("sample", json.load(f), now), args.repeat)}
+    reports[f"synthetic_{args.synthetic}"] = measure(
+        InventorySnapshot("synthetic", generate_inventory(args.synthetic), now), max(1, args.repeat // 10))
+    print(json.dumps(reports, indent=2))
@@ -0,0 +1,62 @@
+import argparse
+import json
+import sys
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from inventory_store import InventorySnapshot
+from token_budget import count_tokens
+from vector_retrieval import VehicleVectors, summarize_vehicle
+from synthetic_inventory import generate_inventory, SAMPLE_DATA
+
+# Cost of grounding Ford Expert prompts: time to embed a snapshot, time per
+# question, and the tokens the retrieved summaries add compared with listing
+# every in-stock vehicle in the prompt.
+
+QUESTIONS = [
+    "Which truck is best for towing a boat?",
+    "Is the Explorer good for families?",
+    "I want an efficient hybrid with wireless charging",
+    "Would you recommend the Bronco for off-road camping?",
+    "What has heated seats and adaptive cruise control?",
+]
+
+def measure(snapshot: InventorySnapshot, k: int, repeat: int):
+    vectors = VehicleVectors(snapshot.records)
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for question in QUESTIONS:
+            vectors.top_k(question, k)
+    query_ms = (time.perf_counter() - start) / (repeat * len(QUESTIONS)) * 1000
+
+    grounded = [
+        count_tokens("".join(f"- {summarize_vehicle(record)}\n" for record, _ in vectors.top_k(question, k)))
+        for question in QUESTIONS
+    ]
+    return {
+        "vehicles": len(snapshot.records),
+        "build_ms": round(vectors.build_ms, 1),
+        "stored_entries": int(len(vectors.column_rows)),
+        "query_ms": round(query_ms, 3),
+        "grounding_tokens_mean": round(sum(grounded) / len(grounded), 1),
+        # Only computed for small inventories; listing thousands of vehicles is not an option anyway
+        "all_vehicles_tokens": count_tokens("".join(f"- {summarize_vehicle(record)}\n" for record in snapshot.records))
+        if len(snapshot.records) <= 2000 else None,
+    }
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Vector retrieval benchmark")
+    parser.add_argument("--synthetic", type=lambda s: [int(n) for n in s.split(',')], default=[1000, 10000])
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    now = datetime.now(timezone.utc)
+    with open(SAMPLE_DATA, 'r', encoding='utf-8') as f:
+        reports = {"current_inventory": measure(InventorySnapshot("sample", json.load(f), now), args.k, args.repeat)}
+    for size in args.synthetic:
+        snapshot = InventorySnapshot("synthetic", generate_inventory(size), now)
+        reports[f"synthetic_{size}"] = measure(snapshot, args.k, args.repeat)
+    print(json.dumps(reports, indent=2))
@@ -0,0 +1,225 @@
+import argparse
+import asyncio
+import json
+import math
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict, List, Any, Optional
+
+ROOT_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT_DIR))
+import httpx
+
+# Load test for the HTTP API. Virtual users run multi-turn conversations that
+# mix /user_query, /chat_compare, /all_vehicles and /vehicle/{vin}, at each
+# concurrency level in turn. By default the app runs in-process with the fake
+# LLM backend and the in-memory database, so no network, OpenAI key or
+# Postgres is needed; --url targets a running server instead (e.g. one started
+# against a local Postgres). Reports p50/p95/p99 latency and requests per
+# second per endpoint as JSON.
+#
+# In-process runs use a single event loop, like one uvicorn worker, so
+# handlers that block the loop show up as latency that grows with concurrency.
+
+GREETINGS = ["Hi, how are you?", "Hello there!", "Hey, thanks for the help earlier"]
+QUESTIONS = [
+    "What is the horsepower of the {model}?",
+    "What colors does the {model} come in?",
+    "How much is the {model}?",
+    "Do you have any {model} in stock?",
+    "Is the {model} good for families?",
+    "Would you recommend the {model} for camping?",
+]
+FOLLOW_UPS = ["Yes, show me more", "Sure", "What about the warranty?"]
+
+def percentile(sorted_values: List[float], q: float) -> float:
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, math.ceil(q * len(sorted_values)))
+    return sorted_values[min(rank, len(sorted_values)) - 1]
+
+def conversation(rng: random.Random, vehicles: List[Dict[str, str]], turns: int) -> List[Dict[str, Any]]:
+    """One user's session: a greeting, then a mix of browsing, questions and comparisons."""
+    steps = [{"endpoint": "/user_query", "query": rng.choice(GREETINGS)}]
+    while len(steps) < turns:
+        vehicle = rng.choice(vehicles)
+        kind = rng.choices(["question", "follow_up", "vehicle", "all_vehicles", "compare"],
+                           weights=[4, 1, 2, 1, 2])[0]
+        if kind == "question":
+            steps.append({"endpoint": "/user_query",
+                          "query": rng.choice(QUESTIONS).format(model=vehicle["model"])})
+        elif kind == "follow_up":
+            steps.append({"endpoint": "/user_query", "query": rng.choice(FOLLOW_UPS)})
+        elif kind == "vehicle":
+            steps.append({"endpoint": "/vehicle/{vin}", "vin": vehicle["vin"]})
+        elif kind == "all_vehicles":
+            steps.append({"endpoint": "/all_vehicles", "limit": rng.choice([None, 20, 50])})
+        else:
+            others = [v for v in vehicles if v["vin"] != vehicle["vin"]]
+            steps.append({"endpoint": "/chat_compare",
+                          "vins": [vehicle["vin"]] + [v["vin"] for v in rng.sample(others, min(len(others), 1))]})
+    return steps
+
+async def run_step(client: httpx.AsyncClient, step: Dict[str, Any], session: Dict[str, Optional[str]]):
+    endpoint = step["endpoint"]
+    if endpoint == "/user_query":
+        response = await client.post("/user_query", json={"query": step["query"], "session_id": session["id"]})
+        if response.status_code == 200:
+            session["id"] = response.json().get("session_id") or session["id"]
+        return response
+    if endpoint == "/vehicle/{vin}":
+        return await client.get(f"/vehicle/{step['vin']}")
+    if endpoint == "/all_vehicles":
+        params = {"limit": step["limit"]} if step["limit"] else {}
+        return await client.get("/all_vehicles", params=params)
+    return await client.post("/chat_compare", json={"vehicles": step["vins"], "session_id": session["id"]})
+
+async def run_level(client: httpx.AsyncClient, conversations: List[List[Dict[str, Any]]],
+                    concurrency: int) -> Dict[str, Any]:
+    """Run every conversation with `concurrency` virtual users and summarize the latencies."""
+    latencies: Dict[str, List[float]] = {}
+    errors: Dict[str, int] = {}
+    queue: asyncio.Queue = asyncio.Queue()
+    for steps in conversations:
+        queue.put_nowait(steps)
+
+    async def user():
+        while not queue.empty():
+            steps = queue.get_nowait()
+            session: Dict[str, Optional[str]] = {"id": None}
+            for step in steps:
+                start = time.perf_counter()
+                try:
+                    response = await run_step(client, step, session)
+                    failed = response.status_code >= 400
+                except httpx.HTTPError:
+                    failed = True
+                elapsed_ms = (time.perf_counter() - start) * 1000
+                latencies.setdefault(step["endpoint"], []).append(elapsed_ms)
+                if failed:
+                    errors[step["endpoint"]] = errors.get(step["endpoint"], 0) + 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(user() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+
+    endpoints = {}
+    for endpoint, values in sorted(latencies.items()):
+        values.sort()
+        endpoints[endpoint] = {
+            "requests": len(values),
+            "errors": errors.get(endpoint, 0),
+            "rps": round(len(values) / elapsed, 2),
+            "mean_ms": round(sum(values) / len(values), 2),
+            "p50_ms": round(percentile(values, 0.50), 2),
+            "p95_ms": round(percentile(values, 0.95), 2),
+            "p99_ms": round(percentile(values, 0.99), 2),
+        }
+    total = sum(len(values) for values in latencies.values())
+    return {
+        "concurrency": concurrency,
+        "sessions": len(conversations),
+        "duration_s": round(elapsed, 3),
+        "requests": total,
+        "errors": sum(errors.values()),
+        "rps": round(total / elapsed, 2),
+        "endpoints": endpoints,
+    }
+
+async def sample_vehicles(client: httpx.AsyncClient, count: int) -> List[Dict[str, str]]:
+    response = await client.get("/all_vehicles", params={"fields": "vin,parsed_name[model]", "limit": count})
+    response.raise_for_status()
+    return [{"vin": v["vin"], "model": v.get("parsed_name", {}).get("model") or "Escape"}
+            for v in response.json()["vehicles"] if v.get("vin")]
+
+def _git_revision() -> Optional[str]:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT_DIR, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def make_client(url: Optional[str], timeout: float) -> httpx.AsyncClient:
+    if url:
+        return httpx.AsyncClient(base_url=url, timeout=timeout)
+    # Offline defaults; anything already set in the environment wins
+    os.environ.setdefault("DEALERBOT_LLM_BACKEND", "fake")
+    os.environ.setdefault("DEALERBOT_DB_BACKEND", "memory")
+    # Keep the feedback SQLite file out of the working tree
+    os.environ.setdefault("DEALERBOT_FEEDBACK_DB", os.path.join(tempfile.mkdtemp(prefix="dealerbot-loadtest-"),
+                                                                "feedback.db"))
+    from api import app
+    return httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://loadtest", timeout=timeout)
+
+def fallback_counts() -> Dict[str, Dict[str, float]]:
+    """In-process runs: LLM calls retried on a fallback model and answers replaced by a fallback, per stage."""
+    from llm_backend import llm_fallbacks
+    from deadlines import degraded_responses
+    counts: Dict[str, Dict[str, float]] = {"llm_fallbacks": {}, "degraded": {}}
+    for labels, value in llm_fallbacks.samples():
+        counts["llm_fallbacks"][labels["agent"]] = counts["llm_fallbacks"].get(labels["agent"], 0) + value
+    for labels, value in degraded_responses.samples():
+        counts["degraded"][labels["stage"]] = counts["degraded"].get(labels["stage"], 0) + value
+    return counts
+
+async def main(args) -> Dict[str, Any]:
+    rng = random.Random(args.seed)
+    async with make_client(args.url, args.timeout) as client:
+        vehicles = await sample_vehicles(client, args.vehicles)
+        if len(vehicles) < 2:
+            raise SystemExit("Need at least two vehicles in the inventory to run the load test")
+        levels = []
+        for concurrency in args.concurrency:
+            conversations = [conversation(rng, vehicles, args.turns)
+                             for _ in range(max(concurrency, args.sessions_per_user * concurrency))]
+            level = await run_level(client, conversations, concurrency)
+            print(f"[LoadTest] concurrency={concurrency}: {level['requests']} requests, "
+                  f"{level['rps']} req/s, {level['errors']} errors", file=sys.stderr)
+            levels.append(level)
+    return {
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "git_revision": _git_revision(),
+        "target": args.url or "in-process",
+        "llm_backend": None if args.url else os.environ.get("DEALERBOT_LLM_BACKEND"),
+        "db_backend": None if args.url else os.environ.get("DEALERBOT_DB_BACKEND"),
+        "fake_llm_latency_ms": None if args.url else float(os.environ.get("FAKE_LLM_LATENCY_MS", "0")),
+        "fake_llm_speed_latency": None if args.url else os.environ.get("FAKE_LLM_SPEED_LATENCY") == "true",
+        "seed": args.seed,
+        "turns": args.turns,
+        "levels": levels,
+        "fallbacks": None if args.url else fallback_counts(),
+    }
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Multi-turn load test for the dealerbot API")
+    parser.add_argument("--url", help="Base URL of a running server; omit to run the app in-process")
+    parser.add_argument("--concurrency", type=lambda s: [int(c) for c in s.split(',')], default=[1, 4, 16],
+                        help="Comma-separated concurrency levels, run in order")
+    parser.add_argument("--sessions-per-user", type=int, default=3, help="Conversations per virtual user")
+    parser.add_argument("--turns", type=int, default=8, help="Requests per conversation")
+    parser.add_argument("--vehicles", type=int, default=50, help="Vehicles sampled for questions and lookups")
+    parser.add_argument("--llm-latency-ms", type=float,
+                        help="Latency of each fake LLM call (sets FAKE_LLM_LATENCY_MS)")
+    parser.add_argument("--speed-latency", action="store_true",
+                        help="Time fake LLM calls by each model's output speed (sets FAKE_LLM_SPEED_LATENCY)")
+    parser.add_argument("--timeout", type=float, default=120.0)
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--output", help="Also write the JSON report to this file")
+    args = parser.parse_args()
+
+    if args.llm_latency_ms is not None:
+        os.environ["FAKE_LLM_LATENCY_MS"] = str(args.llm_latency_ms)
+    if args.speed_latency:
+        os.environ["FAKE_LLM_SPEED_LATENCY"] = "true"
+    report = asyncio.run(main(args))
+    text = json.dumps(report, indent=2)
+    if args.output:
+        Path(args.output).write_text(text + "\n", encoding="utf-8")
+    print(text)
@@ -0,0 +1,94 @@
+import argparse
+import json
+import random
+import string
+from pathlib import Path
+from typing import Dict, Any, Iterator
+
+# Generates synthetic inventories in the same schema as vehicle_data.json by
+# recombining the real vehicles: every synthetic vehicle gets a fresh VIN, price,
+# color, build-config image blob, feature subset and so on.
+
+ROOT_DIR = Path(__file__).resolve().parent.parent
+SAMPLE_DATA = ROOT_DIR / "vehicle_data.json"
+
+VIN_CHARS = 'ABCDEFGHJKLMNPRSTUVWXYZ0123456789'
+OPTION_CODE_CHARS = string.ascii_uppercase + string.digits
+
+def _load_templates():
+    with open(SAMPLE_DATA, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+    # Serialized once; each synthetic vehicle starts as a fresh copy from json.loads
+    return [(category, json.dumps(vehicle)) for category, vehicles in data.items() for vehicle in vehicles.values()]
+
+def _collect_values(templates, field):
+    return sorted({vehicle.get('specifications', {}).get(field) for vehicle in templates} - {None})
+
+def _image_blob(rng: random.Random, model: str, year: str) -> str:
+    # One choices() call for every character, far cheaper than choice() per character
+    count = rng.randint(10, 18)
+    chars = ''.join(rng.choices(OPTION_CODE_CHARS, k=5 * count))
+    codes = '.'.join('~' + chars[i:i + 5] for i in range(0, 5 * count, 5))
+    return f"Image[%7CFord%7C{model}%7C{year}%7C1%7C1.%7C{codes}]"
+
+def generate_inventory(count: int, seed: int = 42) -> Dict[str, Dict[str, Any]]:
+    """Generate an inventory of `count` vehicles, grouped by category like the scraper output."""
+    rng = random.Random(seed)
+    templates = _load_templates()
+    vehicles = [json.loads(template) for _, template in templates]
+    exterior_colors = _collect_values(vehicles, 'exterior_color')
+    interior_colors = _collect_values(vehicles, 'interior_color')
+    feature_pool = {
+        category: sorted({item for v in vehicles for item in v.get('features', {}).get(category, [])})
+        for category in ['exterior', 'interior', 'functional']
+    }
+
+    inventory: Dict[str, Dict[str, Any]] = {}
+    for _ in range(count):
+        category, template = rng.choice(templates)
+        vehicle = json.loads(template)
+        vin = ''.join(rng.choices(VIN_CHARS, k=17))
+        vehicle['vin'] = vin
+
+        parsed = vehicle.get('parsed_name', {})
+        year = rng.choice(['2024', '2025', '2026'])
+        parsed['year'] = year
+        model_path = str(parsed.get('model', 'Escape')).replace('®', '').replace(' ', '')
+        vehicle['vehicle_name'] = f"{year} {' '.join(vehicle.get('vehicle_name', '').split()[1:])}"
+
+        blob = _image_blob(rng, model_path, year)
+        base = f"https://build.ford.com/dig/Ford/{model_path}/{year}"
+        vehicle['main_image'] = f"{base}/HD-TILE[INTBCK]/{blob}/EXT/1/vehicle.png?imwidth=640"
+        vehicle['additional_images'] = (
+            [f"{base}/HD-THUMB[INTBCK]/{blob}/EXT/{n}/vehicle.png" for n in range(1, rng.randint(5, 9))]
+            + [f"{base}/HD-THUMB[INTBCK]/{blob}/INT/{n}/vehicle.png" for n in range(1, rng.randint(2, 5))]
+        )
+
+        vehicle['price'] = f"${rng.uniform(24000, 95000):,.2f}"
+        specs = vehicle.setdefault('specifications', {})
+        specs['exterior_color'] = rng.choice(exterior_colors)
+        specs['interior_color'] = rng.choice(interior_colors)
+
+        vehicle['features'] = {
+            category: sorted(rng.sample(items, min(len(items), rng.randint(3, 12))))
+            for category, items in feature_pool.items() if items
+        }
+        inventory.setdefault(category, {})[vin] = vehicle
+    return inventory
+
+def iter_inventory_chunks(count: int, seed: int = 42, chunk_size: int = 50000) -> Iterator[Dict[str, Dict[str, Any]]]:
+    """Generate a large inventory in pieces so the full set of dicts never has to fit in memory."""
+    for start in range(0, count, chunk_size):
+        yield generate_inventory(min(chunk_size, count - start), seed + start)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generate a synthetic vehicle inventory")
+    parser.add_argument("count", type=int, help="Number of vehicles")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", default="synthetic_vehicle_data.json")
+    args = parser.parse_args()
+
+    inventory = generate_inventory(args.count, args.seed)
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(inventory, f, indent=2, ensure_ascii=False)
+    print(f"Wrote {args.count} vehicles to {args.output}")
@@ -0,0 +1,180 @@
+import re
+from typing import Dict, List, Any, Optional
+
+# Compact in-memory vehicle records. Repeated strings (colors, drive types, warranty
+# text, feature names) are shared through a per-snapshot pool, and the image URLs,
+# which only differ in their EXT/n or INT/n suffix, are stored as one template plus
+# one byte per image. Full dicts are only rebuilt when a vehicle is output.
+
+PARSED_NAME_FIELDS = ('year', 'make', 'model', 'trim', 'vehicle_type')
+SPECIFICATION_FIELDS = ('horsepower', 'epa_range', 'torque', 'exterior_color',
+                        'interior_color', 'wheel_type', 'drive')
+FEATURE_CATEGORIES = ('exterior', 'interior', 'functional')
+
+# Key order of the records the scraper produces
+VEHICLE_FIELDS = ('vehicle_name', 'parsed_name', 'main_image', 'additional_images', 'price',
+                  'annual_mileage', 'specifications', 'features', 'warranty', 'vin')
+
+IMAGE_PATTERN = re.compile(r'^(.*)/(EXT|INT)/(\d+)/([^/]*)$')
+
+# Marks a field the original record did not have (None is a legitimate value)
+_MISSING = object()
+# Marks a main image that can be rebuilt from the image template
+_DERIVED = object()
+
+class StringPool:
+    """Shares one copy of each repeated string across a snapshot's records."""
+
+    def __init__(self):
+        self._strings: Dict[str, str] = {}
+
+    def __call__(self, value):
+        if isinstance(value, str):
+            return self._strings.setdefault(value, value)
+        return value
+
+    def tuple_of(self, values: List[Any]) -> tuple:
+        """Pool every value of a list, e.g. a feature list, as a tuple."""
+        if all(isinstance(value, str) for value in values):
+            return tuple(map(self._strings.setdefault, values, values))
+        return tuple(map(self, values))
+
+    def __len__(self):
+        return len(self._strings)
+
+class ImageSet:
+    """A list of image URLs stored as a shared prefix/suffix and one byte per image."""
+    __slots__ = ('prefix', 'suffix', 'codes', 'urls')
+
+    def __init__(self, prefix: Optional[str], suffix: Optional[str], codes: bytes, urls: Optional[tuple] = None):
+        self.prefix = prefix
+        self.suffix = suffix
+        self.codes = codes
+        self.urls = urls
+
+    @classmethod
+    def from_urls(cls, urls: List[str], pool: StringPool) -> "ImageSet":
+        prefix = suffix = None
+        codes = bytearray()
+        for url in urls:
+            match = IMAGE_PATTERN.match(url) if isinstance(url, str) else None
+            if match is not None:
+                head, side, digits, tail = match.groups()
+                number = int(digits)
+            # An index like '01' would come back as '1', so it can't be templated either
+            if (match is None or number > 127 or str(number) != digits
+                    or (prefix is not None and (head != prefix or tail != suffix))):
+                # Not templatable; keep the URLs as they are
+                return cls(None, None, b'', tuple([pool(url) for url in urls]))
+            prefix, suffix = head, tail
+            codes.append((number << 1) | (side == 'INT'))
+        return cls(pool(prefix), pool(suffix), bytes(codes))
+
+    def to_list(self) -> List[str]:
+        if self.urls is not None:
+            return list(self.urls)
+        return [f"{self.prefix}/{'INT' if code & 1 else 'EXT'}/{code >> 1}/{self.suffix}" for code in self.codes]
+
+def _tuple_of(source: Any, fields: tuple, pool: StringPool):
+    """Store a dict with known keys as a tuple; anything unusual is kept as a dict."""
+    if not isinstance(source, dict) or set(source) - set(fields):
+        return source
+    return tuple([pool(source.get(field, _MISSING)) for field in fields])
+
+def _dict_of(values: Any, fields: tuple):
+    if not isinstance(values, tuple):
+        return values
+    return {field: value for field, value in zip(fields, values) if value is not _MISSING}
+
+class CompactVehicle:
+    """A vehicle record with shared strings and templated image URLs."""
+    __slots__ = ('vin', 'vehicle_name', 'parsed_name', 'main_image', 'images', 'price',
+                 'annual_mileage', 'specifications', 'features', 'warranty', 'extra')
+
+    @classmethod
+    def from_dict(cls, vehicle: Dict[str, Any], pool: StringPool) -> "CompactVehicle":
+        record = cls()
+        record.vin = vehicle.get('vin', _MISSING)
+        record.vehicle_name = pool(vehicle.get('vehicle_name', _MISSING))
+        record.parsed_name = _tuple_of(vehicle.get('parsed_name', _MISSING), PARSED_NAME_FIELDS, pool)
+        record.price = pool(vehicle.get('price', _MISSING))
+        record.annual_mileage = pool(vehicle.get('annual_mileage', _MISSING))
+        record.specifications = _tuple_of(vehicle.get('specifications', _MISSING), SPECIFICATION_FIELDS, pool)
+        record.warranty = pool(vehicle.get('warranty', _MISSING))
+
+        images = vehicle.get('additional_images', _MISSING)
+        record.images = ImageSet.from_urls(images, pool) if isinstance(images, list) else images
+
+        # The main image is usually the first exterior image at tile size
+        main_image = vehicle.get('main_image', _MISSING)
+        if isinstance(record.images, ImageSet) and isinstance(main_image, str) \
+                and main_image == record._derived_main_image():
+            main_image = _DERIVED
+        record.main_image = pool(main_image)
+
+        features = vehicle.get('features', _MISSING)
+        if isinstance(features, dict) and all(isinstance(items, list) for items in features.values()):
+            features = tuple([(pool(category), pool.tuple_of(items)) for category, items in features.items()])
+        record.features = features
+
+        extra = {key: value for key, value in vehicle.items() if key not in VEHICLE_FIELDS}
+        record.extra = extra or None
+        return record
+
+    def _derived_main_image(self) -> Optional[str]:
+        images = self.images
+        if images.prefix is None or 'HD-THUMB' not in images.prefix:
+            return None
+        return f"{images.prefix.replace('HD-THUMB', 'HD-TILE')}/EXT/1/{images.suffix}?imwidth=640"
+
+    def field(self, key: str, default: Any = None) -> Any:
+        """Read one field, using the repo's 'outer[inner]' notation for nested keys."""
+        if '[' in key and key.endswith(']'):
+            outer, inner = key[:-1].split('[', 1)
+            if outer == 'parsed_name' and isinstance(self.parsed_name, tuple) and inner in PARSED_NAME_FIELDS:
+                value = self.parsed_name[PARSED_NAME_FIELDS.index(inner)]
+                return default if value is _MISSING else value
+            if outer == 'specifications' and isinstance(self.specifications, tuple) and inner in SPECIFICATION_FIELDS:
+                value = self.specifications[SPECIFICATION_FIELDS.index(inner)]
+                return default if value is _MISSING else value
+            if outer == 'features' and isinstance(self.features, tuple):
+                for category, items in self.features:
+                    if category == inner:
+                        return list(items)
+                return default
+            container = self.field(outer)
+            return container.get(inner, default) if isinstance(container, dict) else default
+
+        if key == 'additional_images':
+            value = self.images.to_list() if isinstance(self.images, ImageSet) else self.images
+        elif key == 'main_image':
+            value = self.main_image
+            if value is _DERIVED:
+                value = self._derived_main_image()
+        elif key == 'parsed_name':
+            value = _dict_of(self.parsed_name, PARSED_NAME_FIELDS)
+        elif key == 'specifications':
+            value = _dict_of(self.specifications, SPECIFICATION_FIELDS)
+        elif key == 'features':
+            value = self.features
+            if isinstance(value, tuple):
+                value = {category: list(items) for category, items in value}
+        elif key in VEHICLE_FIELDS:
+            value = getattr(self, key)
+        else:
+            value = self.extra.get(key, _MISSING) if self.extra else _MISSING
+        return default if value is _MISSING else value
+
+    def has(self, key: str) -> bool:
+        return self.field(key, _MISSING) is not _MISSING
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Rebuild the full vehicle dict."""
+        vehicle = {}
+        for key in VEHICLE_FIELDS:
+            value = self.field(key, _MISSING)
+            if value is not _MISSING:
+                vehicle[key] = value
+        if self.extra:
+            vehicle.update(self.extra)
+        return vehicle
@@ -0,0 +1,169 @@
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, List, Any, Optional, Tuple
+from compact_inventory import CompactVehicle
+from inventory_store import InventorySnapshot
+from metrics import metrics
+
+# Memoized vehicle comparisons. LLM comparisons are keyed by the sorted VIN set,
+# the inventory snapshot version and a coarse fingerprint of the user's context,
+# so the same comparison for users with similar interests is answered once per
+# snapshot. /chat_compare tables are deterministic and built from per-vehicle
+# rows computed once per snapshot.
+
+COMPARISON_CACHE_SIZE = int(os.getenv("COMPARISON_CACHE_SIZE", "1024"))
+CHAT_COMPARE_CACHE_SIZE = int(os.getenv("CHAT_COMPARE_CACHE_SIZE", "4096"))
+
+# Interests that change what a comparison recommends. Anything else in the
+# user's context is ignored for caching purposes.
+INTEREST_KEYWORDS = {
+    'family': ['family', 'kids', 'children', 'child', 'mother', 'father', 'mom', 'dad', 'baby', 'seats'],
+    'pets': ['dog', 'dogs', 'pet', 'pets', 'cat'],
+    'towing': ['tow', 'towing', 'trailer', 'haul', 'hauling', 'boat'],
+    'offroad': ['off-road', 'offroad', 'trail', 'camping', 'adventure', '4x4', 'awd', 'snow', 'winter'],
+    'efficiency': ['mpg', 'fuel', 'economy', 'efficient', 'efficiency', 'hybrid', 'electric', 'ev', 'range', 'gas'],
+    'performance': ['fast', 'speed', 'horsepower', 'performance', 'sporty', 'power', 'torque'],
+    'budget': ['budget', 'cheap', 'affordable', 'price', 'cost', 'afford', 'deal', 'value'],
+    'commute': ['commute', 'city', 'commuting', 'parking', 'work'],
+    'tech': ['tech', 'technology', 'screen', 'sync', 'navigation', 'carplay', 'audio'],
+    'comfort': ['comfort', 'comfortable', 'luxury', 'heated', 'quiet', 'leather'],
+}
+_KEYWORD_TO_INTEREST = {word: interest for interest, words in INTEREST_KEYWORDS.items() for word in words}
+_WORD_PATTERN = re.compile(r"[a-z0-9][a-z0-9\-]*")
+
+def context_fingerprint(user_context: str) -> str:
+    """Coarse fingerprint of a user-context summary: the sorted set of interests it mentions."""
+    interests = {_KEYWORD_TO_INTEREST[word] for word in _WORD_PATTERN.findall((user_context or '').lower())
+                 if word in _KEYWORD_TO_INTEREST}
+    return ','.join(sorted(interests)) or 'none'
+
+comparison_requests = metrics.counter(
+    'dealerbot_comparison_cache_requests_total', 'Comparison cache lookups', ('cache', 'result'))
+comparison_latency = metrics.histogram(
+    'dealerbot_comparison_latency_ms', 'Comparison latency in milliseconds', ('cache', 'result'))
+
+class ComparisonCache:
+    """LRU of comparison outputs keyed by (VINs, snapshot version, context fingerprint)."""
+
+    def __init__(self, name: str, max_entries: int):
+        self.name = name
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Tuple, Any]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Tuple) -> Optional[Any]:
+        with self._lock:
+            value = self._entries.get(key)
+            if value is not None:
+                self._entries.move_to_end(key)
+        comparison_requests.inc(cache=self.name, result='hit' if value is not None else 'miss')
+        return value
+
+    def put(self, key: Tuple, value: Any):
+        version = key[1]
+        with self._lock:
+            # Results for replaced snapshots are never looked up again
+            for stale in [k for k in self._entries if k[1] != version]:
+                del self._entries[stale]
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def __len__(self):
+        with self._lock:
+            return len(self._entries)
+
+    def stats(self) -> Dict[str, Any]:
+        hits = comparison_requests.value(cache=self.name, result='hit')
+        misses = comparison_requests.value(cache=self.name, result='miss')
+        total = hits + misses
+        latency = comparison_latency.summary()
+        return {
+            'entries': len(self),
+            'hits': hits,
+            'misses': misses,
+            'hit_rate': round(hits / total, 3) if total else 0.0,
+            'latency_ms': {result: latency[f"{self.name}|{result}"] for result in ('hit', 'miss')
+                           if f"{self.name}|{result}" in latency},
+        }
+
+def comparison_key(vehicles: List[CompactVehicle], version: str, user_context: str) -> Tuple:
+    return (tuple(sorted(vehicle.field('vin') for vehicle in vehicles)), version,
+            context_fingerprint(user_context))
+
+# Rows shown by /chat_compare, in display order
+CHAT_COMPARISON_FIELDS = [
+    ('Price', 'price'),
+    ('Year', 'parsed_name[year]'),
+    ('Model', 'parsed_name[model]'),
+    ('Trim', 'parsed_name[trim]'),
+    ('Type', 'parsed_name[vehicle_type]'),
+    ('Horsepower', 'specifications[horsepower]'),
+    ('EPA Range', 'specifications[epa_range]'),
+    ('Torque', 'specifications[torque]'),
+    ('Drive', 'specifications[drive]'),
+    ('Exterior Color', 'specifications[exterior_color]'),
+    ('Warranty', 'warranty'),
+]
+
+def chat_comparison_values(vehicle: CompactVehicle) -> Tuple:
+    """One vehicle's /chat_compare column, with the warranty cut to its first line."""
+    values = []
+    for label, key in CHAT_COMPARISON_FIELDS:
+        value = vehicle.field(key, 'N/A')
+        if key == 'warranty' and value:
+            value = str(value).split('\n')[0]
+        values.append(value if value not in [None, ""] else "N/A")
+    return tuple(values)
+
+class ChatComparisonTables:
+    """Per-snapshot /chat_compare columns plus a memo of rendered tables per VIN list."""
+
+    def __init__(self, max_entries: int = CHAT_COMPARE_CACHE_SIZE):
+        self.cache = ComparisonCache('chat_compare', max_entries)
+        self._columns: Dict[str, Tuple] = {}
+        self._version: Optional[str] = None
+        self._lock = threading.Lock()
+
+    def _columns_for(self, snapshot: InventorySnapshot) -> Dict[str, Tuple]:
+        with self._lock:
+            if self._version != snapshot.version:
+                self._columns = {vin: chat_comparison_values(record) for vin, record in snapshot.by_vin.items()}
+                self._version = snapshot.version
+            return self._columns
+
+    def compare(self, snapshot: InventorySnapshot, vehicles: List[CompactVehicle]) -> Dict[str, Any]:
+        """Comparison table for `vehicles`, in the order they were requested."""
+        # Column order follows the request, so the key keeps it
+        start = time.perf_counter()
+        key = (tuple(vehicle.field('vin') for vehicle in vehicles), snapshot.version)
+        table = self.cache.get(key)
+        if table is not None:
+            comparison_latency.observe((time.perf_counter() - start) * 1000, cache=self.cache.name, result='hit')
+            return table
+
+        columns = self._columns_for(snapshot)
+        names = [vehicle.field('vehicle_name') for vehicle in vehicles]
+        vehicle_columns = [columns.get(vehicle.field('vin')) or chat_comparison_values(vehicle)
+                           for vehicle in vehicles]
+        table = {
+            "headers": ["Feature"] + names,
+            "rows": []
+        }
+        for index, (label, _) in enumerate(CHAT_COMPARISON_FIELDS):
+            row = {"Feature": label}
+            for name, column in zip(names, vehicle_columns):
+                # Use the actual vehicle name as the key to match headers
+                row[name] = column[index]
+            table["rows"].append(row)
+        self.cache.put(key, table)
+        comparison_latency.observe((time.perf_counter() - start) * 1000, cache=self.cache.name, result='miss')
+        return table
+
+# Global comparison caches
+comparison_cache = ComparisonCache('llm_compare', COMPARISON_CACHE_SIZE)
+chat_comparison_tables = ChatComparisonTables()
@@ -0,0 +1,3 @@
+# test_db.py is a Postgres connection check and benchmarks/ holds runnable
+# scripts, not tests; keep pytest from importing them.
+collect_ignore = ["test_db.py", "benchmarks"]
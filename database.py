@@ -1,7 +1,17 @@
-import psycopg2
-from psycopg2 import pool
 from typing import List, Dict, Any
 import os
+from tracing import traced
+
+try:
+    import psycopg2
+    from psycopg2 import pool
+except ImportError:
+    psycopg2 = None
+
+# 'postgres' (the default) or 'memory' for the in-memory stand-in used by load tests
+DB_BACKEND = os.getenv("DEALERBOT_DB_BACKEND", "postgres").lower()
+# Simulated round trip per statement for the in-memory backend
+MEMORY_DB_LATENCY_MS = float(os.getenv("MEMORY_DB_LATENCY_MS", "0"))
 
 # PostgreSQL connection details
 DB_CONFIG = {
@@ -14,11 +24,18 @@ DB_CONFIG = {
 }
 
 # Create a connection pool
-connection_pool = psycopg2.pool.SimpleConnectionPool(
-    minconn=1,
-    maxconn=10,
-    **DB_CONFIG
-)
+if DB_BACKEND == "memory":
+    from memory_db import MemoryConnectionPool
+    connection_pool = MemoryConnectionPool(MEMORY_DB_LATENCY_MS)
+    print("[Database] Using the in-memory database")
+else:
+    if psycopg2 is None:
+        raise ImportError("psycopg2 is required for DEALERBOT_DB_BACKEND=postgres")
+    connection_pool = psycopg2.pool.SimpleConnectionPool(
+        minconn=1,
+        maxconn=10,
+        **DB_CONFIG
+    )
 
 def connect_db():
     """Get a connection from the pool."""
@@ -29,7 +46,7 @@ def release_connection(conn):
     connection_pool.putconn(conn)
 
 def create_table():
-    """Create the messages table if it doesn't exist."""
+    """Create the messages table if it doesn't exist and add any columns added since. Runs at API startup."""
     conn = None
     try:
         conn = connect_db()
@@ -43,6 +60,9 @@ def create_table():
                 timestamp TIMESTAMP DEFAULT NOW()
             )
         """)
+        # Routing labels the LLM produced for user messages, used to train the intent classifier
+        cursor.execute("ALTER TABLE messages ADD COLUMN IF NOT EXISTS route TEXT")
+        cursor.execute("ALTER TABLE messages ADD COLUMN IF NOT EXISTS all_vehicles BOOLEAN")
         conn.commit()
     except Exception as e:
         print(f"Error creating table: {e}")
@@ -53,6 +73,7 @@ def create_table():
             cursor.close()
             release_connection(conn)
 
+@traced('db_store_chat')
 def store_chat(chat_data: List[Dict[str, Any]]):
     """Store a list of chat messages in the database."""
     conn = None
@@ -62,8 +83,9 @@ def store_chat(chat_data: List[Dict[str, Any]]):
 
         for chat in chat_data:
             cursor.execute(
-                "INSERT INTO messages (role, message, session_id) VALUES (%s, %s, %s)",
-                (chat.get("role"), chat.get("message"), chat.get("session_id")))
+                "INSERT INTO messages (role, message, session_id, route, all_vehicles) VALUES (%s, %s, %s, %s, %s)",
+                (chat.get("role"), chat.get("message"), chat.get("session_id"),
+                 chat.get("route"), chat.get("all_vehicles")))
         
         conn.commit()
     except Exception as e:
@@ -76,6 +98,7 @@ def store_chat(chat_data: List[Dict[str, Any]]):
             cursor.close()
             release_connection(conn)
 
+@traced('db_fetch_all_chats')
 def fetch_all_chats() -> List[Dict[str, Any]]:
     """Retrieve all stored chat messages."""
     conn = None
@@ -94,6 +117,24 @@ def fetch_all_chats() -> List[Dict[str, Any]]:
             cursor.close()
             release_connection(conn)
 
+@traced('db_fetch_routing_labels')
+def fetch_routing_labels() -> List[Dict[str, Any]]:
+    """User messages in the order they were stored, with any routing labels logged for them."""
+    conn = None
+    try:
+        conn = connect_db()
+        cursor = conn.cursor()
+        cursor.execute("SELECT message, session_id, route, all_vehicles FROM messages WHERE role = 'user' ORDER BY id")
+        return [{"message": message, "session_id": session_id, "route": route, "all_vehicles": all_vehicles}
+                for message, session_id, route, all_vehicles in cursor.fetchall()]
+    except Exception as e:
+        print(f"Error fetching routing labels: {e}")
+        raise
+    finally:
+        if conn:
+            cursor.close()
+            release_connection(conn)
+
 def clear_db():
     """Delete all rows from the messages table."""
     conn = None
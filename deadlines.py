@@ -0,0 +1,290 @@
+import contextvars
+import os
+import threading
+import time
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from contextlib import contextmanager
+from typing import Dict, List, Any, Callable, Optional
+from admission import llm_limiter, LLM_MAX_REQUESTS
+from metrics import metrics
+
+# Deadlines for LLM stages. Every request gets an end-to-end budget
+# (REQUEST_SLO_S) and every stage a deadline of its own; a call gets whichever
+# is shorter. Calls run on worker threads so the caller can stop waiting when
+# the deadline passes. Abandoned calls, hedges that lost and calls started in
+# a cancellable() scope that was cancelled (e.g. speculative work nobody
+# claimed) are flagged as cancelled: a call that hasn't reached the provider
+# yet stops before taking a concurrency slot or calling it, so it doesn't take
+# a slot away from calls that can still be used. Calls already at the provider
+# finish in the background. Classification stages are hedged: when the first
+# call is slower than the stage's recent p95, an identical second call is
+# started and the first answer wins. Callers decide what to do with
+# DeadlineExceeded: a default label, a recent answer or a template.
+
+REQUEST_SLO_S = float(os.getenv("REQUEST_SLO_S", "20"))
+
+# Seconds per stage, overridable with STAGE_DEADLINE_<STAGE> (e.g. STAGE_DEADLINE_FORMATTER=8).
+# Long answers get the longest deadlines. An agent configured with a
+# max_tokens also gets a provider timeout from it (see model_registry); its
+# deadline should leave room for that timeout plus one retry on its fallback
+# model.
+DEFAULT_STAGE_DEADLINES = {
+    'controller': 6,
+    'all_vehicles': 4,
+    'data_request': 4,
+    'interest': 5,
+    'identifier': 8,
+    'formatter': 14,
+    'ford_expert': 18,
+    'inventory': 18,
+    'customer_relations': 18,
+    'comparison': 45,
+}
+DEFAULT_STAGE_DEADLINE = 10
+
+# Short-output stages that are cheap to run twice
+HEDGED_STAGES = ('controller', 'all_vehicles', 'data_request', 'interest', 'identifier')
+# Hedge after this many seconds until a stage has enough latency samples for its p95
+HEDGE_DEFAULT_AFTER_S = float(os.getenv("HEDGE_DEFAULT_AFTER_S", "2"))
+HEDGE_QUANTILE = 0.95
+HEDGE_MIN_SAMPLES = 20
+HEDGE_WINDOW = 200
+
+# Recent answers to context-free queries, served when a request can't finish in time
+FALLBACK_ANSWERS_SIZE = int(os.getenv("FALLBACK_ANSWERS_SIZE", "512"))
+
+deadline_exceeded = metrics.counter(
+    'dealerbot_stage_deadline_exceeded_total', 'LLM stages abandoned at their deadline', ('stage',))
+hedged_calls = metrics.counter(
+    'dealerbot_hedged_calls_total', 'Hedged LLM stages by which call answered first', ('stage', 'winner'))
+degraded_responses = metrics.counter(
+    'dealerbot_degraded_responses_total', 'Answers replaced by a fallback', ('stage', 'fallback'))
+slo_exceeded = metrics.counter(
+    'dealerbot_request_slo_exceeded_total', 'Queries that took longer than REQUEST_SLO_S')
+cancelled_calls = metrics.counter(
+    'dealerbot_llm_calls_cancelled_total', 'Abandoned LLM calls stopped before reaching the provider', ('stage',))
+
+class DeadlineExceeded(Exception):
+    pass
+
+class CallCancelled(DeadlineExceeded):
+    """The caller stopped waiting for this call."""
+
+def stage_deadline(stage: str) -> float:
+    default = DEFAULT_STAGE_DEADLINES.get(stage, DEFAULT_STAGE_DEADLINE)
+    return float(os.getenv(f"STAGE_DEADLINE_{stage.upper()}", str(default)))
+
+class _RequestBudget:
+    __slots__ = ('deadline', 'degraded')
+
+    def __init__(self, deadline: float):
+        self.deadline = deadline
+        self.degraded: List[str] = []
+
+_request_budget: contextvars.ContextVar[Optional[_RequestBudget]] = contextvars.ContextVar(
+    'dealerbot_request_budget', default=None)
+
+@contextmanager
+def request_deadline(slo_s: float = REQUEST_SLO_S):
+    """Give the code inside an end-to-end budget of `slo_s` seconds."""
+    start = time.perf_counter()
+    token = _request_budget.set(_RequestBudget(start + slo_s))
+    try:
+        yield
+    finally:
+        _request_budget.reset(token)
+        if time.perf_counter() - start > slo_s:
+            slo_exceeded.inc()
+
+def request_time_left() -> Optional[float]:
+    """Seconds left of the current request's budget, or None outside request_deadline()."""
+    request = _request_budget.get()
+    return None if request is None else request.deadline - time.perf_counter()
+
+class _Call:
+    __slots__ = ('stage', 'deadline', 'cancelled', 'parent', 'reached_provider')
+
+    def __init__(self, stage: str, deadline: float, parent: Optional["_Call"] = None,
+                 cancelled: Optional[threading.Event] = None):
+        self.stage = stage
+        self.deadline = deadline
+        self.cancelled = cancelled or threading.Event()
+        # The call (or cancellable() scope) this one was started from; cancelling it cancels this one
+        self.parent = parent
+        self.reached_provider = False
+
+    def is_cancelled(self) -> bool:
+        call: Optional[_Call] = self
+        while call is not None:
+            if call.cancelled.is_set():
+                return True
+            call = call.parent
+        return False
+
+# The DeadlineRunner call, or cancellable() scope, the current code runs in
+_current_call: contextvars.ContextVar[Optional[_Call]] = contextvars.ContextVar(
+    'dealerbot_current_call', default=None)
+
+@contextmanager
+def cancellable(name: str, cancelled: threading.Event):
+    """Run the code inside so that setting `cancelled` cancels the stage calls it starts.
+
+    Yields the scope; its `reached_provider` says whether any of those calls got to the provider.
+    """
+    scope = _Call(name, float('inf'), _current_call.get(), cancelled)
+    token = _current_call.set(scope)
+    try:
+        yield scope
+    finally:
+        _current_call.reset(token)
+
+def time_left(stage: str) -> float:
+    """Seconds a stage may take: its own deadline, capped by what is left of the request's.
+
+    Inside a DeadlineRunner call this is also capped by the time until its caller stops waiting.
+    """
+    budget = stage_deadline(stage)
+    request = _request_budget.get()
+    if request is not None:
+        budget = min(budget, request.deadline - time.perf_counter())
+    call = _current_call.get()
+    if call is not None:
+        budget = min(budget, call.deadline - time.perf_counter())
+    return budget
+
+def raise_if_cancelled():
+    """Raise CallCancelled if the caller of the current DeadlineRunner call stopped waiting."""
+    call = _current_call.get()
+    if call is not None and call.is_cancelled():
+        cancelled_calls.inc(stage=call.stage)
+        raise CallCancelled(f"{call.stage} call abandoned by its caller")
+
+def begin_provider_call():
+    """raise_if_cancelled(), then record that the current call is going to the provider."""
+    raise_if_cancelled()
+    call = _current_call.get()
+    while call is not None:
+        call.reached_provider = True
+        call = call.parent
+
+def degrade(stage: str, fallback: str, error: BaseException):
+    """Record that `stage` was answered by `fallback` because of `error`."""
+    print(f"[Deadline] {stage} failed ({type(error).__name__}: {error}), using {fallback} fallback")
+    degraded_responses.inc(stage=stage, fallback=fallback)
+    request = _request_budget.get()
+    if request is not None:
+        request.degraded.append(stage)
+
+def is_degraded() -> bool:
+    """Whether any part of the current request was answered by a fallback."""
+    request = _request_budget.get()
+    return bool(request and request.degraded)
+
+class StageLatencies:
+    """Recent call durations per stage, for the hedging threshold."""
+
+    def __init__(self, window: int = HEDGE_WINDOW):
+        self.window = window
+        self._samples: Dict[str, deque] = {}
+        self._lock = threading.Lock()
+
+    def record(self, stage: str, seconds: float):
+        with self._lock:
+            self._samples.setdefault(stage, deque(maxlen=self.window)).append(seconds)
+
+    def hedge_after(self, stage: str) -> float:
+        with self._lock:
+            samples = sorted(self._samples.get(stage, ()))
+        if len(samples) < HEDGE_MIN_SAMPLES:
+            return HEDGE_DEFAULT_AFTER_S
+        return samples[min(len(samples) - 1, int(HEDGE_QUANTILE * len(samples)))]
+
+class DeadlineRunner:
+    """Runs stage calls on worker threads and stops waiting at the stage's deadline."""
+
+    def __init__(self, max_workers: int = 2 * LLM_MAX_REQUESTS):
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='llm')
+        self.latencies = StageLatencies()
+
+    def _timed(self, call: _Call, func: Callable[[], Any]) -> Any:
+        _current_call.set(call)
+        raise_if_cancelled()
+        start = time.perf_counter()
+        result = func()
+        self.latencies.record(call.stage, time.perf_counter() - start)
+        return result
+
+    def _submit(self, stage: str, func: Callable[[], Any], deadline: float, calls: List[_Call]):
+        call = _Call(stage, deadline, _current_call.get())
+        calls.append(call)
+        # Worker threads see the caller's trace and request deadline
+        return self._executor.submit(contextvars.copy_context().run, self._timed, call, func)
+
+    def run(self, stage: str, func: Callable[[], Any]) -> Any:
+        timeout = time_left(stage)
+        if timeout <= 0:
+            deadline_exceeded.inc(stage=stage)
+            raise DeadlineExceeded(f"No time left for {stage}")
+        deadline = time.perf_counter() + timeout
+        flags: List[_Call] = []
+        try:
+            return self._wait(stage, func, timeout, deadline, flags)
+        finally:
+            # Whatever is still running lost or was abandoned
+            for call in flags:
+                call.cancelled.set()
+
+    def _wait(self, stage: str, func: Callable[[], Any], timeout: float, deadline: float,
+              flags: List[_Call]) -> Any:
+        calls = [self._submit(stage, func, deadline, flags)]
+        if stage in HEDGED_STAGES:
+            done, _ = wait(calls, timeout=min(self.latencies.hedge_after(stage), timeout))
+            # Hedging only uses spare capacity; it must not add to a queue
+            if not done and llm_limiter.has_capacity():
+                calls.append(self._submit(stage, func, deadline, flags))
+
+        pending, error = list(calls), None
+        while pending:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                break
+            done, still_pending = wait(pending, timeout=remaining, return_when=FIRST_COMPLETED)
+            if not done:
+                break
+            for call in done:
+                if call.exception() is None:
+                    if len(calls) > 1:
+                        hedged_calls.inc(stage=stage, winner='primary' if call is calls[0] else 'hedge')
+                    return call.result()
+                error = error or call.exception()
+            pending = list(still_pending)
+        if len(calls) > 1:
+            hedged_calls.inc(stage=stage, winner='none')
+        if error is not None and not pending:
+            raise error
+        deadline_exceeded.inc(stage=stage)
+        raise DeadlineExceeded(f"{stage} took longer than {timeout:.1f}s")
+
+class RecentAnswers:
+    """LRU of the latest answer per normalized context-free query, kept across inventory versions."""
+
+    def __init__(self, max_entries: int = FALLBACK_ANSWERS_SIZE):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, Any]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, query: str) -> Optional[Any]:
+        with self._lock:
+            return self._entries.get(query)
+
+    def put(self, query: str, answer: Any):
+        with self._lock:
+            self._entries[query] = answer
+            self._entries.move_to_end(query)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+# Global deadline runner and fallback answers
+llm_calls = DeadlineRunner()
+recent_answers = RecentAnswers()
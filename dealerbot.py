@@ -1,27 +1,57 @@
 # -*- coding: utf-8 -*-
-from crewai import Agent, Crew, Task # type: ignore
-from langchain_openai import ChatOpenAI # type: ignore
-from openai import OpenAI # type: ignore
 from dotenv import load_dotenv # type: ignore
 import ast
 import json
 import os
 import re
+import time
 from session_manager import session_manager
+from inventory_store import inventory_store
+from inventory_views import comparison_table
+from token_budget import count_tokens, clip_to_budget
+from tracing import span, traced, set_route, set_label, current_trace_id
+from prompt_builder import build_prompt, Section, user_queries_only, compact_data
+from comparison_cache import comparison_cache, comparison_key, comparison_latency
+from search_index import search_indexes, SEARCH_FIELDS
+from vector_retrieval import vehicle_vectors
+from facets import facet_indexes, facet_latency
+from availability import availability_response
+from intent_classifier import intent_classifier, intent_decisions, ROUTES
+from admission import llm_limiter, Rejected
+from deadlines import (
+    llm_calls, request_deadline, degrade, is_degraded, recent_answers, time_left,
+    raise_if_cancelled, begin_provider_call, CallCancelled
+)
+from single_flight import SingleFlight, normalize_query
+from speculation import Speculation, SPECULATIVE_ROUTING, claim
+from single_pass import single_pass_enabled, format_problems, single_pass_answers, SINGLE_PASS_INSTRUCTIONS
 from datetime import datetime
 import unicodedata
 load_dotenv() 
+# The backend reads its settings from the environment, so it is imported after load_dotenv
+from llm_backend import llm
 
 # Load FAQ and Booking Data
 SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
-VEHICLE_DATA = os.path.join(SCRIPT_DIR, "vehicle_data.json")
 
-# Set OpenAI API key
-openai_api_key = os.environ["OPENAI_API_KEY"]
+# Token budget for the user-context summary in comparison prompts
+COMPARISON_CONTEXT_TOKEN_BUDGET = int(os.getenv("COMPARISON_CONTEXT_TOKEN_BUDGET", "150"))
+COMPARISON_HISTORY_TURNS = 5
+
+# Pipeline runs shared by identical context-free queries in flight
+query_flights = SingleFlight('user_query')
+
+# The formatter's fallback for missing information, used as is when there is nothing to phrase
+NOT_IN_STOCK_RESPONSE = ("I'm sorry, I don't have that specific information right now. Would you like me to "
+                         "pass along your inquiry to a team member and have them get in touch with you?")
+# Served when a query can't be answered in time and there is no recent answer to fall back on
+DEGRADED_RESPONSE = ("I'm sorry, that's taking me longer than usual to look up. Would you like me to pass along "
+                     "your question to a team member and have them get in touch with you?")
 
 
 # Agents Setup
-dealerbot_controller_agent = Agent(
+dealerbot_controller_agent = llm.agent(
+    key='controller',
     name="Dealerbot Crew Coordinator Agent",
     role="Accepts user query and figures out which agent to offload it to for the appropriate response.",
     goal="Output the requested word after performing analysis on which agent to offload task to.",
@@ -30,19 +60,19 @@ dealerbot_controller_agent = Agent(
     - The last query and response
     - Any vehicles that were recently discussed
     - The conversation history
-    - The user's apparent interests and needs""",
-    llm=ChatOpenAI(model="gpt-4")
+    - The user's apparent interests and needs"""
 )
 
-data_request_analyzer_agent = Agent(
+data_request_analyzer_agent = llm.agent(
+    key='data_request',
     name="Data Request Analyzer Agent",
     role="Determines if a user query requires raw vehicle data or a formatted response",
     goal="Quickly analyze if the user needs raw vehicle data or a conversational response",
-    backstory="You are a simple analyzer that determines if a user needs raw vehicle data for display purposes or a conversational response. You focus on identifying specific phrases and patterns that indicate a need for detailed data.",
-    llm=ChatOpenAI(model="gpt-3.5-turbo")  # Using a lighter model for this simple task
+    backstory="You are a simple analyzer that determines if a user needs raw vehicle data for display purposes or a conversational response. You focus on identifying specific phrases and patterns that indicate a need for detailed data."
 )
 
-response_formatter_agent = Agent(
+response_formatter_agent = llm.agent(
+    key='formatter',
     name="Response Formatter Agent",
     role="Formats raw data into natural, conversational responses",
     goal="Transform raw data and responses into helpful, conversational answers that directly address the user's query",
@@ -53,11 +83,11 @@ response_formatter_agent = Agent(
     - Maintain a friendly, professional tone
     - Ensure responses are clear and easy to understand
     - Add relevant context when needed
-    - Handle both positive and negative responses appropriately""",
-    llm=ChatOpenAI(model="gpt-4")
+    - Handle both positive and negative responses appropriately"""
 )
 
-ford_expert_agent = Agent(
+ford_expert_agent = llm.agent(
+    key='ford_expert',
     name="Ford Expert Agent",
     role="Expert on all things Ford, specializing in vehicle recommendations and general Ford knowledge",
     goal="Provide accurate, helpful information about Ford vehicles and answer general Ford-related questions",
@@ -73,27 +103,27 @@ ford_expert_agent = Agent(
     - Ford's commercial vehicles
     
     You can provide detailed recommendations based on specific needs and preferences,
-    explain Ford's unique features and technologies, and answer general questions about Ford vehicles.""",
-    llm=ChatOpenAI(model="gpt-4")
+    explain Ford's unique features and technologies, and answer general questions about Ford vehicles."""
 )
 
-user_interest_agent = Agent(
+user_interest_agent = llm.agent(
+    key='interest',
     name="Dealerbot User Interest Agent",
     role="Figures out what matters to user from the provided query.",
     goal="Output the requested word after performing analysis on which agent to offload task to.",
-    backstory="Figures out what quality matters to the user.",
-    llm=ChatOpenAI(model="gpt-4")
+    backstory="Figures out what quality matters to the user."
 )
 
-provided_identifier_agent = Agent(
+provided_identifier_agent = llm.agent(
+    key='identifier',
     name="Dealerbot Identifier extractor Agent",
     role="Accepts user query and identifies what the identifier provided by the user is.",
     goal="Output the requested information after performing analysis on which agent to offload task to.",
-    backstory="Extracts the main identifier and it's value in what the user wants.",
-    llm=ChatOpenAI(model="gpt-4")
+    backstory="Extracts the main identifier and it's value in what the user wants."
 )
 
-vehicle_comparison_agent = Agent(
+vehicle_comparison_agent = llm.agent(
+    key='comparison',
     name="Vehicle Comparison Agent",
     role="Compares multiple vehicles and highlights their differences",
     goal="Provide a clear, concise comparison of multiple vehicles, focusing on their differences",
@@ -104,34 +134,83 @@ vehicle_comparison_agent = Agent(
     - Provide clear, easy-to-understand comparisons
     - Consider different buyer priorities (family, performance, efficiency, etc.)
     - Format the comparison in a structured way
-    - Include both technical specifications and practical differences""",
-    llm=ChatOpenAI(model="gpt-4")
+    - Include both technical specifications and practical differences"""
 )
 
-all_vehicles_query_agent = Agent(
+all_vehicles_query_agent = llm.agent(
+    key='all_vehicles',
     name="All Vehicles Query Detector",
     role="Determines if the user is requesting to see all vehicles for a given make, model, type, or the entire inventory.",
     goal="Return 'true' if the user wants to see all vehicles (not just a summary or a single vehicle), otherwise 'false'.",
-    backstory="You are a lightweight classifier that, given a user query and context, determines if the user is explicitly asking to see all vehicles for a category (make, model, type) or making a general inquiry about them. You do not rely on hardcoded keywords, but on intent.",
-    llm=ChatOpenAI(model="gpt-3.5-turbo")
+    backstory="You are a lightweight classifier that, given a user query and context, determines if the user is explicitly asking to see all vehicles for a category (make, model, type) or making a general inquiry about them. You do not rely on hardcoded keywords, but on intent."
 )
 
-customer_relations_agent = Agent(
+customer_relations_agent = llm.agent(
+    key='customer_relations',
     name="Customer Relations Agent",
     role="Friendly conversationalist and customer relations specialist",
     goal="Engage users in friendly conversation, handle greetings, small talk, and gently steer the conversation back to Ford vehicles when appropriate.",
-    backstory="You are the friendly face of DealerBot. You handle general conversation, greetings, and off-topic queries with warmth and professionalism. If the user is off-topic, you gently and politely try to bring the conversation back to Ford vehicles, but never pushy.",
-    llm=ChatOpenAI(model="gpt-4")
+    backstory="You are the friendly face of DealerBot. You handle general conversation, greetings, and off-topic queries with warmth and professionalism. If the user is off-topic, you gently and politely try to bring the conversation back to Ford vehicles, but never pushy."
 )
 
 
+# ---- Crew Helpers ----
+def _call_llm(stage, agent, task):
+    # A call whose caller gave up while it queued doesn't reach the provider
+    raise_if_cancelled()
+    with llm_limiter.slot(time_left(stage)):
+        begin_provider_call()
+        return llm.run(agent, task)
+
+def _run_task(stage, agent, task, fallback=None):
+    """
+    Run a task on the configured LLM backend under a tracing span and the
+    stage's deadline, and return its stripped output. When the call fails or
+    runs out of time, `fallback` is returned instead if one is given.
+    """
+    with span(stage):
+        try:
+            return llm_calls.run(stage, lambda: _call_llm(stage, agent, task))
+        except CallCancelled:
+            # Nobody needs the answer any more, so there is nothing to fall back to
+            raise
+        except Rejected:
+            # No slot for the call: the client is told to retry rather than sent a fallback
+            raise
+        except Exception as e:
+            if fallback is None:
+                raise
+            degrade(stage, 'default', e)
+            return fallback
+
+# ---- Prompt Helpers ----
+def history_section(history_context, prefix=""):
+    """Conversation history is the first thing trimmed when a prompt runs over budget."""
+    return Section('history', f"{prefix}{history_context}\n", priority=3, summarize=user_queries_only)
+
+def render_raw_response(raw_response):
+    """Data handed to the formatter; structured data is sent as compact JSON."""
+    if isinstance(raw_response, (list, dict)):
+        return json.dumps(raw_response, ensure_ascii=False, separators=(',', ':'), default=str)
+    return raw_response
+
+
 # ---- Executor Functions ----
-def handle_ford_expert_query(user_query, history_context):
+def handle_ford_expert_query(user_query, history_context, single_pass=False):
     """Handle general Ford-related queries using the Ford expert agent."""
-    expert_task = Task(
-        description=(
-            f"Answer the following Ford-related question: '{user_query}'\n"
-            f"{history_context}\n"
+    # Ground the answer in the few in-stock vehicles closest to the question
+    with span('retrieval'):
+        grounding = vehicle_vectors.ground(inventory_store.current(), user_query)
+    inventory_context = ""
+    if grounding:
+        inventory_context = ("In-stock vehicles relevant to the question (recommend from these when they fit, "
+                             "and mention the exact vehicle name):\n" + "".join(f"- {line}\n" for line in grounding) + "\n")
+    expert_task = llm.task(
+        description=build_prompt('ford_expert', [
+            Section('query', f"Answer the following Ford-related question: '{user_query}'\n", priority=1),
+            Section('inventory', inventory_context, priority=2),
+            history_section(history_context),
+            Section('instructions',
             "Provide a detailed, helpful response that:\n"
             "1. Directly addresses the user's question\n"
             "2. Includes specific Ford models and features when relevant\n"
@@ -142,80 +221,68 @@ def handle_ford_expert_query(user_query, history_context):
             "7. Provides specific model names and trim levels when making recommendations\n"
             "8. Includes relevant safety features and capabilities\n"
             "9. Considers different needs (family, performance, efficiency, etc.)\n"
-            "10. Stays within Ford's current lineup and technologies"
-        ),
+            "10. Stays within Ford's current lineup and technologies"),
+            Section('format', f"\n\n{SINGLE_PASS_INSTRUCTIONS}" if single_pass else "")
+        ]),
         agent=ford_expert_agent,
-        expected_output="A detailed, helpful response about Ford vehicles that directly answers the user's question."
+        expected_output="A short, conversational reply ready to show the customer that directly answers their question."
+        if single_pass else "A detailed, helpful response about Ford vehicles that directly answers the user's question."
     )
 
-    expert_crew = Crew(agents=[ford_expert_agent], tasks=[expert_task])
-    return expert_crew.kickoff().raw.strip()
+    return _run_task('ford_expert', ford_expert_agent, expert_task)
 
+@traced('filter')
 def return_vehicle_data(inquiry):
-    # Load vehicle data from JSON file
-    with open(VEHICLE_DATA, "r") as file:
-        vehicle_data = json.load(file)
-
-    # Collect all vehicles from all categories
-    all_vehicles = []
-    for category in vehicle_data.values():
-        all_vehicles.extend(vehicle.copy() for vehicle in category.values())
+    # Filter the compact records of the current inventory snapshot
+    snapshot = inventory_store.current()
+    filtered_vehicles = snapshot.records
+    text_scores = {}
 
     # Start with all vehicles and apply each filter sequentially
-    filtered_vehicles = all_vehicles
     for key, value in inquiry.items():
         if value is None or value == "Unknown":
             continue
+        if key in SEARCH_FIELDS:
+            # Free-text fields (features, warranty) are matched with the BM25 index
+            scores = search_indexes.get(snapshot).field_scores(key, str(value))
+            if scores is not None:
+                filtered_vehicles = [vehicle for vehicle in filtered_vehicles if vehicle.vin in scores]
+                for vin, score in scores.items():
+                    text_scores[vin] = text_scores.get(vin, 0.0) + score
+                continue
         inquiry_val = str(value).strip().lower()
-        # Handle nested keys (e.g., parsed_name[make])
-        if '[' in key and ']' in key:
-            outer_key, inner_key = key.split('[')
-            inner_key = inner_key.rstrip(']')
-            debug_pairs = []
-            for vehicle in filtered_vehicles:
-                if isinstance(vehicle, dict) and outer_key in vehicle and isinstance(vehicle[outer_key], dict) and inner_key in vehicle[outer_key]:
-                    data_val = str(vehicle[outer_key][inner_key]).strip().lower()
-                    debug_pairs.append((inquiry_val, data_val, vehicle.get('vehicle_name', vehicle.get('vin', 'unknown'))))
-            filtered_vehicles = [
-                vehicle for vehicle in filtered_vehicles
-                if isinstance(vehicle, dict)
-                and outer_key in vehicle
-                and isinstance(vehicle[outer_key], dict)
-                and inner_key in vehicle[outer_key]
-                and inquiry_val in str(vehicle[outer_key][inner_key]).strip().lower()
-            ]
-        else:
-            debug_pairs = []
-            for vehicle in filtered_vehicles:
-                if isinstance(vehicle, dict) and key in vehicle:
-                    data_val = str(vehicle[key]).strip().lower()
-                    debug_pairs.append((inquiry_val, data_val, vehicle.get('vehicle_name', vehicle.get('vin', 'unknown'))))
-            filtered_vehicles = [
-                vehicle for vehicle in filtered_vehicles
-                if isinstance(vehicle, dict)
-                and key in vehicle
-                and inquiry_val in str(vehicle[key]).strip().lower()
-            ]
-    return filtered_vehicles if filtered_vehicles else "Not in stock"
+        # Nested keys (e.g., parsed_name[make]) are resolved by the record itself
+        filtered_vehicles = [
+            vehicle for vehicle in filtered_vehicles
+            if vehicle.has(key)
+            and inquiry_val in str(vehicle.field(key)).strip().lower()
+        ]
+    if text_scores:
+        # Best free-text matches first
+        filtered_vehicles = sorted(filtered_vehicles, key=lambda vehicle: -text_scores.get(vehicle.vin, 0.0))
+    # Only the matches are expanded back into full dicts
+    return [vehicle.to_dict() for vehicle in filtered_vehicles] if filtered_vehicles else "Not in stock"
 
 def analyze_vehicle_query(user_query):
     """Analyze a vehicle-specific query to determine interest and search parameters."""
-    interest_task = Task(
-        description=(
-            f"Analyze the following user query: '{user_query}' and determine what the user's main interest is. "
+    interest_task = llm.task(
+        description=build_prompt('interest', [
+            Section('query', f"Analyze the following user query: '{user_query}' and determine what the user's main interest is. ", priority=1),
+            Section('instructions',
             "Output the exact interest the user wants."
             "Your response must be concise and direct with a simple one word response, your options are : "
             "parsed_name[year], parsed_name[make], parsed_name[model], parsed_name[trim], parsed_name[vehicle_type], "
             "price, annual_mileage, specifications[horsepower], specifications[epa_range], specifications[torque], "
             "specifications[exterior_color], specifications[interior_color], specifications[wheel_type], specifications[drive], "
-            "features[exterior], features[interior], features[functional], warranty, vin."
-        ),
+            "features[exterior], features[interior], features[functional], warranty, vin.")
+        ]),
         agent=user_interest_agent,
         expected_output="A one word answer matching one of the specified options.",
     )
-    inquiry_task = Task(
-        description=(
-            f"Analyze the following user query: '{user_query}' and determine what the user's main search parameter(s) is/are. "
+    inquiry_task = llm.task(
+        description=build_prompt('identifier', [
+            Section('query', f"Analyze the following user query: '{user_query}' and determine what the user's main search parameter(s) is/are. ", priority=1),
+            Section('instructions',
             "Output the exact search parameter(s) the user wants. "
             "Your response MUST be a python dictionary type output with the identifier(s) and the corresponding values from the user query. "
             "Your identifier options are:\n"
@@ -248,35 +315,28 @@ def analyze_vehicle_query(user_query):
             "- 'Are there any 2025 ST-Line trims available?' -> {'parsed_name[year]': '2025', 'parsed_name[trim]': 'ST-Line'}\n"
             "- 'What is the horsepower of the 2024 Bronco?' -> {'parsed_name[year]': '2024', 'parsed_name[model]': 'Bronco', 'specifications[horsepower]': 'Unknown'}\n"
             "- 'Do you have any Ford vehicles?' -> {'parsed_name[make]': 'Ford'}\n"
-            "- 'Tell me about the Escape ST-Line' -> {'parsed_name[model]': 'Escape', 'parsed_name[trim]': 'ST-Line'}\n"
-        ),
+            "- 'Tell me about the Escape ST-Line' -> {'parsed_name[model]': 'Escape', 'parsed_name[trim]': 'ST-Line'}\n")
+        ]),
         agent=provided_identifier_agent,
         expected_output="Only a STRICT python dictionary containing whatever the parameters the user wants to make the search by, where the key(s) must be from the specified list."
     )
 
-    interest_crew = Crew(agents=[user_interest_agent], tasks=[interest_task])
-    interest_decision = interest_crew.kickoff().raw.strip()
-    inquiry_crew = Crew(agents=[provided_identifier_agent], tasks=[inquiry_task])
-    inquiry_decision = inquiry_crew.kickoff().raw.strip()
+    interest_decision = _run_task('interest', user_interest_agent, interest_task, fallback='Unknown')
+    inquiry_decision = _run_task('identifier', provided_identifier_agent, inquiry_task)
 
     interest = interest_decision
-    print(f"Interest: {interest}")
-    print("" + "-" * 50)
     try:
         inquiry = ast.literal_eval(inquiry_decision)
-        print(f"Inquiry Decision: {inquiry_decision}")
-        print("" + "-" * 50)
     except Exception:
         inquiry = {}  # fallback if parsing fails
 
-    print(f"Inquiry: {inquiry}")
-    print("" + "-" * 50)
     return interest, inquiry
 
-def get_vehicle_data(user_query):
-    """Get specific vehicle data based on the query."""
-    interest, inquiry = analyze_vehicle_query(user_query)
-    vehicles = return_vehicle_data(inquiry)
+def get_vehicle_data(user_query, analysis=None, vehicles=None):
+    """Get specific vehicle data based on the query, reusing an analysis and matches already made for it."""
+    interest, inquiry = analysis or analyze_vehicle_query(user_query)
+    if vehicles is None:
+        vehicles = return_vehicle_data(inquiry)
     def get_nested_value(vehicle, interest):
         if '[' in interest and ']' in interest:
             outer, inner = interest.split('[')
@@ -304,11 +364,14 @@ def get_vehicle_data(user_query):
 
 def format_response(user_query, raw_response):
     print(f"Passing to formatter agent: user_query='{user_query}', raw_response='{raw_response}'")
-    format_task = Task(
-        description=(
+    format_task = llm.task(
+        description=build_prompt('formatter', [
+            Section('query',
             f"Format the following response into a natural, conversational answer.\n\n"
-            f"User's query: '{user_query}'\n"
-            f"Raw response: {raw_response}\n\n"
+            f"User's query: '{user_query}'\n", priority=1),
+            Section('raw_response', f"Raw response: {render_raw_response(raw_response)}\n\n",
+                    priority=2, summarize=compact_data),
+            Section('instructions',
             "Your response should:\n"
             "1. Directly answer the user's question\n"
             "2. Be conversational and friendly\n"
@@ -319,20 +382,33 @@ def format_response(user_query, raw_response):
             "7. Format lists and data in an easy-to-read way\n"
             "8. Add context when needed to make the response more helpful\n"
             "9. NEVER suggest visiting any external website or contacting another dealership.\n"
-            "10. If the information is missing or unknown, use this fallback: 'I'm sorry, I don't have that specific information right now. Would you like me to pass along your inquiry to a team member and have them get in touch with you?'\nIMPORTANT; ALWAYS KEEP RESPONSES SHORT AND TO THE POINT, assume the user is impatient and you need to close the deal as soon as possible."
-        ),
+            "10. If the information is missing or unknown, use this fallback: 'I'm sorry, I don't have that specific information right now. Would you like me to pass along your inquiry to a team member and have them get in touch with you?'\nIMPORTANT; ALWAYS KEEP RESPONSES SHORT AND TO THE POINT, assume the user is impatient and you need to close the deal as soon as possible.")
+        ]),
         agent=response_formatter_agent,
         expected_output="A natural, conversational response that directly answers the user's query while incorporating the raw data in a helpful way."
     )
 
-    format_crew = Crew(agents=[response_formatter_agent], tasks=[format_task])
-    return format_crew.kickoff().raw.strip()
+    try:
+        return _run_task('formatter', response_formatter_agent, format_task)
+    except Rejected:
+        raise
+    except Exception as e:
+        # Without the formatter, answers that already read well are sent as they are
+        if raw_response == "Not in stock":
+            answer = NOT_IN_STOCK_RESPONSE
+        elif isinstance(raw_response, str) and not format_problems(raw_response):
+            answer = raw_response.strip()
+        else:
+            raise
+        degrade('formatter', 'unformatted', e)
+        return answer
 
 def analyze_data_request(user_query):
     """Determine if the user needs raw vehicle data or a formatted response."""
-    analyzer_task = Task(
-        description=(
-            f"Analyze the following user query: '{user_query}'\n\n"
+    analyzer_task = llm.task(
+        description=build_prompt('data_request', [
+            Section('query', f"Analyze the following user query: '{user_query}'\n\n", priority=1),
+            Section('instructions',
             "Determine if this is a request for raw vehicle data that should be displayed in detail, "
             "or if it's a general inquiry that should get a conversational response.\n\n"
             "Return exactly one of these two responses:\n"
@@ -343,49 +419,113 @@ def analyze_data_request(user_query):
             "- 'What's the price of the 2024 Escape?' -> 'formatted'\n"
             "- 'Do you have any Mustangs?' -> 'formatted'\n"
             "- 'Show me the specs for the F-150' -> 'raw_data'\n"
-            "- 'Tell me about your inventory' -> 'formatted'"
-        ),
+            "- 'Tell me about your inventory' -> 'formatted'")
+        ]),
         agent=data_request_analyzer_agent,
         expected_output="Either 'raw_data' or 'formatted'"
     )
 
-    analyzer_crew = Crew(agents=[data_request_analyzer_agent], tasks=[analyzer_task])
-    return analyzer_crew.kickoff().raw.strip()
+    return _run_task('data_request', data_request_analyzer_agent, analyzer_task, fallback='formatted')
 
 def is_all_vehicles_query_agent(user_query, history_context=""):
-    task = Task(
-        description=(
-            f"Given the following user query and context, determine if the user is requesting to see all vehicles for a make, model, type, year, or trim.\n"
-            f"User query: '{user_query}'\n"
-            f"Context: {history_context}\n"
+    task = llm.task(
+        description=build_prompt('all_vehicles', [
+            Section('task', "Given the following user query and context, determine if the user is requesting to see all vehicles for a make, model, type, year, or trim.\n"),
+            Section('query', f"User query: '{user_query}'\n", priority=1),
+            history_section(history_context, prefix="Context: "),
+            Section('instructions',
             "Return 'true' if the user wants to see all vehicles matching a specific make, model, type, year, or trim (not just a summary or a single vehicle), otherwise return 'false'.\n"
             "If the user says 'show me all vehicles' with NO filter, return 'false' and do NOT return the entire inventory.\n"
             "If the user requests to see all vehicles and context shows that the user wants a specific vwhicle, return true.\n"
             "Examples of 'all' queries: 'Show me all Escape vehicles', 'Show me every Bronco', 'Show all 2024 Mustangs', 'Show me the Escape vehicles', 'What Escape vehicles do you have?', etc.\n"
-            "Examples of NOT 'all' queries: 'Show me all vehicles' (no filter), 'Do you have any Escapes?', 'Is there a Bronco in stock?', 'Tell me about the F-150', 'What is the price of the Mustang?', etc."
-        ),
+            "Examples of NOT 'all' queries: 'Show me all vehicles' (no filter), 'Do you have any Escapes?', 'Is there a Bronco in stock?', 'Tell me about the F-150', 'What is the price of the Mustang?', etc.")
+        ]),
         agent=all_vehicles_query_agent,
         expected_output="'true' or 'false'"
     )
-    crew = Crew(agents=[all_vehicles_query_agent], tasks=[task])
-    result = crew.kickoff().raw.strip().lower()
+    result = _run_task('all_vehicles', all_vehicles_query_agent, task).lower()
     return result == 'true'
 
-def handle_customer_relations_query(user_query, history_context):
+def route_query_agent(user_query, history_context=""):
+    """Ask the controller agent which route should answer the query."""
+    controller_task = llm.task(
+        description=build_prompt('controller', [
+            Section('query', f"Analyze this query: '{user_query}'\n", priority=1),
+            history_section(history_context),
+            Section('instructions',
+            "Choose one: 'Specific Vehicle', 'Inventory Search', 'Ford Expert', 'Customer Relations', 'Follow-up', or 'Show Form'\n\n"
+            "Guidelines:\n"
+            "- Specific Vehicle: Questions about vehicle properties (e.g., specs, features, price, color, trim, VIN, etc.)\n"
+            "- Inventory Search: Checking stock availability\n"
+            "- Ford Expert: General Ford questions, recommendations, suitability, or opinion-based queries (e.g., 'Is X good for Y?', 'Would you recommend...?', 'Is this a good fit for...?')\n"
+            "- Customer Relations: Greetings, small talk, off-topic conversation, or general chit-chat (e.g., 'Hi, how are you?', 'What's the weather?', 'Tell me a joke', etc.). If the user's query is not about Ford vehicles or is just a greeting, use this.\n"
+            "- Follow-up: Responses to previous info (e.g., 'show me', 'yes')\n"
+            "- Show Form: Test drive/quote/contact requests\n\n"
+            "IMPORTANT: If the user asks whether a vehicle is suitable for a particular lifestyle, family, pets, or requests a recommendation or opinion, route to 'Ford Expert', even if a specific model or trim is mentioned., but if the user is just making small talk, greeting, or is off-topic, route to 'Customer Relations'.\n"
+            "Examples:\n"
+            "- 'Hi, how are you doing today?' => Customer Relations\n"
+            "- 'What's your favorite color?' => Customer Relations\n"
+            "- 'Tell me a joke' => Customer Relations\n"
+            "- 'Do you have any Escape vehicles in stock?' => Inventory Search\n"
+            "- 'What is the horsepower of the Escape ST-Line?' => Specific Vehicle\n"
+            "- 'Would you recommend the Bronco Sport for camping?' => Ford Expert\n"
+            "- 'Do you think the Escape ST-Line is good for a mother of 3 and 2 dogs like myself?' => Ford Expert\n"
+            "- 'Would you recommend the Bronco Sport for camping?' => Ford Expert\n"
+            "- 'Is the Mustang a good car for winter driving?' => Ford Expert\n"
+            "- 'What is the horsepower of the Escape ST-Line?' => Specific Vehicle\n"
+            "- 'Would you recommend the Bronco Sport for camping?' => Ford Expert\n")
+        ]),
+        agent=dealerbot_controller_agent,
+        expected_output="One of: 'Specific Vehicle', 'Inventory Search', 'Ford Expert', 'Customer Relations', 'Follow-up', or 'Show Form'"
+    )
+    return _run_task('controller', dealerbot_controller_agent, controller_task)
+
+def handle_customer_relations_query(user_query, history_context, single_pass=False):
     """Handle general conversation and customer relations queries."""
-    relations_task = Task(
-        description=(
-            f"Engage in a friendly, conversational way with the user.\n"
-            f"User's message: '{user_query}'\n"
-            f"{history_context}\n"
+    relations_task = llm.task(
+        description=build_prompt('customer_relations', [
+            Section('task', "Engage in a friendly, conversational way with the user.\n"),
+            Section('query', f"User's message: '{user_query}'\n", priority=1),
+            history_section(history_context),
+            Section('instructions',
             "If the conversation is off-topic, gently and politely steer it back to Ford vehicles, but do not be pushy.\n"
-            "Always be warm, professional, and helpful."
-        ),
+            "Always be warm, professional, and helpful."),
+            Section('format', f"\n\n{SINGLE_PASS_INSTRUCTIONS}" if single_pass else "")
+        ]),
         agent=customer_relations_agent,
         expected_output="A friendly, conversational response that gently steers the user back to Ford vehicles if needed."
     )
-    relations_crew = Crew(agents=[customer_relations_agent], tasks=[relations_task])
-    return relations_crew.kickoff().raw.strip()
+    return _run_task('customer_relations', customer_relations_agent, relations_task)
+
+def finish_response(route, user_query, answer, single_pass):
+    """
+    The reply for the user: a single-pass answer as is when it passes the
+    format checks, otherwise the answer reworded by the formatter agent.
+    """
+    if single_pass:
+        problems = format_problems(answer)
+        if not problems:
+            single_pass_answers.inc(route=route, outcome='accepted')
+            return answer.strip()
+        print(f"[SinglePass] {route} answer failed format checks ({', '.join(problems)}), reformatting")
+        single_pass_answers.inc(route=route, outcome='reformatted')
+    return format_response(user_query, answer)
+
+def _remember(session_id, conversation_history, user_query, remembered):
+    """Record the turn in the caller's session; `remembered` is None for turns that aren't kept."""
+    if session_id and remembered is not None:
+        context_updates = {
+            'last_query': user_query,
+            'last_response': remembered['response'],
+            'conversation_history': conversation_history + [{
+                'query': user_query,
+                'response': remembered['response'],
+                'timestamp': datetime.now().isoformat()
+            }]
+        }
+        if 'last_vehicles' in remembered:
+            context_updates['last_vehicles'] = remembered['last_vehicles']
+        session_manager.update_session(session_id, context_updates)
 
 def query_dealerbot_agent(user_query, session_id=None):
     """Main entry point for the dealerbot system. Routes queries to appropriate handlers."""
@@ -413,52 +553,121 @@ def query_dealerbot_agent(user_query, session_id=None):
                 response_summary = response_summary[:200] + "..."
             history_context += f"Assistant: {response_summary}\n"
 
+    context_free = not (conversation_history or (session_context or {}).get('last_response')
+                        or (session_context or {}).get('last_vehicles'))
+    with request_deadline():
+        try:
+            if context_free:
+                # Identical context-free queries in flight share one run of the pipeline
+                key = (normalize_query(user_query), inventory_store.current().version)
+                response, remembered, route = query_flights.run(key, lambda: _answer_context_free(user_query))
+            else:
+                response, remembered, route = _answer_query(user_query, session_context, conversation_history, history_context)
+        except Rejected:
+            raise
+        except Exception as e:
+            response, remembered, route = _fallback_answer(user_query, context_free, e)
+    set_route(route)
+    _remember(session_id, conversation_history, user_query, remembered)
+    return response
+
+def _answer_context_free(user_query):
+    """Answer a query with no session context, keeping complete answers as fallbacks for later."""
+    answer = _answer_query(user_query, None, [], "")
+    _, remembered, _ = answer
+    if remembered is not None and not is_degraded():
+        recent_answers.put(normalize_query(user_query), answer)
+    return answer
+
+def _fallback_answer(user_query, context_free, error):
+    """A recent answer to the same context-free query if there is one, otherwise an apology."""
+    cached = recent_answers.get(normalize_query(user_query)) if context_free else None
+    if cached is not None:
+        degrade('request', 'cached', error)
+        response, remembered, _ = cached
+        return response, remembered, 'Fallback'
+    degrade('request', 'template', error)
+    return DEGRADED_RESPONSE, {'response': DEGRADED_RESPONSE}, 'Fallback'
+
+def _speculate(user_query, history_context, all_vehicles, routing_decision):
+    """
+    Start the LLM routing decisions the classifier couldn't make, together with
+    the filter extraction and the inventory filter, before knowing which are needed.
+    """
+    if not SPECULATIVE_ROUTING or (all_vehicles is not None and routing_decision is not None):
+        return None
+    speculation = Speculation()
+    if all_vehicles is None:
+        speculation.launch('all_vehicles', lambda: is_all_vehicles_query_agent(user_query, history_context))
+    if routing_decision is None:
+        speculation.launch('controller', lambda: route_query_agent(user_query, history_context))
+    speculation.launch('extraction', lambda: analyze_vehicle_query(user_query))
+    speculation.launch('filter', lambda analysis: return_vehicle_data(analysis[1]), after='extraction')
+    return speculation
+
+def _answer_query(user_query, session_context, conversation_history, history_context):
+    """
+    Run the agent pipeline for one query without touching the session.
+    Returns (response, what to remember in the session or None, route).
+    """
+    # The local classifier answers when confident; LLM answers are logged as training labels
+    has_history = bool(conversation_history)
+    all_vehicles = intent_classifier.all_vehicles(user_query, has_history)
+    routing_decision = intent_classifier.route(user_query, has_history)
+    speculation = _speculate(user_query, history_context, all_vehicles, routing_decision)
+    try:
+        return _route_query(user_query, session_context, history_context,
+                            all_vehicles, routing_decision, speculation)
+    finally:
+        if speculation is not None:
+            speculation.finish()
+
+def _route_query(user_query, session_context, history_context, all_vehicles, routing_decision, speculation):
     # --- Handle 'all vehicles' queries ---
-    if is_all_vehicles_query_agent(user_query, history_context):
+    if all_vehicles is None:
+        try:
+            all_vehicles = claim(speculation, 'all_vehicles', lambda: is_all_vehicles_query_agent(user_query, history_context))
+        except Rejected:
+            raise
+        except Exception as e:
+            # Answer the query as it stands rather than listing vehicles
+            degrade('all_vehicles', 'default', e)
+            all_vehicles = False
+        else:
+            set_label('all_vehicles', all_vehicles)
+            intent_decisions.inc(task='all_vehicles', source='llm')
+    else:
+        intent_decisions.inc(task='all_vehicles', source='classifier')
+    if all_vehicles:
+        set_route('All Vehicles')
         # Extract filters from the query
-        _, inquiry = analyze_vehicle_query(user_query)
+        _, inquiry = claim(speculation, 'extraction', lambda: analyze_vehicle_query(user_query))
         filters = [k for k in inquiry.keys() if k in [
             'parsed_name[make]', 'parsed_name[model]', 'parsed_name[vehicle_type]', 'parsed_name[year]', 'parsed_name[trim]'] and inquiry[k] != 'Unknown']
         if not filters:
-            return {"type": "info", "message": "Please specify a make, model, type, year, or trim to see all matching vehicles. For example, 'Show me all Escape vehicles'.", "data": None}
+            return {"type": "info", "message": "Please specify a make, model, type, year, or trim to see all matching vehicles. For example, 'Show me all Escape vehicles'.", "data": None}, None, 'All Vehicles'
         # Return all vehicles matching the filter as raw_data
-        vehicles = return_vehicle_data(inquiry)
-        return {"type": "raw_data", "data": vehicles}
-
-    controller_task = Task(
-        description=(
-            f"Analyze this query: '{user_query}'\n"
-            f"{history_context}\n"
-            "Choose one: 'Specific Vehicle', 'Inventory Search', 'Ford Expert', 'Customer Relations', 'Follow-up', or 'Show Form'\n\n"
-            "Guidelines:\n"
-            "- Specific Vehicle: Questions about vehicle properties (e.g., specs, features, price, color, trim, VIN, etc.)\n"
-            "- Inventory Search: Checking stock availability\n"
-            "- Ford Expert: General Ford questions, recommendations, suitability, or opinion-based queries (e.g., 'Is X good for Y?', 'Would you recommend...?', 'Is this a good fit for...?')\n"
-            "- Customer Relations: Greetings, small talk, off-topic conversation, or general chit-chat (e.g., 'Hi, how are you?', 'What's the weather?', 'Tell me a joke', etc.). If the user's query is not about Ford vehicles or is just a greeting, use this.\n"
-            "- Follow-up: Responses to previous info (e.g., 'show me', 'yes')\n"
-            "- Show Form: Test drive/quote/contact requests\n\n"
-            "IMPORTANT: If the user asks whether a vehicle is suitable for a particular lifestyle, family, pets, or requests a recommendation or opinion, route to 'Ford Expert', even if a specific model or trim is mentioned., but if the user is just making small talk, greeting, or is off-topic, route to 'Customer Relations'.\n"
-            "Examples:\n"
-            "- 'Hi, how are you doing today?' => Customer Relations\n"
-            "- 'What's your favorite color?' => Customer Relations\n"
-            "- 'Tell me a joke' => Customer Relations\n"
-            "- 'Do you have any Escape vehicles in stock?' => Inventory Search\n"
-            "- 'What is the horsepower of the Escape ST-Line?' => Specific Vehicle\n"
-            "- 'Would you recommend the Bronco Sport for camping?' => Ford Expert\n"
-            "- 'Do you think the Escape ST-Line is good for a mother of 3 and 2 dogs like myself?' => Ford Expert\n"
-            "- 'Would you recommend the Bronco Sport for camping?' => Ford Expert\n"
-            "- 'Is the Mustang a good car for winter driving?' => Ford Expert\n"
-            "- 'What is the horsepower of the Escape ST-Line?' => Specific Vehicle\n"
-            "- 'Would you recommend the Bronco Sport for camping?' => Ford Expert\n"
-        ),
-        agent=dealerbot_controller_agent,
-        expected_output="One of: 'Specific Vehicle', 'Inventory Search', 'Ford Expert', 'Customer Relations', 'Follow-up', or 'Show Form'"
-    )
-
-    controller_crew = Crew(agents=[dealerbot_controller_agent], tasks=[controller_task])
-    routing_decision = controller_crew.kickoff().raw.strip()
+        vehicles = claim(speculation, 'filter', lambda: return_vehicle_data(inquiry))
+        return {"type": "raw_data", "data": vehicles}, None, 'All Vehicles'
+
+    if routing_decision is None:
+        try:
+            routing_decision = claim(speculation, 'controller', lambda: route_query_agent(user_query, history_context))
+        except Rejected:
+            raise
+        except Exception as e:
+            # Customer Relations can answer anything, if less precisely
+            degrade('controller', 'customer_relations', e)
+            routing_decision = "Customer Relations"
+        else:
+            if routing_decision in ROUTES:
+                set_label('route', routing_decision)
+            intent_decisions.inc(task='route', source='llm')
+    else:
+        intent_decisions.inc(task='route', source='classifier')
+    set_route(routing_decision)
 
-    print(f"[Dealerbot Routing Decision] Query: '{user_query}' => Routing: '{routing_decision}'")
+    print(f"[Dealerbot Routing Decision] [{current_trace_id()}] Query: '{user_query}' => Routing: '{routing_decision}'")
     
     response = None
     
@@ -475,15 +684,36 @@ def query_dealerbot_agent(user_query, session_id=None):
             response = format_response(user_query, "I'm not sure what you're referring to. Could you please rephrase your question?")
     
     elif routing_decision == "Specific Vehicle":
-        vehicle_data = get_vehicle_data(user_query)
+        analysis = claim(speculation, 'extraction', lambda: analyze_vehicle_query(user_query))
+        vehicles = claim(speculation, 'filter', lambda: return_vehicle_data(analysis[1]))
+        vehicle_data = get_vehicle_data(user_query, analysis, vehicles)
         if vehicle_data != "Not in stock":
             response = format_response(user_query, vehicle_data)
+        elif single_pass_enabled(routing_decision):
+            # Nothing to phrase, so skip the formatter
+            response = NOT_IN_STOCK_RESPONSE
+            single_pass_answers.inc(route=routing_decision, outcome='accepted')
         else:
             response = format_response(user_query, "Not in stock")
     
     elif routing_decision == "Inventory Search":
-        _, inquiry = analyze_vehicle_query(user_query)
-        vehicles = return_vehicle_data(inquiry)
+        _, inquiry = claim(speculation, 'extraction', lambda: analyze_vehicle_query(user_query))
+        facets = facet_indexes.get(inventory_store.current())
+        filters = facets.inquiry_filters(inquiry)
+        if filters is not None:
+            # Matches come from the facet bitsets, no scan over the inventory
+            start = time.perf_counter()
+            matches = facets.records_for(facets.match(filters))
+            vehicles = [vehicle.to_dict() for vehicle in matches] if matches else "Not in stock"
+            facet_latency.observe((time.perf_counter() - start) * 1000, source='inventory_search')
+        else:
+            vehicles = claim(speculation, 'filter', lambda: return_vehicle_data(inquiry))
+        # Plain availability questions are answered from the facet counts,
+        # skipping both the availability and the formatting LLM calls
+        templated = availability_response(user_query, facets, filters)
+        if templated is not None:
+            remembered = {'response': templated, 'last_vehicles': vehicles}
+            return {"type": "formatted", "message": templated, "data": None}, remembered, routing_decision
         # Only return formatted summary, never vehicle data
         # Create a minimal context for the agent
         vehicle_info = {
@@ -491,76 +721,83 @@ def query_dealerbot_agent(user_query, session_id=None):
             'count': len(vehicles) if vehicles != "Not in stock" else 0,
             'model': inquiry.get('parsed_name[model]', 'vehicle')
         }
-        inventory_task = Task(
-            description=(
-                f"Create a natural response about vehicle availability.\n"
-                f"Query: '{user_query}'\n"
+        inventory_task = llm.task(
+            description=build_prompt('inventory', [
+                Section('task', "Create a natural response about vehicle availability.\n"),
+                Section('query', f"Query: '{user_query}'\n", priority=1),
+                Section('availability',
                 f"Available: {vehicle_info['available']}\n"
                 f"Count: {vehicle_info['count']}\n"
                 f"Model: {vehicle_info['model']}\n\n"
-                "Be conversational and offer to show details or provide specific information."
-            ),
+                "Be conversational and offer to show details or provide specific information.")
+            ]),
             agent=ford_expert_agent,
             expected_output="A natural response about vehicle availability"
         )
-        expert_crew = Crew(agents=[ford_expert_agent], tasks=[inventory_task])
-        response = expert_crew.kickoff().raw.strip()
-        if session_id:
-            context_updates = {
-                'last_query': user_query,
-                'last_response': response,
-                'last_vehicles': vehicles,
-                'conversation_history': conversation_history + [{
-                    'query': user_query,
-                    'response': response,
-                    'timestamp': datetime.now().isoformat()
-                }]
-            }
-            session_manager.update_session(session_id, context_updates)
-        return {"type": "formatted", "message": format_response(user_query, response), "data": None}
+        response = _run_task('inventory', ford_expert_agent, inventory_task)
+        remembered = {'response': response, 'last_vehicles': vehicles}
+        return {"type": "formatted", "message": format_response(user_query, response), "data": None}, remembered, routing_decision
     
     elif routing_decision == "Ford Expert":
-        expert_response = handle_ford_expert_query(user_query, history_context)
-        response = format_response(user_query, expert_response)
+        single_pass = single_pass_enabled(routing_decision)
+        expert_response = handle_ford_expert_query(user_query, history_context, single_pass)
+        response = finish_response(routing_decision, user_query, expert_response, single_pass)
 
     elif routing_decision == "Customer Relations":
-        relations_response = handle_customer_relations_query(user_query, history_context)
-        response = format_response(user_query, relations_response)
-
-    # Update session with the current query, response, and any additional context
-    if session_id:
-        context_updates = {
-            'last_query': user_query,
-            'last_response': response,
-            'conversation_history': conversation_history + [{
-                'query': user_query,
-                'response': response,
-                'timestamp': datetime.now().isoformat()
-            }]
-        }
-        
-        # Add vehicles to context if this was an inventory search
-        if routing_decision == "Inventory Search" and vehicles != "Not in stock":
-            context_updates['last_vehicles'] = vehicles
-            
-        session_manager.update_session(session_id, context_updates)
-
-    return response
-
-def compare_vehicles(vehicles_data, session_id=None):
-    """Compare multiple vehicles and highlight their differences."""
+        single_pass = single_pass_enabled(routing_decision)
+        relations_response = handle_customer_relations_query(user_query, history_context, single_pass)
+        response = finish_response(routing_decision, user_query, relations_response, single_pass)
+
+    return response, {'response': response}, routing_decision
+
+def summarize_user_context(session_context):
+    """Short text summary of what the user has been asking about, newest first."""
+    if not session_context:
+        return ""
+    lines = []
+    history = session_context.get('conversation_history') or []
+    queries = [msg.get('query') for msg in reversed(history[-COMPARISON_HISTORY_TURNS:]) if msg.get('query')]
+    if queries:
+        lines.append("Recent questions (newest first): " + " / ".join(queries))
+    last_vehicles = session_context.get('last_vehicles')
+    if isinstance(last_vehicles, list):
+        names = [v.get('vehicle_name') for v in last_vehicles if isinstance(v, dict) and v.get('vehicle_name')]
+        if names:
+            lines.append("Recently viewed: " + ", ".join(dict.fromkeys(names)))
+    return "\n".join(lines)
+
+def compare_vehicles(vehicles, session_id=None):
+    """
+    Compare multiple vehicles and highlight their differences.
+    `vehicles` are inventory records (see inventory_views.resolve_vehicles);
+    only a compact table of their comparison fields goes into the prompt.
+    """
     # Get session context for user preferences if available
-    user_context = None
+    user_context = ""
     if session_id:
         session = session_manager.get_session(session_id)
         if session:
-            user_context = session['context']
-
-    comparison_task = Task(
-        description=(
-            f"Compare these vehicles considering the user's context:\n"
-            f"User context: {json.dumps(user_context) if user_context else 'No previous context'}\n"
-            f"Vehicles to compare: {json.dumps(vehicles_data, indent=2)}\n\n"
+            user_context = clip_to_budget(summarize_user_context(session['context']),
+                                          COMPARISON_CONTEXT_TOKEN_BUDGET)
+
+    # The same VINs for a user with similar interests get the same comparison
+    start = time.perf_counter()
+    cache_key = comparison_key(vehicles, inventory_store.current().version, user_context)
+    cached = comparison_cache.get(cache_key)
+    if cached is not None:
+        comparison_latency.observe((time.perf_counter() - start) * 1000, cache=comparison_cache.name, result='hit')
+        return cached
+
+    vehicle_table = comparison_table(vehicles)
+    table_tokens = count_tokens(vehicle_table)
+    context_tokens = count_tokens(user_context)
+
+    comparison_task = llm.task(
+        description=build_prompt('comparison', [
+            Section('task', "Compare these vehicles considering the user's context:\n"),
+            Section('context', f"User context: {user_context or 'No previous context'}\n", priority=2),
+            Section('vehicles', f"Vehicles to compare (one column per VIN):\n{vehicle_table}\n\n", priority=1),
+            Section('instructions',
             "Create a practical comparison focusing on:\n"
             "1. Value Proposition - Price vs Features analysis\n"
             "2. Practical Use Cases - Which vehicle suits which lifestyle/needs\n"
@@ -575,14 +812,25 @@ def compare_vehicles(vehicles_data, session_id=None):
             "- value_analysis: Price vs features breakdown\n"
             "- practical_considerations: Daily use implications\n"
             "- recommendation: Personalized recommendation based on user context\n\n"
-            "Focus on PRACTICAL differences that matter in real-world use."
-        ),
+            "Keep each section to two or three sentences. "
+            "Focus on PRACTICAL differences that matter in real-world use.")
+        ]),
         agent=vehicle_comparison_agent,
         expected_output="A practical, user-focused comparison in JSON format."
     )
+    print(f"[Compare] {len(vehicles)} vehicles, input tokens: {count_tokens(comparison_task.description)} "
+          f"(table {table_tokens}, context {context_tokens})")
 
-    comparison_crew = Crew(agents=[vehicle_comparison_agent], tasks=[comparison_task])
-    return comparison_crew.kickoff().raw.strip()
+    comparison = _run_task('comparison', vehicle_comparison_agent, comparison_task)
+    comparison_latency.observe((time.perf_counter() - start) * 1000, cache=comparison_cache.name, result='miss')
+
+    # Only cache answers the API can use; a malformed one should be retried next time
+    try:
+        json.loads(comparison)
+        comparison_cache.put(cache_key, comparison)
+    except json.JSONDecodeError:
+        print(f"[Compare] Not caching unparseable comparison for {cache_key[0]}")
+    return comparison
 
 # Example usage
 # print(query_dealerbot_agent("Which Ford SUV is best for a mother of three?"))
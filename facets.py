@@ -0,0 +1,167 @@
+import re
+import time
+from typing import Dict, List, Any, Optional, Tuple
+from compact_inventory import CompactVehicle
+from inventory_store import InventorySnapshot, inventory_store
+from metrics import metrics
+
+# Facet counts per inventory snapshot. Every value of every facet keeps a
+# bitset (a Python int, bit i = vehicle i of the snapshot), so the number of
+# vehicles matching any combination of filters is an AND of a few bitsets and
+# a popcount, with no scan over the vehicles. The bitsets are built when a
+# snapshot is loaded, before it is served.
+
+# Facet name -> vehicle field, in the repo's 'outer[inner]' notation
+FACET_FIELDS = {
+    'make': 'parsed_name[make]',
+    'model': 'parsed_name[model]',
+    'year': 'parsed_name[year]',
+    'trim': 'parsed_name[trim]',
+    'vehicle_type': 'parsed_name[vehicle_type]',
+    'exterior_color': 'specifications[exterior_color]',
+    'drive': 'specifications[drive]',
+}
+PRICE_BAND_FACET = 'price_band'
+# (upper bound, label); prices at or above the last bound fall in the last band
+PRICE_BANDS = [
+    (30000, 'under_30k'),
+    (40000, '30k_40k'),
+    (50000, '40k_50k'),
+    (60000, '50k_60k'),
+    (80000, '60k_80k'),
+    (float('inf'), '80k_plus'),
+]
+FACETS = tuple(FACET_FIELDS) + (PRICE_BAND_FACET,)
+
+facet_latency = metrics.histogram(
+    'dealerbot_facet_latency_ms', 'Facet count latency in milliseconds', ('source',))
+
+def price_band(price: Any) -> str:
+    digits = re.sub(r"[^0-9.]", "", str(price or ""))
+    try:
+        value = float(digits)
+    except ValueError:
+        return 'unknown'
+    for bound, label in PRICE_BANDS:
+        if value < bound:
+            return label
+    return PRICE_BANDS[-1][1]
+
+def _normalize(value: Any) -> str:
+    # Same normalization return_vehicle_data applies before its substring check
+    return str(value).strip().lower()
+
+def _bitset(indices: List[int], size: int) -> int:
+    bits = bytearray((size + 7) // 8)
+    for i in indices:
+        bits[i >> 3] |= 1 << (i & 7)
+    return int.from_bytes(bits, 'little')
+
+def _popcount(mask: int) -> int:
+    return bin(mask).count('1')
+
+class FacetIndex:
+    """Bitsets per facet value of one snapshot."""
+
+    def __init__(self, records: List[CompactVehicle]):
+        start = time.perf_counter()
+        self.records = records
+        self.size = len(records)
+        self.all = (1 << self.size) - 1
+        # facet -> normalized value -> (display value, bitset)
+        self.values: Dict[str, Dict[str, Tuple[str, int]]] = {}
+        for facet in FACETS:
+            positions: Dict[str, List[int]] = {}
+            display: Dict[str, str] = {}
+            for i, record in enumerate(records):
+                if facet == PRICE_BAND_FACET:
+                    value = price_band(record.field('price'))
+                elif record.has(FACET_FIELDS[facet]):
+                    value = record.field(FACET_FIELDS[facet])
+                else:
+                    continue
+                key = _normalize(value)
+                positions.setdefault(key, []).append(i)
+                display.setdefault(key, str(value))
+            self.values[facet] = {key: (display[key], _bitset(indices, self.size))
+                                  for key, indices in positions.items()}
+        self.build_ms = (time.perf_counter() - start) * 1000
+
+    def mask(self, facet: str, value: Any) -> int:
+        """
+        Vehicles whose facet value contains `value` (case-insensitive), the same
+        match return_vehicle_data makes; price bands match exactly.
+        """
+        wanted = _normalize(value)
+        values = self.values[facet]
+        if facet == PRICE_BAND_FACET:
+            return values[wanted][1] if wanted in values else 0
+        mask = 0
+        for key, (_, bits) in values.items():
+            if wanted in key:
+                mask |= bits
+        return mask
+
+    def match(self, filters: Dict[str, Any]) -> int:
+        """Bitset of the vehicles matching every facet filter."""
+        mask = self.all
+        for facet, value in filters.items():
+            mask &= self.mask(facet, value)
+            if not mask:
+                break
+        return mask
+
+    def count(self, filters: Dict[str, Any]) -> int:
+        return _popcount(self.match(filters))
+
+    def records_for(self, mask: int) -> List[CompactVehicle]:
+        """The vehicles in a bitset, in snapshot order."""
+        records = []
+        for byte_index, byte in enumerate(mask.to_bytes((self.size + 7) // 8, 'little')):
+            while byte:
+                low = byte & -byte
+                records.append(self.records[byte_index * 8 + low.bit_length() - 1])
+                byte ^= low
+        return records
+
+    def counts(self, filters: Dict[str, Any]) -> Dict[str, Dict[str, int]]:
+        """Count of every facet value within the vehicles matching `filters`, largest first."""
+        mask = self.match(filters)
+        result = {}
+        for facet, values in self.values.items():
+            counts = {display: _popcount(bits & mask) for display, bits in values.values()}
+            result[facet] = dict(sorted(((v, c) for v, c in counts.items() if c), key=lambda item: -item[1]))
+        return result
+
+    def inquiry_filters(self, inquiry: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """
+        Translate an agent inquiry (parsed_name[model]=..., ...) into facet
+        filters; None when it uses a field the facets don't cover.
+        """
+        fields = {field: facet for facet, field in FACET_FIELDS.items()}
+        filters = {}
+        for key, value in inquiry.items():
+            if value is None or value == "Unknown":
+                continue
+            if key not in fields:
+                return None
+            filters[fields[key]] = value
+        return filters
+
+class FacetIndexes:
+    """Builds the facet bitsets of each snapshot once and keeps them with the snapshot."""
+
+    @staticmethod
+    def _build(snapshot: InventorySnapshot) -> FacetIndex:
+        index = FacetIndex(snapshot.records)
+        print(f"[Facets] Indexed {len(snapshot.records)} vehicles for {snapshot.version} "
+              f"in {index.build_ms:.1f}ms")
+        return index
+
+    def get(self, snapshot: InventorySnapshot) -> FacetIndex:
+        # Snapshots the store loaded are indexed already; others (benchmarks) are indexed here
+        return snapshot.derived('facets', self._build)
+
+# Global facet index, built for every snapshot before the API serves it
+facet_indexes = FacetIndexes()
+inventory_store.on_load(facet_indexes.get)
@@ -0,0 +1,300 @@
+import hashlib
+import json
+import os
+import re
+import sys
+import time
+from typing import Dict, List, Optional
+from model_registry import model_registry, ModelConfig
+from token_budget import count_tokens
+
+# Offline stand-in for the LLM. Answers are picked from an optional script file
+# first and otherwise generated by simple rules over the prompt, always in the
+# format the calling agent parses (route labels, python dict strings, JSON).
+# Latency is injected per call and is deterministic for a given prompt, so load
+# tests are repeatable. With FAKE_LLM_SPEED_LATENCY on, a call takes as long as
+# the real model would for its answer: the model's speed from the model
+# registry, an answer length between FAKE_LLM_MIN_FILL and all of max_tokens
+# (the generated answer's own length for agents without a max_tokens),
+# and a share of calls FAKE_LLM_SLOW_FACTOR times slower, like a provider's
+# latency tail. Calls that run past the agent's timeout fail over to its
+# fallback model like they do on the crewai backend.
+
+FAKE_LLM_LATENCY_MS = float(os.getenv("FAKE_LLM_LATENCY_MS", "0"))
+FAKE_LLM_JITTER_MS = float(os.getenv("FAKE_LLM_JITTER_MS", "0"))
+# JSON object of per-model latencies replacing FAKE_LLM_LATENCY_MS, e.g. '{"gpt-4": 900, "gpt-4o-mini": 300}',
+# so model tier assignments can be compared offline
+FAKE_LLM_MODEL_LATENCY_MS: Dict[str, float] = json.loads(os.getenv("FAKE_LLM_MODEL_LATENCY_MS", "{}"))
+FAKE_LLM_SPEED_LATENCY = os.getenv("FAKE_LLM_SPEED_LATENCY", "false").lower() == "true"
+FAKE_LLM_MIN_FILL = float(os.getenv("FAKE_LLM_MIN_FILL", "0.3"))
+FAKE_LLM_SLOW_FRACTION = float(os.getenv("FAKE_LLM_SLOW_FRACTION", "0.05"))
+FAKE_LLM_SLOW_FACTOR = float(os.getenv("FAKE_LLM_SLOW_FACTOR", "3"))
+# JSON file of {"<agent key>": [{"match": "<substring of the prompt>", "response": "..."}]}
+FAKE_LLM_SCRIPT = os.getenv("FAKE_LLM_SCRIPT")
+
+ROOT_DIR = os.path.dirname(os.path.abspath(__file__))
+
+class FakeAgent:
+    __slots__ = ('key', 'name', 'role')
+
+    def __init__(self, key: str, name: str = '', role: str = '', **_):
+        self.key = key
+        self.name = name
+        self.role = role
+
+class FakeTask:
+    __slots__ = ('description', 'agent', 'expected_output')
+
+    def __init__(self, description: str, agent: FakeAgent, expected_output: str):
+        self.description = description
+        self.agent = agent
+        self.expected_output = expected_output
+
+# Words that map a question to the vehicle field it is about
+FIELD_KEYWORDS = [
+    ('horsepower', 'specifications[horsepower]'),
+    ('hp', 'specifications[horsepower]'),
+    ('torque', 'specifications[torque]'),
+    ('mpg', 'specifications[epa_range]'),
+    ('range', 'specifications[epa_range]'),
+    ('fuel', 'specifications[epa_range]'),
+    ('interior color', 'specifications[interior_color]'),
+    ('color', 'specifications[exterior_color]'),
+    ('colour', 'specifications[exterior_color]'),
+    ('wheel', 'specifications[wheel_type]'),
+    ('drive', 'specifications[drive]'),
+    ('awd', 'specifications[drive]'),
+    ('price', 'price'),
+    ('cost', 'price'),
+    ('how much', 'price'),
+    ('mileage', 'annual_mileage'),
+    ('warranty', 'warranty'),
+    ('vin', 'vin'),
+    ('feature', 'features[functional]'),
+]
+
+ROUTE_RULES = [
+    ('Show Form', ['test drive', 'quote', 'contact me', 'call me', 'book', 'appointment']),
+    ('Customer Relations', ['hello', 'hi', 'hey', 'how are you', 'joke', 'weather', 'thanks', 'thank you']),
+    ('Ford Expert', ['recommend', 'good for', 'suitable', 'should i', 'best for', 'better', 'would you']),
+    ('Inventory Search', ['in stock', 'available', 'do you have', 'inventory']),
+    ('Specific Vehicle', [keyword for keyword, _ in FIELD_KEYWORDS]),
+    ('Follow-up', ['yes', 'show me', 'sure', 'more']),
+]
+
+def _between(text: str, pattern: str, default: str = '') -> str:
+    match = re.search(pattern, text, re.DOTALL)
+    return match.group(1) if match else default
+
+def _clean(text: str) -> str:
+    return text.replace('®', '').replace('™', '').lower()
+
+def _requested_fields(query: str) -> List[str]:
+    lowered = query.lower()
+    fields = []
+    for keyword, field in FIELD_KEYWORDS:
+        if re.search(rf"\b{re.escape(keyword)}", lowered) and field not in fields:
+            fields.append(field)
+    return fields
+
+class FakeBackend:
+    """Deterministic offline backend with injected latency."""
+    name = 'fake'
+
+    def __init__(self, latency_ms: float = FAKE_LLM_LATENCY_MS, jitter_ms: float = FAKE_LLM_JITTER_MS,
+                 script_path: Optional[str] = FAKE_LLM_SCRIPT,
+                 model_latency_ms: Optional[Dict[str, float]] = None,
+                 speed_latency: bool = FAKE_LLM_SPEED_LATENCY):
+        self.latency_ms = latency_ms
+        self.speed_latency = speed_latency
+        self.model_latency_ms = FAKE_LLM_MODEL_LATENCY_MS if model_latency_ms is None else model_latency_ms
+        self.jitter_ms = jitter_ms
+        self.script: Dict[str, List[Dict[str, str]]] = {}
+        if script_path:
+            with open(script_path, 'r', encoding='utf-8') as f:
+                self.script = json.load(f)
+        self._vocabulary = None
+
+    def agent(self, key: str, **fields) -> FakeAgent:
+        return FakeAgent(key, **fields)
+
+    def task(self, description: str, agent: FakeAgent, expected_output: str) -> FakeTask:
+        return FakeTask(description, agent, expected_output)
+
+    def run(self, agent: FakeAgent, task: FakeTask) -> str:
+        config = model_registry.get(agent.key)
+        answer = self.respond(agent.key, task.description).strip()
+        try:
+            self._sleep(task.description, config, answer)
+        except TimeoutError as e:
+            fallback = model_registry.fallback(agent.key)
+            if fallback is None:
+                raise
+            # llm_backend imports this module while it loads
+            from llm_backend import llm_fallbacks
+            print(f"[LLM] {agent.key} failed on {config.model} ({e}), retrying on {fallback.model}")
+            llm_fallbacks.inc(agent=agent.key, model=fallback.model)
+            self._sleep(task.description, fallback, answer)
+        return answer
+
+    def run_for_each(self, agent: FakeAgent, task: FakeTask, inputs: List[Dict[str, str]]) -> List[str]:
+        outputs = []
+        for values in inputs:
+            description = task.description
+            for key, value in values.items():
+                description = description.replace('{' + key + '}', str(value))
+            outputs.append(self.run(agent, FakeTask(description, agent, task.expected_output)))
+        return outputs
+
+    def _delay_ms(self, description: str, config: ModelConfig, answer: str) -> float:
+        # Same prompt and model, same delay
+        digest = hashlib.md5(f"{config.model}|{description}".encode('utf-8')).hexdigest()
+        fractions = [int(digest[i:i + 8], 16) / 0xFFFFFFFF for i in (0, 8, 16)]
+        speed = model_registry.speeds.get(config.model)
+        if self.speed_latency and speed:
+            if config.max_tokens:
+                tokens = config.max_tokens * (FAKE_LLM_MIN_FILL + (1 - FAKE_LLM_MIN_FILL) * fractions[1])
+            else:
+                tokens = count_tokens(answer, config.model)
+            delay = (speed['first_token_s'] + tokens / speed['tokens_per_s']) * 1000
+            if fractions[2] < FAKE_LLM_SLOW_FRACTION:
+                delay *= FAKE_LLM_SLOW_FACTOR
+        else:
+            delay = self.model_latency_ms.get(config.model, self.latency_ms)
+        return delay + self.jitter_ms * fractions[0]
+
+    def _sleep(self, description: str, config: ModelConfig, answer: str):
+        """Wait as long as the call would take, or raise TimeoutError after the agent's timeout."""
+        delay = self._delay_ms(description, config, answer)
+        if config.timeout is not None and delay > config.timeout * 1000:
+            time.sleep(config.timeout)
+            raise TimeoutError(f"no answer from {config.model} in {config.timeout}s")
+        if delay > 0:
+            time.sleep(delay / 1000)
+
+    def respond(self, key: str, description: str) -> str:
+        for entry in self.script.get(key, []):
+            if entry.get('match', '') in description:
+                return entry['response']
+        responder = getattr(self, f"_respond_{key}", None)
+        if responder is None:
+            return "I'm happy to help with any questions about our Ford vehicles."
+        return responder(description)
+
+    # ---- Rule-based answers, one per agent key ----
+
+    def _vocab(self) -> Dict[str, List[str]]:
+        """Models, trims, makes and types from the inventory, longest first."""
+        if self._vocabulary is None:
+            from inventory_store import inventory_store
+            values: Dict[str, set] = {'model': set(), 'trim': set(), 'make': set(), 'vehicle_type': set()}
+            for record in inventory_store.current().records:
+                for field in values:
+                    value = record.field(f'parsed_name[{field}]')
+                    if value:
+                        values[field].add(str(value))
+            self._vocabulary = {field: sorted(items, key=lambda v: (-len(v), v)) for field, items in values.items()}
+        return self._vocabulary
+
+    def _respond_controller(self, description: str) -> str:
+        query = _between(description, r"Analyze this query: '(.*?)'\n").lower()
+        for route, keywords in ROUTE_RULES:
+            if any(re.search(rf"\b{re.escape(keyword)}\b", query) for keyword in keywords):
+                return route
+        return 'Ford Expert'
+
+    def _respond_all_vehicles(self, description: str) -> str:
+        query = _between(description, r"User query: '(.*?)'\n").lower()
+        wants_all = re.search(r'\b(all|every)\b', query) is not None
+        has_filter = any(_clean(model) in _clean(query) for model in self._vocab()['model']) \
+            or re.search(r'\b20\d{2}\b', query) is not None
+        return 'true' if wants_all and has_filter else 'false'
+
+    def _respond_interest(self, description: str) -> str:
+        query = _between(description, r"Analyze the following user query: '(.*?)' and determine")
+        fields = _requested_fields(query)
+        return fields[0] if fields else 'parsed_name[model]'
+
+    def _respond_identifier(self, description: str) -> str:
+        query = _between(description, r"Analyze the following user query: '(.*?)' and determine")
+        cleaned = _clean(query)
+        inquiry: Dict[str, str] = {}
+        year = re.search(r'\b(20\d{2})\b', query)
+        if year:
+            inquiry['parsed_name[year]'] = year.group(1)
+        if 'ford' in cleaned:
+            inquiry['parsed_name[make]'] = 'Ford'
+        vocab = self._vocab()
+        for field in ['model', 'trim', 'vehicle_type']:
+            for value in vocab[field]:
+                if re.search(rf"(?<![\w-]){re.escape(_clean(value))}(?![\w-])", cleaned):
+                    inquiry[f'parsed_name[{field}]'] = value.replace('®', '').replace('™', '')
+                    break
+        for field in _requested_fields(query):
+            if field not in ('vin',):
+                inquiry[field] = 'Unknown'
+        return repr(inquiry)
+
+    def _respond_data_request(self, description: str) -> str:
+        query = _between(description, r"Analyze the following user query: '(.*?)'\n").lower()
+        return 'raw_data' if any(word in query for word in ['details', 'specs', 'show me the']) else 'formatted'
+
+    def _respond_formatter(self, description: str) -> str:
+        raw = _between(description, r"Raw response: (.*?)\n\n(?:Your response should)", '').strip()
+        if not raw or raw == 'Not in stock':
+            return ("I'm sorry, I don't have that specific information right now. Would you like me to pass "
+                    "along your inquiry to a team member and have them get in touch with you?")
+        if len(raw) > 300:
+            raw = raw[:300] + '...'
+        return f"Here's what I found: {raw} Would you like to book a test drive?"
+
+    def _respond_ford_expert(self, description: str) -> str:
+        # The availability task also runs on the Ford Expert agent
+        if re.search(r"\nAvailable: (True|False)\n", description):
+            return self._respond_inventory(description)
+        query = _between(description, r"Answer the following Ford-related question: '(.*?)'\n")
+        in_stock = re.findall(r"\n- ([^|\n]+) \|", description)
+        if in_stock:
+            return (f"Great question! For \"{query}\", I'd look at the {in_stock[0].strip()} we have in stock"
+                    + (f", or the {in_stock[1].strip()}." if len(in_stock) > 1 else "."))
+        return (f"Great question! For \"{query}\", Ford's lineup has strong options: the Escape for "
+                "efficient everyday driving, the Bronco Sport for adventure, and the Explorer for families.")
+
+    def _respond_inventory(self, description: str) -> str:
+        available = _between(description, r"Available: (\w+)") == 'True'
+        count = _between(description, r"Count: (\d+)", '0')
+        model = _between(description, r"Model: (.*?)\n", 'vehicle')
+        if not available:
+            return f"We don't have any {model} vehicles in stock right now. Can I suggest something similar?"
+        return f"Good news! We have {count} {model} vehicles in stock. Would you like to see the details?"
+
+    def _respond_customer_relations(self, description: str) -> str:
+        return "Hi there! I'm doing great, thanks for asking. Is there a Ford vehicle I can help you find today?"
+
+    def _respond_comparison(self, description: str) -> str:
+        header = _between(description, r"\n(Field \|[^\n]*)\n")
+        vins = [cell.strip() for cell in header.split('|')[1:]]
+        names = _between(description, r"\n(Name \|[^\n]*)\n")
+        vehicles = [cell.strip() for cell in names.split('|')[1:]] or vins
+        vehicles = [name.replace(' (all)', '') for name in vehicles]
+        return json.dumps({
+            "summary": f"Comparison of {', '.join(vehicles)}.",
+            "key_differences": [f"{name} ({vin})" for name, vin in zip(vehicles, vins)],
+            "best_for": {name: "Everyday driving" for name in vehicles},
+            "value_analysis": "Prices and features are listed in the comparison table.",
+            "practical_considerations": "All vehicles are suited to daily use.",
+            "recommendation": f"The {vehicles[0]} is a well-rounded choice." if vehicles else ""
+        })
+
+    def _respond_name_parser(self, description: str) -> str:
+        # Imported the way scraper/data_processor.py imports it
+        scraper_dir = os.path.join(ROOT_DIR, 'scraper')
+        if scraper_dir not in sys.path:
+            sys.path.append(scraper_dir)
+        from manual_vehicle_name_parser import manual_parse_vehicle_name
+        batch = _between(description, r"Vehicle Names \(JSON array\): (\[.*?\])\n")
+        if batch:
+            names = json.loads(batch)
+            return json.dumps([dict(manual_parse_vehicle_name(name), name=name) for name in names])
+        name = _between(description, r"Vehicle Name: (.*?)\n").strip()
+        return json.dumps(manual_parse_vehicle_name(name))
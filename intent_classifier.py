@@ -0,0 +1,149 @@
+import json
+import math
+import os
+import re
+import time
+import zlib
+from typing import Dict, List, Any, Optional, Tuple
+from metrics import metrics
+
+# Local intent classifier in front of the LLM routing calls. A linear model
+# over hashed word and character n-grams, trained offline from the routing
+# labels logged in the messages table (train_intent_classifier.py), predicts
+# the controller's route and the all-vehicles flag. Confident predictions are
+# used directly; anything below the threshold, or every query when no model
+# file is present, still goes to the LLM.
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+INTENT_MODEL_PATH = os.getenv("INTENT_MODEL_PATH", os.path.join(SCRIPT_DIR, "intent_model.json"))
+# Minimum predicted probability for the classifier to answer instead of the LLM
+INTENT_ROUTE_THRESHOLD = float(os.getenv("INTENT_ROUTE_THRESHOLD", "0.9"))
+INTENT_ALL_VEHICLES_THRESHOLD = float(os.getenv("INTENT_ALL_VEHICLES_THRESHOLD", "0.95"))
+
+ROUTES = ('Specific Vehicle', 'Inventory Search', 'Ford Expert', 'Customer Relations', 'Follow-up', 'Show Form')
+INTENT_HASH_DIM = 2 ** 20
+WORD_PATTERN = re.compile(r"[a-z0-9]+(?:[-'][a-z0-9]+)*")
+
+INTENT_LATENCY_BUCKETS = (0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5)
+
+intent_decisions = metrics.counter(
+    'dealerbot_intent_decisions_total', 'Routing decisions by who made them', ('task', 'source'))
+intent_latency = metrics.histogram(
+    'dealerbot_intent_latency_ms', 'Local intent classifier latency in milliseconds', ('task',),
+    INTENT_LATENCY_BUCKETS)
+
+def features(query: str, has_history: bool = False, dim: int = INTENT_HASH_DIM) -> List[int]:
+    """Hashed word unigrams and bigrams, character 4-grams and a conversation marker."""
+    words = WORD_PATTERN.findall(query.lower())
+    terms = [f"w:{word}" for word in words]
+    terms += [f"b:{a} {b}" for a, b in zip(['<s>'] + words, words + ['</s>'])]
+    for word in words:
+        padded = f"<{word}>"
+        terms += [f"c:{padded[i:i + 4]}" for i in range(max(1, len(padded) - 3))]
+    terms.append(f"n:{min(len(words), 12)}")
+    if has_history:
+        terms.append("h:history")
+    # crc32 is stable across processes, unlike hash()
+    return sorted({zlib.crc32(term.encode('utf-8')) % dim for term in terms})
+
+def softmax(scores: List[float]) -> List[float]:
+    top = max(scores)
+    exps = [math.exp(score - top) for score in scores]
+    total = sum(exps)
+    return [value / total for value in exps]
+
+def sigmoid(score: float) -> float:
+    if score >= 0:
+        return 1 / (1 + math.exp(-score))
+    exp = math.exp(score)
+    return exp / (1 + exp)
+
+class IntentModel:
+    """
+    Weights of the two classifiers, kept sparse: feature -> one weight per
+    route, and feature -> weight for the all-vehicles flag.
+    """
+
+    def __init__(self, data: Dict[str, Any]):
+        self.dim = data['dim']
+        self.routes: List[str] = data['route']['labels']
+        self.route_bias: List[float] = data['route']['bias']
+        self.route_weights = {int(feature): weights for feature, weights in data['route']['weights'].items()}
+        self.all_bias: float = data['all_vehicles']['bias']
+        self.all_weights = {int(feature): weight for feature, weight in data['all_vehicles']['weights'].items()}
+        self.report: Dict[str, Any] = data.get('report', {})
+
+    @classmethod
+    def load(cls, path: str) -> "IntentModel":
+        with open(path, 'r', encoding='utf-8') as f:
+            return cls(json.load(f))
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'dim': self.dim,
+            'route': {'labels': self.routes, 'bias': self.route_bias,
+                      'weights': {str(feature): weights for feature, weights in self.route_weights.items()}},
+            'all_vehicles': {'bias': self.all_bias,
+                             'weights': {str(feature): weight for feature, weight in self.all_weights.items()}},
+            'report': self.report,
+        }
+
+    def route_probabilities(self, feature_ids: List[int]) -> List[float]:
+        scores = list(self.route_bias)
+        for feature in feature_ids:
+            weights = self.route_weights.get(feature)
+            if weights:
+                for i, weight in enumerate(weights):
+                    scores[i] += weight
+        return softmax(scores)
+
+    def all_vehicles_probability(self, feature_ids: List[int]) -> float:
+        return sigmoid(self.all_bias + sum(self.all_weights.get(feature, 0.0) for feature in feature_ids))
+
+    def predict_route(self, query: str, has_history: bool = False) -> Tuple[str, float]:
+        probabilities = self.route_probabilities(features(query, has_history, self.dim))
+        best = max(range(len(probabilities)), key=probabilities.__getitem__)
+        return self.routes[best], probabilities[best]
+
+    def predict_all_vehicles(self, query: str, has_history: bool = False) -> Tuple[bool, float]:
+        probability = self.all_vehicles_probability(features(query, has_history, self.dim))
+        return probability >= 0.5, max(probability, 1 - probability)
+
+class IntentClassifier:
+    """The shipped model plus the confidence thresholds; every decision is None without a model."""
+
+    def __init__(self, model: Optional[IntentModel] = None, route_threshold: float = INTENT_ROUTE_THRESHOLD,
+                 all_vehicles_threshold: float = INTENT_ALL_VEHICLES_THRESHOLD):
+        self.model = model
+        self.route_threshold = route_threshold
+        self.all_vehicles_threshold = all_vehicles_threshold
+
+    @classmethod
+    def from_file(cls, path: str = INTENT_MODEL_PATH) -> "IntentClassifier":
+        if not os.path.exists(path):
+            print(f"[Intent] No model at {path}, routing decisions go to the LLM")
+            return cls()
+        model = IntentModel.load(path)
+        print(f"[Intent] Loaded {path} (held-out route accuracy {model.report.get('route', {}).get('accuracy')})")
+        return cls(model)
+
+    def route(self, query: str, has_history: bool = False) -> Optional[str]:
+        """The route when the model is confident enough, otherwise None."""
+        if self.model is None:
+            return None
+        start = time.perf_counter()
+        route, confidence = self.model.predict_route(query, has_history)
+        intent_latency.observe((time.perf_counter() - start) * 1000, task='route')
+        return route if confidence >= self.route_threshold else None
+
+    def all_vehicles(self, query: str, has_history: bool = False) -> Optional[bool]:
+        """The all-vehicles flag when the model is confident enough, otherwise None."""
+        if self.model is None:
+            return None
+        start = time.perf_counter()
+        flag, confidence = self.model.predict_all_vehicles(query, has_history)
+        intent_latency.observe((time.perf_counter() - start) * 1000, task='all_vehicles')
+        return flag if confidence >= self.all_vehicles_threshold else None
+
+# Global intent classifier
+intent_classifier = IntentClassifier.from_file()
@@ -0,0 +1,232 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict, List, Any, Callable, Optional
+from compact_inventory import CompactVehicle, StringPool
+
+SCRIPT_DIR = Path(__file__).parent
+SNAPSHOT_DIR = Path(os.getenv("INVENTORY_SNAPSHOT_DIR", SCRIPT_DIR / "snapshots"))
+LEGACY_VEHICLE_DATA = SCRIPT_DIR / "vehicle_data.json"
+CURRENT_POINTER = "CURRENT"
+
+# How many published snapshots to keep on disk
+SNAPSHOT_RETENTION = int(os.getenv("INVENTORY_SNAPSHOT_RETENTION", "5"))
+
+# How often (seconds) the API checks the pointer for a newly published version, on a
+# background thread
+REFRESH_INTERVAL = float(os.getenv("INVENTORY_REFRESH_INTERVAL", "2"))
+
+def validate_inventory(data: Any):
+    """Raise ValueError unless data looks like a {category: {name: vehicle}} inventory."""
+    if not isinstance(data, dict) or not data:
+        raise ValueError("Inventory must be a non-empty object of categories")
+    count = 0
+    for category, vehicles in data.items():
+        if not isinstance(vehicles, dict):
+            raise ValueError(f"Category '{category}' must be an object of vehicles")
+        for key, vehicle in vehicles.items():
+            if not isinstance(vehicle, dict) or not vehicle.get('vin'):
+                raise ValueError(f"Vehicle '{key}' in '{category}' has no VIN")
+            count += 1
+    if count == 0:
+        raise ValueError("Inventory contains no vehicles")
+
+def _fsync_dir(directory: Path):
+    try:
+        fd = os.open(directory, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+def write_atomic(path: Path, content: bytes):
+    """Write a file via a fsynced temp file and an atomic rename."""
+    path = Path(path)
+    tmp_path = path.with_name(f".{path.name}.tmp")
+    with open(tmp_path, 'wb') as f:
+        f.write(content)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+    _fsync_dir(path.parent)
+
+def publish_snapshot(data: Dict[str, Any], snapshot_dir: Path = SNAPSHOT_DIR,
+                     legacy_path: Optional[Path] = LEGACY_VEHICLE_DATA) -> str:
+    """Publish inventory data as a new versioned snapshot and return its version ID."""
+    validate_inventory(data)
+    snapshot_dir = Path(snapshot_dir)
+    snapshot_dir.mkdir(parents=True, exist_ok=True)
+
+    content = json.dumps(data, indent=2, ensure_ascii=False).encode('utf-8')
+    timestamp = datetime.now(timezone.utc).strftime('%Y%m%dT%H%M%SZ')
+    version = f"{timestamp}-{hashlib.sha1(content).hexdigest()[:10]}"
+
+    # Make sure what hit the disk reads back as a valid inventory before pointing at it
+    snapshot_path = snapshot_dir / f"vehicle_data-{version}.json"
+    write_atomic(snapshot_path, content)
+    with open(snapshot_path, 'r', encoding='utf-8') as f:
+        validate_inventory(json.load(f))
+
+    write_atomic(snapshot_dir / CURRENT_POINTER, version.encode('utf-8'))
+
+    # Tools that still read vehicle_data.json directly get the same data
+    if legacy_path:
+        write_atomic(Path(legacy_path), content)
+
+    _prune_snapshots(snapshot_dir, version)
+    print(f"Published inventory snapshot {version}")
+    return version
+
+def _prune_snapshots(snapshot_dir: Path, current_version: str):
+    snapshots = sorted(snapshot_dir.glob("vehicle_data-*.json"))
+    for path in snapshots[:-SNAPSHOT_RETENTION]:
+        if current_version not in path.name:
+            try:
+                path.unlink()
+            except OSError as e:
+                print(f"Error removing old snapshot {path}: {e}")
+
+class InventorySnapshot:
+    """An immutable, fully loaded version of the inventory.
+
+    Vehicles are held as CompactVehicle records; full dicts are built on output.
+    """
+
+    def __init__(self, version: str, data: Dict[str, Any], published_at: datetime):
+        self.version = version
+        self.published_at = published_at
+
+        # Flatten the data structure once per snapshot
+        pool = StringPool()
+        self.records: List[CompactVehicle] = []
+        for category in data.values():
+            if isinstance(category, dict):
+                self.records.extend(CompactVehicle.from_dict(v, pool) for v in category.values() if isinstance(v, dict))
+        self.by_vin: Dict[str, CompactVehicle] = {r.vin: r for r in self.records if isinstance(r.vin, str)}
+        # Indexes built from this snapshot, kept as long as it is
+        self._derived: Dict[str, Any] = {}
+        self._derived_lock = threading.Lock()
+
+    def derived(self, name: str, build: Callable[["InventorySnapshot"], Any]) -> Any:
+        """Return what `build` makes from this snapshot, building it on first use only."""
+        value = self._derived.get(name)
+        if value is None:
+            with self._derived_lock:
+                value = self._derived.get(name)
+                if value is None:
+                    value = self._derived[name] = build(self)
+        return value
+
+    def vehicle_dicts(self) -> List[Dict[str, Any]]:
+        """Build the full dict of every vehicle."""
+        return [record.to_dict() for record in self.records]
+
+    def get_vehicle(self, vin: str) -> Optional[Dict[str, Any]]:
+        record = self.by_vin.get(vin)
+        return record.to_dict() if record else None
+
+    @classmethod
+    def load(cls, path: Path, version: Optional[str] = None) -> "InventorySnapshot":
+        with open(path, 'rb') as f:
+            content = f.read()
+        data = json.loads(content)
+        if version is None:
+            version = f"legacy-{hashlib.sha1(content).hexdigest()[:10]}"
+        published_at = datetime.fromtimestamp(os.path.getmtime(path), timezone.utc)
+        return cls(version, data, published_at)
+
+class InventoryStore:
+    """Serves the current inventory snapshot and swaps in new versions as they are published.
+
+    Readers take one snapshot reference per request, so a swap never changes the
+    data underneath an in-flight request. New versions are loaded on a
+    background thread (see start()), so reading the current snapshot never
+    waits for a load.
+    """
+
+    def __init__(self, snapshot_dir: Path = SNAPSHOT_DIR, legacy_path: Path = LEGACY_VEHICLE_DATA,
+                 refresh_interval: float = REFRESH_INTERVAL):
+        self.snapshot_dir = Path(snapshot_dir)
+        self.legacy_path = Path(legacy_path)
+        self.refresh_interval = refresh_interval
+        self._snapshot: Optional[InventorySnapshot] = None
+        self._source_stamp = None
+        self._lock = threading.Lock()
+        self._listeners: List[Callable[[InventorySnapshot], Any]] = []
+        self._thread: Optional[threading.Thread] = None
+
+    def _source(self):
+        """Return (path, version, stamp) of the snapshot that should be served."""
+        pointer = self.snapshot_dir / CURRENT_POINTER
+        try:
+            version = pointer.read_text(encoding='utf-8').strip()
+            path = self.snapshot_dir / f"vehicle_data-{version}.json"
+            if version and path.exists():
+                return path, version, ('snapshot', version)
+        except OSError:
+            pass
+        stat = os.stat(self.legacy_path)
+        return self.legacy_path, None, ('legacy', stat.st_mtime_ns, stat.st_size)
+
+    def on_load(self, listener: Callable[[InventorySnapshot], Any]):
+        """Call `listener` with every newly loaded snapshot before it is served, e.g. to build indexes."""
+        with self._lock:
+            self._listeners.append(listener)
+            snapshot = self._snapshot
+        if snapshot is not None:
+            listener(snapshot)
+
+    def _refresh_locked(self) -> InventorySnapshot:
+        try:
+            path, version, stamp = self._source()
+            if self._snapshot is None or stamp != self._source_stamp:
+                snapshot = InventorySnapshot.load(path, version)
+                for listener in self._listeners:
+                    listener(snapshot)
+                # Swap the reference; requests holding the old snapshot keep using it
+                self._snapshot = snapshot
+                self._source_stamp = stamp
+                print(f"[Inventory] Serving version {snapshot.version} ({len(snapshot.records)} vehicles)")
+        except Exception as e:
+            if self._snapshot is None:
+                raise
+            print(f"[Inventory] Failed to load new version, keeping {self._snapshot.version}: {e}")
+        return self._snapshot
+
+    def refresh(self) -> InventorySnapshot:
+        """Load the published version if it differs from the one being served."""
+        with self._lock:
+            return self._refresh_locked()
+
+    def start(self) -> InventorySnapshot:
+        """Load the published version and check for new ones every refresh_interval seconds."""
+        snapshot = self.refresh()
+        with self._lock:
+            if self._thread is None and self.refresh_interval > 0:
+                self._thread = threading.Thread(target=self._watch, name='inventory-refresh', daemon=True)
+                self._thread.start()
+        return snapshot
+
+    def _watch(self):
+        while True:
+            time.sleep(self.refresh_interval)
+            self.refresh()
+
+    def current(self) -> InventorySnapshot:
+        """Get the snapshot to use for the whole of the current request."""
+        snapshot = self._snapshot
+        if snapshot is None:
+            # Only before start(), e.g. in scripts: load once, with no hot swaps
+            return self.refresh()
+        return snapshot
+
+# Create a global inventory store instance
+inventory_store = InventoryStore()
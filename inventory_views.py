@@ -0,0 +1,193 @@
+import base64
+import hashlib
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Dict, List, Any, Optional, Callable
+from compact_inventory import CompactVehicle
+from inventory_store import InventorySnapshot
+
+# Pagination, field projection and conditional GET helpers for the inventory endpoints
+
+MAX_PAGE_SIZE = 500
+
+CHAT_SPECIFICATIONS = ['epa_range', 'horsepower', 'drive']
+
+def chat_vehicle(vehicle: CompactVehicle) -> Dict[str, Any]:
+    """Minimal vehicle data optimized for chat display."""
+    return {
+        'vin': vehicle.field('vin'),
+        'vehicle_name': vehicle.field('vehicle_name'),
+        'main_image': vehicle.field('main_image'),
+        'price': vehicle.field('price'),
+        'parsed_name': vehicle.field('parsed_name', {}),
+        'specifications': {
+            k: v for k, v in vehicle.field('specifications', {}).items()
+            if k in CHAT_SPECIFICATIONS
+        }
+    }
+
+def parse_fields(fields: Optional[str]) -> Optional[List[str]]:
+    """
+    Parse a 'fields=' value like 'vin,price,parsed_name[model]'; None means all
+    fields. The list is sorted and deduplicated so every spelling of the same
+    projection shares one cached body.
+    """
+    if not fields:
+        return None
+    parsed = [field.strip() for field in fields.split(',') if field.strip()]
+    for field in parsed:
+        if field.count('[') != field.count(']') or field.count('[') > 1:
+            raise ValueError(f"Invalid field '{field}'")
+    return sorted(set(parsed)) or None
+
+def project(get: Callable[[str, Any], Any], fields: List[str]) -> Dict[str, Any]:
+    """Build a dict with only the requested fields, nesting 'outer[inner]' keys."""
+    missing = object()
+    result: Dict[str, Any] = {}
+    for field in fields:
+        value = get(field, missing)
+        if value is missing:
+            continue
+        if '[' in field:
+            outer, inner = field[:-1].split('[', 1)
+            if not isinstance(result.get(outer), dict):
+                result[outer] = {}
+            result[outer][inner] = value
+        else:
+            result[field] = value
+    return result
+
+def dict_getter(vehicle: Dict[str, Any]) -> Callable[[str, Any], Any]:
+    """Field getter over a plain dict, matching CompactVehicle.field."""
+    def get(field, default):
+        if '[' in field:
+            outer, inner = field[:-1].split('[', 1)
+            container = vehicle.get(outer)
+            return container.get(inner, default) if isinstance(container, dict) else default
+        return vehicle.get(field, default)
+    return get
+
+def encode_cursor(version: str, offset: int) -> str:
+    return base64.urlsafe_b64encode(f"{version}:{offset}".encode('utf-8')).decode('ascii').rstrip('=')
+
+def decode_cursor(cursor: str, version: str) -> int:
+    """Return the offset a cursor points at; cursors are only valid for their own snapshot."""
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        cursor_version, offset = base64.urlsafe_b64decode(padded).decode('utf-8').rsplit(':', 1)
+        offset = int(offset)
+    except Exception:
+        raise ValueError("Invalid cursor")
+    if cursor_version != version:
+        raise ValueError("Cursor belongs to an older inventory version, restart pagination")
+    if offset < 0:
+        raise ValueError("Invalid cursor")
+    return offset
+
+def paginate(items_count: int, version: str, limit: Optional[int], cursor: Optional[str]):
+    """Return (start, end, next_cursor) for a page of the inventory."""
+    if limit is not None and not 1 <= limit <= MAX_PAGE_SIZE:
+        raise ValueError(f"limit must be between 1 and {MAX_PAGE_SIZE}")
+    start = decode_cursor(cursor, version) if cursor else 0
+    if limit is None:
+        return start, items_count, None
+    end = min(start + limit, items_count)
+    next_cursor = encode_cursor(version, end) if end < items_count else None
+    return start, end, next_cursor
+
+def build_etag(snapshot: InventorySnapshot, variant: str) -> str:
+    """ETag for one representation (endpoint + query) of a snapshot."""
+    digest = hashlib.sha1(variant.encode('utf-8')).hexdigest()[:8]
+    return f'"{snapshot.version}-{digest}"'
+
+def cache_headers(snapshot: InventorySnapshot, etag: str) -> Dict[str, str]:
+    return {
+        'ETag': etag,
+        'Last-Modified': format_datetime(snapshot.published_at.replace(microsecond=0), usegmt=True),
+        'Cache-Control': 'no-cache',
+    }
+
+def is_not_modified(snapshot: InventorySnapshot, etag: str, if_none_match: Optional[str],
+                    if_modified_since: Optional[str]) -> bool:
+    """Evaluate If-None-Match (preferred) or If-Modified-Since for a snapshot representation."""
+    if if_none_match:
+        candidates = [tag.strip() for tag in if_none_match.split(',')]
+        return '*' in candidates or etag in candidates or f"W/{etag}" in candidates
+    if if_modified_since:
+        try:
+            since = parsedate_to_datetime(if_modified_since)
+        except (TypeError, ValueError):
+            return False
+        if since.tzinfo is None:
+            return False
+        return snapshot.published_at.replace(microsecond=0) <= since
+    return False
+
+# Fields sent to the comparison agent, in the repo's 'outer[inner]' key notation
+COMPARISON_FIELDS = [
+    ('Name', 'vehicle_name'),
+    ('Price', 'price'),
+    ('Year', 'parsed_name[year]'),
+    ('Model', 'parsed_name[model]'),
+    ('Trim', 'parsed_name[trim]'),
+    ('Type', 'parsed_name[vehicle_type]'),
+    ('Horsepower', 'specifications[horsepower]'),
+    ('EPA Range', 'specifications[epa_range]'),
+    ('Torque', 'specifications[torque]'),
+    ('Drive', 'specifications[drive]'),
+    ('Exterior Color', 'specifications[exterior_color]'),
+    ('Interior Color', 'specifications[interior_color]'),
+    ('Wheels', 'specifications[wheel_type]'),
+    ('Annual Mileage', 'annual_mileage'),
+    ('Warranty', 'warranty'),
+]
+
+def resolve_vehicles(snapshot: InventorySnapshot, vehicles: List[Any]) -> List[CompactVehicle]:
+    """
+    Resolve comparison inputs to inventory records. Accepts VINs, or vehicle
+    objects from older clients which are looked up by their 'vin'.
+    Unknown VINs are skipped and a repeated VIN is kept once, so a request
+    naming the same vehicle twice has fewer than two vehicles to compare.
+    """
+    records = []
+    seen = set()
+    for vehicle in vehicles:
+        vin = vehicle.get('vin') if isinstance(vehicle, dict) else vehicle
+        record = snapshot.by_vin.get(vin) if isinstance(vin, str) else None
+        if record is not None and vin not in seen:
+            seen.add(vin)
+            records.append(record)
+    return records
+
+def _cell(value: Any) -> str:
+    if value in [None, ""]:
+        return "N/A"
+    return str(value).replace('|', '/').replace('\n', '; ')
+
+def comparison_table(records: List[CompactVehicle]) -> str:
+    """
+    Compact pipe-separated table of the comparison-relevant fields, one column
+    per vehicle. Values and features shared by every vehicle are listed once;
+    each vehicle's column only lists what sets it apart.
+    """
+    lines = ["Field | " + " | ".join(_cell(record.field('vin')) for record in records)]
+    for label, key in COMPARISON_FIELDS:
+        values = [record.field(key) for record in records]
+        if all(value in [None, ""] for value in values):
+            continue
+        cells = [_cell(value) for value in values]
+        if len(cells) > 1 and len(set(cells)) == 1:
+            lines.append(f"{label} | {cells[0]} (all)")
+        else:
+            lines.append(f"{label} | " + " | ".join(cells))
+
+    feature_sets = []
+    for record in records:
+        features = record.field('features', {})
+        feature_sets.append({item for items in features.values() for item in items}
+                            if isinstance(features, dict) else set())
+    shared = set.intersection(*feature_sets) if feature_sets else set()
+    lines.append("Other Features | " + " | ".join(
+        _cell(", ".join(sorted(features - shared))) for features in feature_sets))
+    if shared:
+        lines.append(f"Shared Features | {', '.join(sorted(shared))}")
+    return "\n".join(lines)
@@ -0,0 +1,96 @@
+import os
+from typing import Dict, List, Any
+from metrics import metrics
+from model_registry import model_registry, ModelConfig
+
+# Pluggable LLM backend for every agent. 'crewai' (the default) runs real crews
+# against OpenAI; 'fake' answers locally with scripted or rule-generated output
+# in the formats each agent is expected to produce, so the whole API can run
+# without network access. Select with DEALERBOT_LLM_BACKEND=crewai|fake.
+# Which model each agent runs on comes from the model registry
+# (model_config.json), not from the code that creates the agents.
+
+LLM_BACKEND = os.getenv("DEALERBOT_LLM_BACKEND", "crewai").lower()
+
+llm_fallbacks = metrics.counter(
+    'dealerbot_llm_fallbacks_total', 'LLM calls retried on the fallback model', ('agent', 'model'))
+
+class AgentSpec:
+    """An agent's fields; the model behind it is looked up in the model registry per call."""
+    __slots__ = ('key', 'fields')
+
+    def __init__(self, key: str, fields: Dict[str, Any]):
+        self.key = key
+        self.fields = fields
+
+class TaskSpec:
+    __slots__ = ('description', 'agent', 'expected_output')
+
+    def __init__(self, description: str, agent: AgentSpec, expected_output: str):
+        self.description = description
+        self.agent = agent
+        self.expected_output = expected_output
+
+class CrewAIBackend:
+    """Runs each task as a single-agent CrewAI crew."""
+    name = 'crewai'
+
+    def __init__(self):
+        # Imported here so the fake backend works without crewai or an API key
+        from crewai import Agent, Crew, Task # type: ignore
+        from langchain_openai import ChatOpenAI # type: ignore
+        self._agent_cls, self._crew_cls, self._task_cls = Agent, Crew, Task
+        self._chat_cls = ChatOpenAI
+        self.openai_api_key = os.environ["OPENAI_API_KEY"]
+        # (agent key, model settings) -> CrewAI agent
+        self._agents: Dict[tuple, Any] = {}
+
+    def agent(self, key: str, **fields) -> AgentSpec:
+        return AgentSpec(key, fields)
+
+    def task(self, description: str, agent: AgentSpec, expected_output: str) -> TaskSpec:
+        return TaskSpec(description, agent, expected_output)
+
+    def _crew(self, spec: TaskSpec, config: ModelConfig):
+        cache_key = (spec.agent.key,) + tuple(config.to_dict().values())
+        agent = self._agents.get(cache_key)
+        if agent is None:
+            settings = {'model': config.model, 'temperature': config.temperature,
+                        'max_tokens': config.max_tokens, 'timeout': config.timeout}
+            chat = self._chat_cls(**{name: value for name, value in settings.items() if value is not None})
+            agent = self._agents[cache_key] = self._agent_cls(llm=chat, **spec.agent.fields)
+        task = self._task_cls(description=spec.description, agent=agent, expected_output=spec.expected_output)
+        return self._crew_cls(agents=[agent], tasks=[task], verbose=False)
+
+    def _with_fallback(self, spec: TaskSpec, call):
+        config = model_registry.get(spec.agent.key)
+        try:
+            return call(self._crew(spec, config))
+        except Exception as e:
+            fallback = model_registry.fallback(spec.agent.key)
+            if fallback is None:
+                raise
+            print(f"[LLM] {spec.agent.key} failed on {config.model} ({e}), retrying on {fallback.model}")
+            llm_fallbacks.inc(agent=spec.agent.key, model=fallback.model)
+            return call(self._crew(spec, fallback))
+
+    def run(self, agent: AgentSpec, task: TaskSpec) -> str:
+        return self._with_fallback(task, lambda crew: crew.kickoff().raw.strip())
+
+    def run_for_each(self, agent: AgentSpec, task: TaskSpec, inputs: List[Dict[str, str]]) -> List[str]:
+        """Run a templated task once per input dict (CrewAI's kickoff_for_each)."""
+        return self._with_fallback(task, lambda crew: [
+            str(output.raw if hasattr(output, 'raw') else output).strip()
+            for output in crew.kickoff_for_each(inputs=inputs)])
+
+def create_backend(name: str = LLM_BACKEND):
+    if name == 'fake':
+        from fake_llm import FakeBackend
+        return FakeBackend()
+    if name != 'crewai':
+        raise ValueError(f"Unknown DEALERBOT_LLM_BACKEND '{name}' (expected 'crewai' or 'fake')")
+    return CrewAIBackend()
+
+# Global LLM backend instance
+llm = create_backend()
+print(f"[LLM] Using {llm.name} backend")
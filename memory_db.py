@@ -0,0 +1,140 @@
+import json
+import re
+import threading
+import time
+from typing import Dict, List, Any, Optional
+
+# In-memory stand-in for the PostgreSQL connection pool, used with
+# DEALERBOT_DB_BACKEND=memory for load tests and offline runs. It understands
+# only the statements database.py and session_manager.py issue, so those
+# modules run unchanged. There are no transactions: writes apply immediately
+# and rollback does nothing.
+
+class MemoryDatabase:
+    """Tables for sessions and chat messages guarded by a single lock."""
+
+    def __init__(self, latency_ms: float = 0):
+        # Simulated round trip per statement
+        self.latency_ms = latency_ms
+        self.sessions: Dict[str, Dict[str, Any]] = {}
+        # (role, message, session_id, route, all_vehicles) in insertion order
+        self.messages: List[tuple] = []
+        self.lock = threading.Lock()
+        self._statements = [
+            (re.compile(r"^CREATE TABLE"), self._noop),
+            (re.compile(r"^ALTER TABLE"), self._noop),
+            (re.compile(r"^INSERT INTO sessions"), self._insert_session),
+            (re.compile(r"^SELECT context, last_activity FROM sessions WHERE"), self._select_session),
+            (re.compile(r"^SELECT context FROM sessions WHERE"), self._select_context),
+            (re.compile(r"^UPDATE sessions SET context = %s, last_activity = %s WHERE"), self._update_context),
+            (re.compile(r"^UPDATE sessions SET last_activity = %s WHERE"), self._touch_session),
+            (re.compile(r"^DELETE FROM sessions WHERE"), self._delete_session),
+            (re.compile(r"^DELETE FROM sessions$"), self._delete_sessions),
+            (re.compile(r"^INSERT INTO messages"), self._insert_message),
+            (re.compile(r"^SELECT role, message, session_id FROM messages"), self._select_messages),
+            (re.compile(r"^SELECT message, session_id, route, all_vehicles FROM messages WHERE role = 'user'"),
+             self._select_routing_labels),
+            (re.compile(r"^DELETE FROM messages"), self._delete_messages),
+        ]
+
+    def execute(self, sql: str, params: tuple = ()) -> List[tuple]:
+        if self.latency_ms:
+            time.sleep(self.latency_ms / 1000)
+        statement = ' '.join(sql.split())
+        for pattern, handler in self._statements:
+            if pattern.match(statement):
+                with self.lock:
+                    return handler(*params)
+        raise ValueError(f"Statement not supported by the in-memory database: {statement[:80]}")
+
+    def _noop(self) -> List[tuple]:
+        return []
+
+    def _insert_session(self, session_id, context, last_activity) -> List[tuple]:
+        if session_id in self.sessions:
+            raise ValueError(f"Duplicate session_id {session_id}")
+        self.sessions[session_id] = {'context': context, 'last_activity': last_activity}
+        return []
+
+    def _select_session(self, session_id) -> List[tuple]:
+        row = self.sessions.get(session_id)
+        # JSONB columns come back from psycopg2 as dicts
+        return [(json.loads(row['context']), row['last_activity'])] if row else []
+
+    def _select_context(self, session_id) -> List[tuple]:
+        row = self.sessions.get(session_id)
+        return [(json.loads(row['context']),)] if row else []
+
+    def _update_context(self, context, last_activity, session_id) -> List[tuple]:
+        if session_id in self.sessions:
+            self.sessions[session_id] = {'context': context, 'last_activity': last_activity}
+        return []
+
+    def _touch_session(self, last_activity, session_id) -> List[tuple]:
+        if session_id in self.sessions:
+            self.sessions[session_id]['last_activity'] = last_activity
+        return []
+
+    def _delete_session(self, session_id) -> List[tuple]:
+        self.sessions.pop(session_id, None)
+        return []
+
+    def _delete_sessions(self) -> List[tuple]:
+        self.sessions.clear()
+        return []
+
+    def _insert_message(self, role, message, session_id, route=None, all_vehicles=None) -> List[tuple]:
+        self.messages.append((role, message, session_id, route, all_vehicles))
+        return []
+
+    def _select_messages(self) -> List[tuple]:
+        return [row[:3] for row in self.messages]
+
+    def _select_routing_labels(self) -> List[tuple]:
+        return [row[1:] for row in self.messages if row[0] == 'user']
+
+    def _delete_messages(self) -> List[tuple]:
+        self.messages.clear()
+        return []
+
+class MemoryCursor:
+    def __init__(self, database: MemoryDatabase):
+        self.database = database
+        self._rows: List[tuple] = []
+
+    def execute(self, sql: str, params: tuple = ()):
+        self._rows = self.database.execute(sql, params)
+
+    def fetchone(self) -> Optional[tuple]:
+        return self._rows[0] if self._rows else None
+
+    def fetchall(self) -> List[tuple]:
+        return list(self._rows)
+
+    def close(self):
+        self._rows = []
+
+class MemoryConnection:
+    def __init__(self, database: MemoryDatabase):
+        self.database = database
+
+    def cursor(self) -> MemoryCursor:
+        return MemoryCursor(self.database)
+
+    def commit(self):
+        pass
+
+    def rollback(self):
+        pass
+
+class MemoryConnectionPool:
+    """Same getconn/putconn interface as psycopg2's SimpleConnectionPool."""
+
+    def __init__(self, latency_ms: float = 0):
+        self.database = MemoryDatabase(latency_ms)
+
+    def getconn(self) -> MemoryConnection:
+        return MemoryConnection(self.database)
+
+    def putconn(self, conn: MemoryConnection):
+        pass
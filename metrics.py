@@ -0,0 +1,176 @@
+import bisect
+import threading
+from typing import Dict, List, Any, Tuple
+
+# Minimal in-process metrics: labelled counters, gauges and histograms kept in a global
+# registry. Histograms use fixed buckets so they can be summarised (count, mean,
+# approximate percentiles) without storing every observation.
+
+# Latency buckets in milliseconds
+DEFAULT_BUCKETS = (0.1, 0.25, 0.5, 1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000, 30000, 60000)
+
+class Counter:
+    """Monotonic counter with optional labels."""
+
+    def __init__(self, name: str, description: str, labelnames: Tuple[str, ...] = ()):
+        self.name = name
+        self.description = description
+        self.labelnames = labelnames
+        self._values: Dict[Tuple[str, ...], float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1, **labels):
+        key = tuple(str(labels.get(name, '')) for name in self.labelnames)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels) -> float:
+        key = tuple(str(labels.get(name, '')) for name in self.labelnames)
+        with self._lock:
+            return self._values.get(key, 0)
+
+    def samples(self) -> List[Tuple[Dict[str, str], float]]:
+        with self._lock:
+            return [(dict(zip(self.labelnames, key)), value) for key, value in self._values.items()]
+
+    def summary(self) -> Any:
+        samples = self.samples()
+        if not self.labelnames:
+            return samples[0][1] if samples else 0
+        return {'|'.join(labels.values()): value for labels, value in samples}
+
+class Gauge(Counter):
+    """Value that goes up and down (queue depth, requests in flight)."""
+
+    def set(self, value: float, **labels):
+        key = tuple(str(labels.get(name, '')) for name in self.labelnames)
+        with self._lock:
+            self._values[key] = value
+
+    def dec(self, amount: float = 1, **labels):
+        self.inc(-amount, **labels)
+
+class _HistogramSeries:
+    __slots__ = ('counts', 'count', 'sum')
+
+    def __init__(self, size: int):
+        self.counts = [0] * size
+        self.count = 0
+        self.sum = 0.0
+
+class Histogram:
+    """Bucketed histogram with optional labels."""
+
+    def __init__(self, name: str, description: str, labelnames: Tuple[str, ...] = (),
+                 buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        self.name = name
+        self.description = description
+        self.labelnames = labelnames
+        self.buckets = tuple(sorted(buckets))
+        self._series: Dict[Tuple[str, ...], _HistogramSeries] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels):
+        key = tuple(str(labels.get(name, '')) for name in self.labelnames)
+        # The extra last slot counts observations above the largest bucket
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = _HistogramSeries(len(self.buckets) + 1)
+            series.counts[index] += 1
+            series.count += 1
+            series.sum += value
+
+    def samples(self) -> List[Tuple[Dict[str, str], List[int], int, float]]:
+        """(labels, per-bucket counts, count, sum) for every label set."""
+        with self._lock:
+            return [(dict(zip(self.labelnames, key)), list(s.counts), s.count, s.sum)
+                    for key, s in self._series.items()]
+
+    def _quantile(self, counts: List[int], count: int, q: float) -> float:
+        """Approximate quantile: the upper bound of the bucket it falls in (capped at the last bucket)."""
+        rank = q * count
+        seen = 0
+        for index, bucket_count in enumerate(counts):
+            seen += bucket_count
+            if seen >= rank and bucket_count:
+                return self.buckets[min(index, len(self.buckets) - 1)]
+        return 0.0
+
+    def summary(self) -> Dict[str, Any]:
+        result = {}
+        for labels, counts, count, total in self.samples():
+            result['|'.join(labels.values()) or 'all'] = {
+                'count': count,
+                'mean': round(total / count, 3) if count else 0.0,
+                'p50': self._quantile(counts, count, 0.5),
+                'p95': self._quantile(counts, count, 0.95),
+                'p99': self._quantile(counts, count, 0.99),
+            }
+        return result
+
+class MetricsRegistry:
+    """Holds every metric so they can be reported together."""
+
+    def __init__(self):
+        self._metrics: Dict[str, Any] = {}
+        self._lock = threading.Lock()
+
+    def _register(self, metric):
+        with self._lock:
+            # Re-registering a name (e.g. on module reload) returns the existing metric
+            return self._metrics.setdefault(metric.name, metric)
+
+    def counter(self, name: str, description: str, labelnames: Tuple[str, ...] = ()) -> Counter:
+        return self._register(Counter(name, description, labelnames))
+
+    def gauge(self, name: str, description: str, labelnames: Tuple[str, ...] = ()) -> Gauge:
+        return self._register(Gauge(name, description, labelnames))
+
+    def histogram(self, name: str, description: str, labelnames: Tuple[str, ...] = (),
+                  buckets: Tuple[float, ...] = DEFAULT_BUCKETS) -> Histogram:
+        return self._register(Histogram(name, description, labelnames, buckets))
+
+    def metrics(self) -> List[Any]:
+        with self._lock:
+            return list(self._metrics.values())
+
+    def summary(self, prefix: str = '') -> Dict[str, Any]:
+        return {metric.name: metric.summary() for metric in self.metrics() if metric.name.startswith(prefix)}
+
+def _escape(value: str) -> str:
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+def _format_labels(labels: Dict[str, str]) -> str:
+    if not labels:
+        return ''
+    return '{' + ','.join(f'{k}="{_escape(v)}"' for k, v in labels.items()) + '}'
+
+def _format_value(value: float) -> str:
+    return repr(float(value)) if value != int(value) else str(int(value))
+
+def render_prometheus(registry: "MetricsRegistry") -> str:
+    """Render every metric in the Prometheus text exposition format."""
+    lines = []
+    for metric in registry.metrics():
+        kind = 'gauge' if isinstance(metric, Gauge) else 'counter' if isinstance(metric, Counter) else 'histogram'
+        lines.append(f"# HELP {metric.name} {metric.description}")
+        lines.append(f"# TYPE {metric.name} {kind}")
+        if isinstance(metric, Counter):
+            for labels, value in metric.samples():
+                lines.append(f"{metric.name}{_format_labels(labels)} {_format_value(value)}")
+            continue
+        for labels, counts, count, total in metric.samples():
+            cumulative = 0
+            for bound, bucket_count in zip(metric.buckets, counts):
+                cumulative += bucket_count
+                bucket_labels = dict(labels, le=_format_value(bound))
+                lines.append(f"{metric.name}_bucket{_format_labels(bucket_labels)} {cumulative}")
+            lines.append(f"{metric.name}_bucket{_format_labels(dict(labels, le='+Inf'))} {count}")
+            lines.append(f"{metric.name}_sum{_format_labels(labels)} {_format_value(round(total, 6))}")
+            lines.append(f"{metric.name}_count{_format_labels(labels)} {count}")
+    return '\n'.join(lines) + '\n'
+
+# Global metrics registry
+metrics = MetricsRegistry()
@@ -0,0 +1,127 @@
+import json
+import os
+from typing import Dict, Any, Optional
+
+# Model settings per agent, read from a JSON config instead of being hard-coded
+# where the agents are created. The file has a "default" entry and per-agent
+# entries that override any of its fields:
+#
+#   {"default": {"model": "gpt-4", "temperature": null, "max_tokens": null,
+#                "timeout": null, "fallback": "gpt-3.5-turbo"},
+#    "agents": {"controller": {"model": "gpt-4o-mini", "temperature": 0}},
+#    "models": {"gpt-4": {"first_token_s": 1.2, "tokens_per_s": 25}}}
+#
+# null leaves the provider default in place; "fallback" is the model retried
+# once when a call to the primary model fails or times out. max_tokens is
+# left null (uncapped) unless an agent's output length has been measured, so
+# answers aren't truncated. For an agent with a max_tokens, a null timeout is
+# worked out from the model's speed under "models": the time to the first
+# token plus max_tokens at its output rate, with MODEL_TIMEOUT_MARGIN to
+# spare and never less than MODEL_TIMEOUT_FLOOR_S, since short outputs still
+# wait on the provider's latency tail. Without a max_tokens the call is only
+# bounded by its stage deadline (see deadlines). The LLM backends look the
+# settings up on every call, so overrides (see override()) apply to agents
+# that already exist.
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+MODEL_CONFIG_PATH = os.getenv("MODEL_CONFIG_PATH", os.path.join(SCRIPT_DIR, "model_config.json"))
+
+# Headroom over a model's typical time for max_tokens before the call is abandoned
+MODEL_TIMEOUT_MARGIN = float(os.getenv("MODEL_TIMEOUT_MARGIN", "1.25"))
+# Shortest provider timeout worked out from max_tokens
+MODEL_TIMEOUT_FLOOR_S = float(os.getenv("MODEL_TIMEOUT_FLOOR_S", "10"))
+
+MODEL_FIELDS = ('model', 'temperature', 'max_tokens', 'timeout', 'fallback')
+BUILTIN_DEFAULT = {'model': 'gpt-4', 'temperature': None, 'max_tokens': None, 'timeout': None, 'fallback': None}
+
+class ModelConfig:
+    """Settings of the model behind one agent."""
+    __slots__ = MODEL_FIELDS
+
+    def __init__(self, model: str, temperature: Optional[float] = None, max_tokens: Optional[int] = None,
+                 timeout: Optional[float] = None, fallback: Optional[str] = None):
+        self.model = model
+        self.temperature = temperature
+        self.max_tokens = max_tokens
+        self.timeout = timeout
+        self.fallback = fallback
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {field: getattr(self, field) for field in MODEL_FIELDS}
+
+def _checked(entry: Dict[str, Any], where: str) -> Dict[str, Any]:
+    unknown = set(entry) - set(MODEL_FIELDS)
+    if unknown:
+        raise ValueError(f"Unknown model setting(s) {sorted(unknown)} in {where}")
+    return entry
+
+class ModelRegistry:
+    """Per-agent model settings: config file, then any in-process overrides."""
+
+    def __init__(self, path: Optional[str] = MODEL_CONFIG_PATH):
+        self._default: Dict[str, Any] = dict(BUILTIN_DEFAULT)
+        self._agents: Dict[str, Dict[str, Any]] = {}
+        self._overrides: Dict[str, Dict[str, Any]] = {}
+        # Model name -> {"first_token_s", "tokens_per_s"}
+        self.speeds: Dict[str, Dict[str, float]] = {}
+        self.path = None
+        if path:
+            self.load(path)
+
+    def load(self, path: str):
+        """Replace the file settings with the ones in `path`; a missing file keeps the built-in default."""
+        if not os.path.exists(path):
+            print(f"[Models] No model config at {path}, every agent uses {self._default['model']}")
+            return
+        with open(path, 'r', encoding='utf-8') as f:
+            config = json.load(f)
+        self._default = {**BUILTIN_DEFAULT, **_checked(config.get('default', {}), f"{path} default")}
+        self._agents = {key: _checked(entry, f"{path} agent '{key}'")
+                        for key, entry in config.get('agents', {}).items()}
+        self.speeds = config.get('models', {})
+        for model, speed in self.speeds.items():
+            if set(speed) != {'first_token_s', 'tokens_per_s'}:
+                raise ValueError(f"Model '{model}' in {path} needs exactly first_token_s and tokens_per_s")
+        self.path = path
+
+    def override(self, assignments: Dict[str, Dict[str, Any]]):
+        """
+        Replace the in-process overrides, e.g. {'controller': {'model': 'gpt-4o-mini'}};
+        '*' applies to every agent. An empty dict clears them.
+        """
+        self._overrides = {key: _checked(entry, f"override '{key}'") for key, entry in assignments.items()}
+
+    def _settings(self, key: str) -> Dict[str, Any]:
+        return {**self._default, **self._agents.get(key, {}),
+                **self._overrides.get('*', {}), **self._overrides.get(key, {})}
+
+    def output_timeout(self, model: str, max_tokens: Optional[int]) -> Optional[float]:
+        """Seconds `model` may take for `max_tokens` of output; None if its speed or the limit is unknown."""
+        speed = self.speeds.get(model)
+        if speed is None or max_tokens is None:
+            return None
+        expected = speed['first_token_s'] + max_tokens / speed['tokens_per_s']
+        return round(max(MODEL_TIMEOUT_FLOOR_S, MODEL_TIMEOUT_MARGIN * expected), 2)
+
+    def _config(self, settings: Dict[str, Any]) -> ModelConfig:
+        if settings['timeout'] is None:
+            settings = {**settings, 'timeout': self.output_timeout(settings['model'], settings['max_tokens'])}
+        return ModelConfig(**settings)
+
+    def get(self, key: str) -> ModelConfig:
+        return self._config(self._settings(key))
+
+    def fallback(self, key: str) -> Optional[ModelConfig]:
+        """Settings for retrying `key` on its fallback model, or None if it has none."""
+        settings = self._settings(key)
+        if not settings['fallback']:
+            return None
+        return self._config({**settings, 'model': settings['fallback'], 'fallback': None})
+
+    def describe(self) -> Dict[str, Dict[str, Any]]:
+        """Effective settings of every configured or overridden agent."""
+        keys = sorted((set(self._agents) | set(self._overrides)) - {'*'})
+        return {'default': self.get('*').to_dict(), 'agents': {key: self.get(key).to_dict() for key in keys}}
+
+# Global model registry
+model_registry = ModelRegistry()
@@ -0,0 +1,120 @@
+import json
+import os
+from typing import Dict, List, Any, Optional, Callable
+from metrics import metrics
+from token_budget import count_tokens, clip_to_budget
+
+# Central place where agent task descriptions are assembled. Every prompt is
+# built from named sections; the fixed instructions are always kept, and when
+# the total goes over the agent's token budget the variable sections (history,
+# raw data, comparison tables) are summarized and then clipped, least important
+# first. Token counts are recorded per agent.
+
+# Default token budget for each agent's task description, overridable with
+# PROMPT_BUDGET_<AGENT> (e.g. PROMPT_BUDGET_FORMATTER=4000)
+DEFAULT_PROMPT_BUDGETS = {
+    'controller': 1500,
+    'all_vehicles': 800,
+    'interest': 600,
+    'identifier': 1200,
+    'ford_expert': 1500,
+    'inventory': 600,
+    'customer_relations': 1000,
+    'formatter': 2500,
+    'data_request': 600,
+    'comparison': 2500,
+}
+DEFAULT_PROMPT_BUDGET = 2000
+
+# Token buckets for the prompt size histogram
+PROMPT_TOKEN_BUCKETS = (50, 100, 250, 500, 750, 1000, 1500, 2000, 3000, 4000, 8000, 16000, 32000)
+
+prompt_tokens = metrics.histogram(
+    'dealerbot_prompt_tokens', 'Tokens in each agent task description', ('agent',), PROMPT_TOKEN_BUCKETS)
+prompt_trimmed = metrics.counter(
+    'dealerbot_prompt_trimmed_total', 'Prompt sections summarized or clipped to fit the budget', ('agent', 'section'))
+
+def prompt_budget(agent: str) -> int:
+    default = DEFAULT_PROMPT_BUDGETS.get(agent, DEFAULT_PROMPT_BUDGET)
+    return int(os.getenv(f"PROMPT_BUDGET_{agent.upper()}", str(default)))
+
+class Section:
+    """
+    One part of a prompt. Priority 0 is never trimmed; higher numbers are
+    trimmed first. `summarize` returns a shorter version of the text and is
+    tried before clipping.
+    """
+
+    def __init__(self, name: str, text: str, priority: int = 0,
+                 summarize: Optional[Callable[[str], str]] = None):
+        self.name = name
+        self.text = text or ""
+        self.priority = priority
+        self.summarize = summarize
+
+def _clip(text: str, budget: int) -> str:
+    # Keep the section's trailing newline so the next section still starts on its own line
+    ending = '\n' if text.endswith('\n') else ''
+    clipped = clip_to_budget(text.rstrip('\n'), budget - len(ending))
+    return clipped + ending if clipped else ending
+
+def build_prompt(agent: str, sections: List[Section], budget: Optional[int] = None) -> str:
+    """Join `sections` into a task description that fits `agent`'s token budget; `sections` are left as given."""
+    budget = budget or prompt_budget(agent)
+    texts = [section.text for section in sections]
+    counts = [count_tokens(text) for text in texts]
+    total = sum(counts)
+
+    if total > budget:
+        trimmable = sorted((i for i, section in enumerate(sections) if section.priority > 0),
+                           key=lambda i: -sections[i].priority)
+        for i in trimmable:
+            if total <= budget:
+                break
+            section = sections[i]
+            if section.summarize:
+                texts[i] = section.summarize(texts[i])
+                total -= counts[i] - count_tokens(texts[i])
+                counts[i] = count_tokens(texts[i])
+            if total > budget:
+                texts[i] = _clip(texts[i], max(0, counts[i] - (total - budget)))
+                total -= counts[i] - count_tokens(texts[i])
+                counts[i] = count_tokens(texts[i])
+            prompt_trimmed.inc(agent=agent, section=section.name)
+        if total > budget:
+            print(f"[Prompt] {agent}: required sections alone take {total} tokens (budget {budget})")
+
+    prompt = "".join(texts)
+    prompt_tokens.observe(count_tokens(prompt), agent=agent)
+    return prompt
+
+def user_queries_only(history_context: str) -> str:
+    """Summarize a history block down to the user's side of the conversation."""
+    lines = [line for line in history_context.split('\n') if not line.startswith('Assistant:')]
+    return '\n'.join(lines)
+
+# Keys that carry no information for a language model
+BULKY_KEYS = ('main_image', 'additional_images')
+
+def _without_bulky_keys(value):
+    if isinstance(value, dict):
+        return {k: _without_bulky_keys(v) for k, v in value.items() if k not in BULKY_KEYS}
+    if isinstance(value, list):
+        return [_without_bulky_keys(item) for item in value]
+    return value
+
+def compact_data(raw: str) -> str:
+    """Summarize a data dump: drop image URLs from JSON and collapse whitespace."""
+    prefix, _, data = raw.partition(': ')
+    try:
+        data = json.dumps(_without_bulky_keys(json.loads(data)), separators=(',', ':'), ensure_ascii=False)
+        return f"{prefix}: {data}\n\n"
+    except (TypeError, ValueError):
+        return ' '.join(raw.split()) + '\n\n'
+
+def prompt_stats() -> Dict[str, Any]:
+    return {
+        'budgets': {agent: prompt_budget(agent) for agent in DEFAULT_PROMPT_BUDGETS},
+        'tokens': prompt_tokens.summary(),
+        'trimmed': prompt_trimmed.summary(),
+    }
@@ -0,0 +1,134 @@
+import gzip
+import json
+import os
+import threading
+from collections import OrderedDict
+from typing import Dict, Any, Optional, Callable, Tuple
+from fastapi import Response
+from fastapi.responses import JSONResponse
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# Pre-rendered, pre-compressed response bodies for read-only endpoints. A body is
+# encoded and compressed once per (snapshot version, request variant) and then
+# served as raw bytes, so repeat hits cost a dict lookup instead of rebuilding,
+# re-encoding and re-compressing the inventory.
+
+RESPONSE_CACHE_SIZE = int(os.getenv("RESPONSE_CACHE_SIZE", "256"))
+# Bodies smaller than this are not worth compressing
+MIN_COMPRESS_SIZE = int(os.getenv("MIN_COMPRESS_SIZE", "1024"))
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 9
+
+def dumps(content: Any) -> bytes:
+    """Encode to JSON bytes, using orjson when it is installed."""
+    if orjson is not None:
+        return orjson.dumps(content, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(content, ensure_ascii=False, allow_nan=False, separators=(',', ':')).encode('utf-8')
+
+class FastJSONResponse(JSONResponse):
+    """JSONResponse rendered with the fast encoder."""
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
+
+class RenderedBody:
+    """One response body in every encoding we can serve."""
+    __slots__ = ('encodings',)
+
+    def __init__(self, body: bytes):
+        self.encodings: Dict[str, bytes] = {'identity': body}
+        if len(body) >= MIN_COMPRESS_SIZE:
+            if brotli is not None:
+                self.encodings['br'] = brotli.compress(body, quality=BROTLI_QUALITY)
+            self.encodings['gzip'] = gzip.compress(body, compresslevel=GZIP_LEVEL, mtime=0)
+
+    def select(self, accept_encoding: Optional[str]) -> Tuple[str, bytes]:
+        """Pick the smallest encoding the client accepts."""
+        accepted = _parse_accept_encoding(accept_encoding)
+        for encoding in ('br', 'gzip'):
+            if encoding in self.encodings and accepted.get(encoding, accepted.get('*', 0)) > 0:
+                return encoding, self.encodings[encoding]
+        return 'identity', self.encodings['identity']
+
+def _parse_accept_encoding(header: Optional[str]) -> Dict[str, float]:
+    accepted: Dict[str, float] = {}
+    for part in (header or '').split(','):
+        coding, _, params = part.strip().partition(';')
+        if not coding:
+            continue
+        quality = 1.0
+        params = params.strip()
+        if params.startswith('q='):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        accepted[coding.strip().lower()] = quality
+    return accepted
+
+class ResponseCache:
+    """LRU of rendered bodies keyed by snapshot version and request variant."""
+
+    def __init__(self, max_entries: int = RESPONSE_CACHE_SIZE):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Tuple[str, str], RenderedBody]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get_or_render(self, version: str, variant: str, build: Callable[[], Any],
+                      current_version: Optional[Callable[[], str]] = None) -> RenderedBody:
+        """
+        The cached body for (version, variant), rendering it with `build` on a miss.
+        `current_version` returns the published snapshot version: bodies of other
+        versions are dropped, and a body rendered for an older one isn't cached.
+        """
+        key = (version, variant)
+        with self._lock:
+            rendered = self._entries.get(key)
+            if rendered is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return rendered
+            self.misses += 1
+
+        # Render outside the lock; a concurrent miss just renders the same bytes twice
+        rendered = RenderedBody(dumps(build()))
+        with self._lock:
+            live = current_version() if current_version is not None else version
+            if version != live:
+                # A request still on a replaced snapshot must not evict the live one's bodies
+                return rendered
+            # Bodies from replaced snapshots are never served again
+            for stale in [k for k in self._entries if k[0] != live]:
+                del self._entries[stale]
+            self._entries[key] = rendered
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return rendered
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {"entries": len(self._entries), "hits": self.hits, "misses": self.misses}
+
+def rendered_response(rendered: RenderedBody, accept_encoding: Optional[str],
+                      headers: Dict[str, str], status_code: int = 200):
+    """Serve a pre-rendered body with the right Content-Encoding."""
+    encoding, body = rendered.select(accept_encoding)
+    headers = dict(headers)
+    headers['Vary'] = 'Accept-Encoding'
+    if encoding != 'identity':
+        headers['Content-Encoding'] = encoding
+    return Response(content=body, status_code=status_code, headers=headers, media_type='application/json')
+
+# Global response cache instance
+response_cache = ResponseCache()
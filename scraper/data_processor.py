@@ -1,31 +1,48 @@
-from crewai import Agent, Task, Crew # type: ignore
-from langchain_openai import ChatOpenAI # type: ignore
-from typing import Dict, List, Any
+from typing import Dict, List, Any, Optional
+from concurrent.futures import ThreadPoolExecutor
 import json
 import os
+import re
+import sys
+import time
 from dotenv import load_dotenv
+from manual_vehicle_name_parser import manual_parse_vehicle_name, score_manual_parse
+from name_parse_cache import NameParseCache
 
 load_dotenv()
 
-openai_api_key = os.environ["OPENAI_API_KEY"]
+# The LLM backend lives in the project root next to dealerbot.py
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from llm_backend import llm
 
-# Initialize the LLM
-llm = ChatOpenAI(model="gpt-4")
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Manual parses scoring at least this much are used without asking the LLM
+NAME_PARSE_CONFIDENCE_THRESHOLD = float(os.getenv("NAME_PARSE_CONFIDENCE_THRESHOLD", "0.8"))
+NAME_PARSE_CACHE_PATH = os.getenv("NAME_PARSE_CACHE_PATH", os.path.join(SCRIPT_DIR, "name_parse_cache.json"))
+
+# Names the LLM has to parse are sent this many per request, with at most
+# NAME_PARSE_MAX_CONCURRENCY requests in flight
+NAME_PARSE_BATCH_MODE = os.getenv("NAME_PARSE_BATCH_MODE", "true").lower() == "true"
+NAME_PARSE_BATCH_SIZE = int(os.getenv("NAME_PARSE_BATCH_SIZE", "20"))
+NAME_PARSE_MAX_CONCURRENCY = int(os.getenv("NAME_PARSE_MAX_CONCURRENCY", "4"))
+
+name_parse_cache = NameParseCache(NAME_PARSE_CACHE_PATH)
 
 # Create the data processing agent
-data_processor_agent = Agent(
+data_processor_agent = llm.agent(
+    key='name_parser',
     name="Vehicle Data Processor",
     role="Process and structure vehicle data, especially vehicle names and types",
     goal="Extract and structure vehicle information, including parsing vehicle names into year, make, model, trim, and determining vehicle type",
     backstory="""You are an expert at processing and structuring vehicle data, with particular expertise in parsing vehicle names and determining vehicle types.
     You can accurately extract year, make, model, and trim information from vehicle names and determine the vehicle type (e.g., SUV, Truck, Sedan, etc.) based on the model name and features.
-    You have extensive knowledge of Ford's vehicle lineup and can accurately categorize vehicles based on their characteristics.""",
-    llm=llm
+    You have extensive knowledge of Ford's vehicle lineup and can accurately categorize vehicles based on their characteristics."""
 )
 
 def parse_vehicle_name(vehicle_name: str) -> Dict[str, str]:
     """Parse a vehicle name into its components using the AI agent."""
-    parse_task = Task(
+    parse_task = llm.task(
         description=f"""Parse the following vehicle name into its components and determine the vehicle type:
         Vehicle Name: {vehicle_name}
         
@@ -62,15 +79,8 @@ def parse_vehicle_name(vehicle_name: str) -> Dict[str, str]:
         expected_output="A JSON object with year, make, model, trim, and vehicle_type fields"
     )
 
-    # Create and run the crew for this specific task
-    crew = Crew(
-        agents=[data_processor_agent],
-        tasks=[parse_task],
-        verbose=False
-    )
-
     # Get the parsed result
-    result = crew.kickoff()
+    result = llm.run(data_processor_agent, parse_task)
     
     try:
         # Parse the result into a dictionary
@@ -111,9 +121,190 @@ def parse_vehicle_name(vehicle_name: str) -> Dict[str, str]:
             "original_name": vehicle_name
         }
 
-def process_vehicle_data(raw_data: Dict[str, Any]) -> Dict[str, Any]:
+# Task template for run_for_each; {vehicle_names} is filled in per batch
+batch_parse_task = llm.task(
+    description="""Parse each of the following vehicle names into its components and determine the vehicle type.
+    Vehicle Names (JSON array): {vehicle_names}
+
+    For every name extract:
+    - name (the vehicle name exactly as given)
+    - year (4-digit number)
+    - make (manufacturer name, e.g., Ford)
+    - model (base model name, e.g., Escape)
+    - trim (trim level or special edition name, if any)
+    - vehicle_type (one of: SUV, Truck, Sedan, Van, Electric, Hybrid, Performance)
+
+    Return ONLY a JSON array with one object per vehicle name, in the same order as the input,
+    each object having the keys name, year, make, model, trim and vehicle_type with string values.
+
+    Vehicle Type Guidelines:
+    - SUV: Models like Escape, Explorer, Expedition, Bronco
+    - Truck: Models like F-150, Ranger, Super Duty
+    - Van: Models like Transit, E-Series
+    - Electric: Models like Mustang Mach-E, F-150 Lightning
+    - Hybrid: Models with hybrid powertrains
+    - Performance: Models like Mustang
+    - Sedan: Traditional car models
+
+    If any component is not present, set it to an empty string.
+    Note: If no make is detected, set it to "Ford" since these are Ford vehicles.
+    """,
+    agent=data_processor_agent,
+    expected_output="A JSON array of objects with name, year, make, model, trim, and vehicle_type fields"
+)
+
+def _extract_json(text: str) -> Any:
+    """Load the JSON out of an agent response, ignoring markdown fences."""
+    if '```' in text:
+        match = re.search(r'```(?:json)?\s*(.*?)```', text, re.DOTALL)
+        if match:
+            text = match.group(1)
+    return json.loads(text)
+
+def _validate_parsed_name(item: Any) -> Optional[Dict[str, str]]:
+    """Return a clean parsed name if a batch item is well formed, otherwise None."""
+    if not isinstance(item, dict):
+        return None
+    parsed = {}
+    for field in ['year', 'make', 'model', 'trim', 'vehicle_type']:
+        value = item.get(field, '')
+        if value is None:
+            value = ''
+        if not isinstance(value, (str, int)):
+            return None
+        parsed[field] = str(value).strip()
+    if not parsed['model'] or (parsed['year'] and not re.match(r'^\d{4}$', parsed['year'])):
+        return None
+    if not parsed['make']:
+        parsed['make'] = "Ford"
+    return parsed
+
+def _parse_batch_output(output: Any, names: List[str]) -> Dict[str, Optional[Dict[str, str]]]:
+    """Validate each item of a batch response on its own; malformed items map to None."""
+    results: Dict[str, Optional[Dict[str, str]]] = {name: None for name in names}
+    try:
+        items = _extract_json(str(output.raw if hasattr(output, 'raw') else output))
+    except Exception as e:
+        print(f"Error parsing batch response for {len(names)} names: {str(e)}")
+        return results
+    if not isinstance(items, list):
+        return results
+
+    for item in items:
+        # An item counts only under the name it echoes; one that doesn't echo a name
+        # from the batch is malformed, since its position may belong to another name
+        name = item.get('name') if isinstance(item, dict) else None
+        if isinstance(name, str) and name in results and results[name] is None:
+            results[name] = _validate_parsed_name(item)
+    return results
+
+def _run_batch(names: List[str]) -> Dict[str, Optional[Dict[str, str]]]:
+    """Parse one batch of names in a single request; a failed request leaves only its own names unparsed."""
+    try:
+        output = llm.run_for_each(data_processor_agent, batch_parse_task,
+                                  [{'vehicle_names': json.dumps(names, ensure_ascii=False)}])[0]
+    except Exception as e:
+        print(f"Error running name parsing batch of {len(names)} names: {str(e)}")
+        return {name: None for name in names}
+    return _parse_batch_output(output, names)
+
+def parse_vehicle_names_batch(vehicle_names: List[str], batch_size: int = NAME_PARSE_BATCH_SIZE,
+                              max_concurrency: int = NAME_PARSE_MAX_CONCURRENCY,
+                              stats: Optional[Dict[str, int]] = None) -> Dict[str, Dict[str, str]]:
+    """Parse many vehicle names with batched, concurrent agent requests."""
+    if stats is None:
+        stats = {}
+    names = list(dict.fromkeys(vehicle_names))
+    if not names:
+        return {}
+
+    # Each batch is its own task, so at most max_concurrency requests are in flight
+    batches = [names[i:i + batch_size] for i in range(0, len(names), batch_size)]
+    results: Dict[str, Dict[str, str]] = {}
+    malformed = []
+    with ThreadPoolExecutor(max_workers=max(1, max_concurrency)) as executor:
+        for parsed_batch in executor.map(_run_batch, batches):
+            for name, parsed in parsed_batch.items():
+                if parsed:
+                    results[name] = parsed
+                else:
+                    malformed.append(name)
+    stats['llm_calls'] = stats.get('llm_calls', 0) + len(batches)
+
+    # Only the items that failed validation are retried, one at a time
+    if malformed:
+        print(f"Retrying {len(malformed)} malformed batch items individually")
+        with ThreadPoolExecutor(max_workers=max(1, max_concurrency)) as executor:
+            for name, parsed in zip(malformed, executor.map(parse_vehicle_name, malformed)):
+                results[name] = parsed
+        stats['llm_calls'] += len(malformed)
+    return results
+
+def resolve_vehicle_name_without_llm(vehicle_name: str, cache: NameParseCache = name_parse_cache,
+                                     stats: Optional[Dict[str, int]] = None) -> Optional[Dict[str, str]]:
+    """Parse a vehicle name from the cache or the manual parser; None if the LLM is needed."""
+    if stats is None:
+        stats = {}
+
+    parsed = cache.get(vehicle_name)
+    if parsed:
+        stats['cached'] = stats.get('cached', 0) + 1
+        return parsed
+
+    parsed = manual_parse_vehicle_name(vehicle_name)
+    confidence = score_manual_parse(vehicle_name, parsed)
+    if confidence >= NAME_PARSE_CONFIDENCE_THRESHOLD:
+        stats['rules'] = stats.get('rules', 0) + 1
+        cache.put(vehicle_name, parsed, 'rules', confidence)
+        return parsed
+    return None
+
+def _cache_llm_result(vehicle_name: str, parsed: Dict[str, str], cache: NameParseCache):
+    # Failed parses come back without a model; don't cache those so they are retried
+    if parsed.get('model'):
+        confidence = score_manual_parse(vehicle_name, manual_parse_vehicle_name(vehicle_name))
+        cache.put(vehicle_name, parsed, 'llm', confidence)
+
+def resolve_vehicle_name(vehicle_name: str, cache: NameParseCache = name_parse_cache, stats: Optional[Dict[str, int]] = None) -> Dict[str, str]:
+    """Parse a vehicle name from the cache, the manual parser, or the AI agent, in that order."""
+    if stats is None:
+        stats = {}
+
+    parsed = resolve_vehicle_name_without_llm(vehicle_name, cache, stats)
+    if parsed:
+        return parsed
+
+    parsed = parse_vehicle_name(vehicle_name)
+    stats['llm'] = stats.get('llm', 0) + 1
+    stats['llm_calls'] = stats.get('llm_calls', 0) + 1
+    _cache_llm_result(vehicle_name, parsed, cache)
+    return parsed
+
+def process_vehicle_data(raw_data: Dict[str, Any], cache: NameParseCache = name_parse_cache) -> Dict[str, Any]:
     """Process the raw vehicle data and parse vehicle names."""
+    start_time = time.perf_counter()
     processed_data = {}
+    stats: Dict[str, int] = {}
+    parsed_names: Dict[str, Dict[str, str]] = {}
+
+    if NAME_PARSE_BATCH_MODE:
+        # Resolve what we can locally, then send the rest to the LLM in batches
+        unresolved: Dict[str, None] = {}
+        for model_data in raw_data.values():
+            for vehicle_data in model_data.values():
+                vehicle_name = vehicle_data.get('vehicle_name')
+                if not vehicle_name or vehicle_name in parsed_names or vehicle_name in unresolved:
+                    continue
+                parsed = resolve_vehicle_name_without_llm(vehicle_name, cache, stats)
+                if parsed:
+                    parsed_names[vehicle_name] = parsed
+                else:
+                    unresolved[vehicle_name] = None
+
+        for vehicle_name, parsed in parse_vehicle_names_batch(list(unresolved), stats=stats).items():
+            stats['llm'] = stats.get('llm', 0) + 1
+            _cache_llm_result(vehicle_name, parsed, cache)
+            parsed_names[vehicle_name] = parsed
     
     for model_key, model_data in raw_data.items():
         processed_data[model_key] = {}
@@ -121,15 +312,23 @@ def process_vehicle_data(raw_data: Dict[str, Any]) -> Dict[str, Any]:
             # Copy the original data
             processed_vehicle = vehicle_data.copy()
             
-            # Parse the vehicle name if it exists
+            # Parse the vehicle name if it exists, once per distinct name
             if 'vehicle_name' in vehicle_data:
-                name_components = parse_vehicle_name(vehicle_data['vehicle_name'])
+                vehicle_name = vehicle_data['vehicle_name']
+                if vehicle_name not in parsed_names:
+                    parsed_names[vehicle_name] = resolve_vehicle_name(vehicle_name, cache, stats)
                 # Add the parsed components to the vehicle data
                 processed_vehicle.update({
-                    'parsed_name': name_components
+                    'parsed_name': dict(parsed_names[vehicle_name])
                 })
             
             processed_data[model_key][vin] = processed_vehicle
+
+    cache.save()
+    elapsed_ms = (time.perf_counter() - start_time) * 1000
+    print(f"Parsed {len(parsed_names)} distinct names in {elapsed_ms:.1f}ms "
+          f"(cached: {stats.get('cached', 0)}, rules: {stats.get('rules', 0)}, llm: {stats.get('llm', 0)} "
+          f"in {stats.get('llm_calls', 0)} calls)")
     
     return processed_data
 
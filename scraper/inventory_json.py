@@ -0,0 +1,287 @@
+import json
+import re
+from typing import Dict, List, Any, Iterable, Optional
+from manual_vehicle_name_parser import manual_parse_vehicle_name
+
+# The inventory results page loads its data from JSON endpoints. These helpers turn
+# the recorded payloads into the same vehicle records extract_vehicle_data builds from
+# the DOM, so a results page can be processed without opening each vehicle.
+
+# URL fragments of responses worth recording
+INVENTORY_RESPONSE_PATTERNS = ['inventory', 'vehicle', 'vin', 'search']
+
+VIN_PATTERN = re.compile(r'^[A-HJ-NPR-Z0-9]{17}$')
+
+# Candidate payload keys for each field, in order of preference
+VIN_KEYS = ['vin', 'VIN', 'vehicleIdentificationNumber']
+NAME_KEYS = ['vehicleName', 'displayName', 'marketingName', 'title', 'name']
+YEAR_KEYS = ['modelYear', 'year']
+MODEL_KEYS = ['modelName', 'model', 'nameplate']
+TRIM_KEYS = ['trimName', 'trim', 'series']
+VEHICLE_TYPE_KEYS = ['vehicleType', 'bodyType', 'segment']
+PRICE_KEYS = ['price', 'finalPrice', 'sellingPrice', 'dealerPrice', 'totalMsrp', 'msrp']
+MILEAGE_KEYS = ['annualMileage', 'estimatedAnnualMileage']
+IMAGE_KEYS = ['images', 'imageUrls', 'gallery', 'vehicleImages']
+MAIN_IMAGE_KEYS = ['mainImage', 'heroImage', 'primaryImage', 'tileImage']
+FEATURE_KEYS = ['features', 'featureGroups', 'options']
+WARRANTY_KEYS = ['warranty', 'warranties', 'warrantyCoverage']
+
+SPECIFICATION_KEYS = {
+    'horsepower': ['horsepower', 'engineHorsepower', 'hp'],
+    'epa_range': ['epaRange', 'fuelEconomy', 'mpg'],
+    'torque': ['torque', 'engineTorque'],
+    'exterior_color': ['exteriorColor', 'extColor', 'paint'],
+    'interior_color': ['interiorColor', 'intColor', 'trimColor'],
+    'wheel_type': ['wheelType', 'wheels'],
+    'drive': ['drive', 'driveType', 'drivetrain'],
+}
+
+FEATURE_CATEGORIES = ['exterior', 'interior', 'functional']
+
+# Vehicles per results page, and the keys a search response reports its match count under
+PAGE_SIZE = 12
+TOTAL_KEYS = ['totalCount', 'totalResults', 'totalRecords', 'numFound']
+
+def is_inventory_response(url: str, content_type: str) -> bool:
+    """Check whether a network response looks like an inventory JSON payload."""
+    if 'json' not in (content_type or '').lower():
+        return False
+    url = url.lower()
+    return any(pattern in url for pattern in INVENTORY_RESPONSE_PATTERNS)
+
+def _first(source: Dict[str, Any], keys: List[str]) -> Any:
+    """Return the first non-empty value found under any of the given keys."""
+    for key in keys:
+        value = source.get(key)
+        if value not in (None, '', [], {}):
+            return value
+    return None
+
+def _text(value: Any) -> Optional[str]:
+    """Flatten a payload value that may be a plain value or a {value/label} dict."""
+    if value is None:
+        return None
+    if isinstance(value, dict):
+        value = _first(value, ['displayValue', 'label', 'value', 'name', 'description'])
+    if value is None:
+        return None
+    return str(value).strip()
+
+def _format_price(value: Any) -> Optional[str]:
+    """Format a numeric price the way the results page displays it."""
+    if isinstance(value, dict):
+        value = _first(value, ['amount', 'value', 'displayValue'])
+    if isinstance(value, (int, float)):
+        return f"${value:,.2f}"
+    return _text(value)
+
+def _format_epa_range(value: Any) -> Optional[str]:
+    """Format a {city, highway} fuel economy object as 'X City/Y Hwy', or just the half that is present."""
+    if isinstance(value, dict) and ('city' in value or 'highway' in value):
+        parts = []
+        for key, label in (('city', 'City'), ('highway', 'Hwy')):
+            try:
+                parts.append(f"{float(value[key]):.1f} {label}")
+            except (KeyError, TypeError, ValueError):
+                continue
+        return '/'.join(parts) or None
+    return _text(value)
+
+def _image_url(value: Any) -> Optional[str]:
+    if isinstance(value, dict):
+        value = _first(value, ['url', 'src', 'href'])
+    return value if isinstance(value, str) and value else None
+
+def _extract_images(raw: Dict[str, Any]) -> List[str]:
+    images = _first(raw, IMAGE_KEYS) or []
+    if isinstance(images, dict):
+        # e.g. {"exterior": [...], "interior": [...]}
+        images = [img for group in images.values() if isinstance(group, list) for img in group]
+    urls = [_image_url(img) for img in images]
+    return [url for url in urls if url]
+
+def _extract_features(raw: Dict[str, Any]) -> Dict[str, List[str]]:
+    """Group feature payloads into the exterior/interior/functional lists."""
+    source = _first(raw, FEATURE_KEYS)
+    features: Dict[str, List[str]] = {}
+    if isinstance(source, dict):
+        for category, items in source.items():
+            category = category.lower()
+            if category in FEATURE_CATEGORIES and isinstance(items, list):
+                features[category] = [name for name in (_text(item) for item in items) if name]
+    elif isinstance(source, list):
+        for item in source:
+            if not isinstance(item, dict):
+                continue
+            category = str(item.get('category', item.get('group', ''))).lower()
+            if category not in FEATURE_CATEGORIES:
+                continue
+            name = _text(_first(item, ['name', 'description', 'label']))
+            if name:
+                features.setdefault(category, []).append(name)
+    for category in features:
+        features[category] = sorted(set(features[category]))
+    return features
+
+def _extract_warranty(raw: Dict[str, Any]) -> Optional[str]:
+    """Build the newline-separated 'Coverage: terms' warranty text."""
+    source = _first(raw, WARRANTY_KEYS)
+    if isinstance(source, str):
+        return source.strip()
+    if isinstance(source, dict):
+        source = [{'name': key, 'coverage': value} for key, value in source.items()]
+    if not isinstance(source, list):
+        return None
+    lines = []
+    for item in source:
+        if isinstance(item, dict):
+            name = _text(_first(item, ['name', 'type', 'label']))
+            coverage = _text(_first(item, ['coverage', 'description', 'value', 'terms']))
+            if name and coverage:
+                lines.append(f"{name}: {coverage}")
+        elif isinstance(item, str):
+            lines.append(item.strip())
+    return '\n'.join(sorted(lines)) if lines else None
+
+def _vin_of(candidate: Dict[str, Any]) -> Optional[str]:
+    vin = _first(candidate, VIN_KEYS)
+    if isinstance(vin, str) and VIN_PATTERN.match(vin.strip().upper()):
+        return vin.strip().upper()
+    return None
+
+def find_vehicle_objects(payload: Any) -> Iterable[Dict[str, Any]]:
+    """Walk a JSON payload and yield every object that carries a VIN."""
+    stack = [payload]
+    while stack:
+        node = stack.pop()
+        if isinstance(node, dict):
+            if _vin_of(node):
+                yield node
+            stack.extend(node.values())
+        elif isinstance(node, list):
+            stack.extend(reversed(node))
+
+def build_vehicle_record(raw: Dict[str, Any]) -> Dict[str, Any]:
+    """Map a raw vehicle JSON object onto the scraper's vehicle schema."""
+    data: Dict[str, Any] = {'vin': _vin_of(raw)}
+
+    year = _text(_first(raw, YEAR_KEYS))
+    model = _text(_first(raw, MODEL_KEYS))
+    trim = _text(_first(raw, TRIM_KEYS))
+    vehicle_name = _text(_first(raw, NAME_KEYS))
+    if not vehicle_name and year and model:
+        vehicle_name = ' '.join(part for part in [year, model, trim] if part)
+    if vehicle_name:
+        data['vehicle_name'] = vehicle_name
+
+    # Structured year/model/trim makes the name parsing step unnecessary
+    if year and model:
+        vehicle_type = _text(_first(raw, VEHICLE_TYPE_KEYS))
+        if not vehicle_type:
+            vehicle_type = manual_parse_vehicle_name(f"{year} {model}")['vehicle_type']
+        data['parsed_name'] = {
+            'year': year,
+            'make': _text(raw.get('make')) or 'Ford',
+            'model': model,
+            'trim': trim or '',
+            'vehicle_type': vehicle_type or ''
+        }
+
+    images = _extract_images(raw)
+    main_image = _image_url(_first(raw, MAIN_IMAGE_KEYS))
+    if main_image or images:
+        data['main_image'] = main_image or images[0]
+    if images:
+        data['additional_images'] = images
+
+    price = _format_price(_first(raw, PRICE_KEYS))
+    if price:
+        data['price'] = price
+
+    mileage = _first(raw, MILEAGE_KEYS)
+    if isinstance(mileage, (int, float)):
+        data['annual_mileage'] = f"{mileage:,} miles"
+    elif mileage:
+        data['annual_mileage'] = _text(mileage)
+
+    spec_source = raw.get('specifications') if isinstance(raw.get('specifications'), dict) else raw
+    specs = {}
+    for field, keys in SPECIFICATION_KEYS.items():
+        value = _first(spec_source, keys)
+        value = _format_epa_range(value) if field == 'epa_range' else _text(value)
+        if value:
+            specs[field] = value
+    if specs:
+        data['specifications'] = specs
+
+    features = _extract_features(raw)
+    if features:
+        data['features'] = features
+
+    warranty = _extract_warranty(raw)
+    if warranty:
+        data['warranty'] = warranty
+
+    return data
+
+def merge_vehicle_records(existing: Dict[str, Any], update: Dict[str, Any]) -> Dict[str, Any]:
+    """Merge two records for the same VIN, keeping already populated fields."""
+    merged = dict(existing)
+    for key, value in update.items():
+        if isinstance(value, dict) and isinstance(merged.get(key), dict):
+            merged[key] = {**value, **{k: v for k, v in merged[key].items() if v}}
+        elif not merged.get(key):
+            merged[key] = value
+    return merged
+
+def extract_vehicles_from_responses(responses: List[Dict[str, Any]]) -> Dict[str, Dict[str, Any]]:
+    """Build vehicle records, keyed by VIN, from recorded {url, body} responses."""
+    vehicles: Dict[str, Dict[str, Any]] = {}
+    for response in responses:
+        for raw in find_vehicle_objects(response.get('body')):
+            record = build_vehicle_record(raw)
+            vin = record['vin']
+            vehicles[vin] = merge_vehicle_records(vehicles[vin], record) if vin in vehicles else record
+    return vehicles
+
+def find_result_total(responses: List[Dict[str, Any]]) -> Optional[int]:
+    """Return the match count a recorded search response reports, if any."""
+    for response in responses:
+        stack = [response.get('body')]
+        while stack:
+            node = stack.pop()
+            if isinstance(node, dict) and not _vin_of(node):
+                total = _first(node, TOTAL_KEYS)
+                if isinstance(total, int) and not isinstance(total, bool):
+                    return total
+                stack.extend(node.values())
+            elif isinstance(node, list):
+                stack.extend(node)
+    return None
+
+def has_next_results_page(responses: List[Dict[str, Any]], offset: int, vehicles_on_page: int) -> bool:
+    """Decide from a results page's responses whether another page follows it."""
+    total = find_result_total(responses)
+    if total is not None:
+        return offset + PAGE_SIZE < total
+    return vehicles_on_page >= PAGE_SIZE
+
+# Without any of these the record falls back to the DOM; features and warranty feed
+# the full-text search and the comparison tables
+REQUIRED_FIELDS = ['vehicle_name', 'price', 'main_image', 'additional_images', 'specifications',
+                   'features', 'warranty']
+
+def is_complete_record(record: Dict[str, Any]) -> bool:
+    """Check whether a JSON-built record can skip the DOM fallback."""
+    return all(record.get(field) for field in REQUIRED_FIELDS)
+
+def load_recorded_responses(path: str) -> List[Dict[str, Any]]:
+    """Load responses saved by save_recorded_responses."""
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+def save_recorded_responses(responses: List[Dict[str, Any]], path: str):
+    """Save recorded responses so they can be replayed as fixtures."""
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(responses, f, indent=2, ensure_ascii=False)
+
@@ -1,12 +1,59 @@
 import re
 from typing import Dict, List
 
+# Known models and their types, longest names first so multi-word models win
+KNOWN_MODELS = {
+    'E-Series Cutaway': 'Van',
+    'E-Series Stripped Chassis': 'Van',
+    'Transit Passenger Van': 'Van',
+    'Transit Cargo Van': 'Van',
+    'Transit Chassis': 'Van',
+    'Transit Connect': 'Van',
+    'Mustang Mach-E': 'Electric',
+    'F-150 Lightning': 'Electric',
+    'Bronco Sport': 'SUV',
+    'Super Duty': 'Truck',
+    'Chassis Cab': 'Truck',
+    'E-Transit': 'Electric',
+    'Expedition': 'SUV',
+    'Explorer': 'SUV',
+    'Escape': 'SUV',
+    'Bronco': 'SUV',
+    'Edge': 'SUV',
+    'Maverick': 'Truck',
+    'Ranger': 'Truck',
+    'F-150': 'Truck',
+    'F-650': 'Truck',
+    'F-750': 'Truck',
+    'Transit': 'Van',
+    'Mustang': 'Performance',
+    'Mach-E': 'Electric',
+}
+
+# Words that identify the vehicle type when the model itself is unknown
+TRIM_TYPES = {
+    'Cutaway': 'Van',
+    'Lightning': 'Electric',
+    'Active': 'SUV',
+    'Badlands': 'SUV',
+    'LARIAT': 'Truck',
+    'SRW': 'Van',
+}
+
+# Models whose name continues with the truck series, e.g. "Super Duty F-250"
+SERIES_MODELS = ('Super Duty', 'Chassis Cab')
+SERIES_PATTERN = re.compile(r'^F-\d{3}$')
+
+# Trim words that change the vehicle type (e.g. "Escape Hybrid" is not a plain SUV)
+TYPE_WORDS = {'Hybrid', 'Plug-in', 'Plugin', 'PHEV'}
+
 def manual_parse_vehicle_name(vehicle_name: str) -> Dict[str, str]:
     """Manually parse a Ford vehicle name into its components."""
     # Remove special characters
     clean_name = vehicle_name.replace('®', '').replace('™', '').strip()
+    clean_name = re.sub(r'\s+', ' ', clean_name)
     parts = clean_name.split()
-    
+
     # Default values
     year = ''
     make = 'Ford'
@@ -19,41 +66,29 @@ def manual_parse_vehicle_name(vehicle_name: str) -> Dict[str, str]:
         year = parts[0]
         parts = parts[1:]
 
-    # Known models and their types
-    model_types = {
-        'Escape': 'SUV',
-        'Bronco': 'SUV',
-        'Ranger': 'Truck',
-        'E-Series': 'Van',
-        'Cutaway': 'Van',
-        'F-150': 'Truck',
-        'Super Duty': 'Truck',
-        'Transit': 'Van',
-        'Mustang': 'Performance',
-        'Mach-E': 'Electric',
-        'Lightning': 'Electric',
-        'Active': 'SUV',
-        'Badlands': 'SUV',
-        'LARIAT': 'Truck',
-        'SRW': 'Van',
-    }
+    # Drop a leading make, e.g. "2025 Ford Escape"
+    if parts and parts[0].lower() == 'ford':
+        parts = parts[1:]
 
-    # Try to find model and trim
-    # For E-Series Cutaway, model is 'E-Series Cutaway'
-    if 'E-Series Cutaway' in clean_name:
-        model = 'E-Series Cutaway'
-        rest = clean_name.split('E-Series Cutaway', 1)[1].strip()
-        trim = rest
-        vehicle_type = 'Van'
+    rest = ' '.join(parts)
+    for known_model, known_type in KNOWN_MODELS.items():
+        if rest == known_model or rest.startswith(known_model + ' '):
+            model = known_model
+            trim = rest[len(known_model):].strip()
+            vehicle_type = known_type
+            series = trim.split(' ', 1)
+            if model in SERIES_MODELS and SERIES_PATTERN.match(series[0]):
+                model = f"{model} {series[0]}"
+                trim = series[1] if len(series) > 1 else ''
+            break
     else:
         # Model is first capitalized word after year
         if parts:
             model = parts[0]
             trim = ' '.join(parts[1:])
-            vehicle_type = model_types.get(model, '')
             # If trim is a known type, use that
-            if not vehicle_type and trim:
-                vehicle_type = model_types.get(trim.split()[0], '')
+            if trim:
+                vehicle_type = TRIM_TYPES.get(trim.split()[0], '')
 
     return {
         'year': year,
@@ -63,13 +98,37 @@ def manual_parse_vehicle_name(vehicle_name: str) -> Dict[str, str]:
         'vehicle_type': vehicle_type
     }
 
+def score_manual_parse(vehicle_name: str, parsed: Dict[str, str]) -> float:
+    """Score how much the manual parse of a vehicle name can be trusted, from 0 to 1."""
+    score = 0.0
+    if re.match(r'^(19|20)\d{2}$', parsed.get('year') or ''):
+        score += 0.3
+    model = parsed.get('model') or ''
+    series_model = model.rsplit(' ', 1)
+    if model in KNOWN_MODELS or (series_model[0] in SERIES_MODELS and SERIES_PATTERN.match(series_model[-1])):
+        score += 0.4
+    if parsed.get('vehicle_type'):
+        score += 0.2
+    # A trim made of a handful of words is normal; a long tail suggests a missed model
+    trim_words = (parsed.get('trim') or '').split()
+    if len(trim_words) <= 4:
+        score += 0.1
+    # Type or series words left in the trim mean the rules missed part of the model
+    if any(word in TYPE_WORDS or SERIES_PATTERN.match(word) for word in trim_words):
+        score -= 0.3
+    return round(score, 2)
+
 if __name__ == "__main__":
     vehicle_names = [
-        "2024 Bronco\u00ae Wildtrak\u2122",
-        "2025 Explorer\u00ae Platinum",
-        "2025 F-150\u00ae Lariat",
-        "2024 Mustang\u00ae GT Premium Fastback",
+        "2024 Bronco® Wildtrak™",
+        "2025 Explorer® Platinum",
+        "2025 F-150® Lariat",
+        "2024 Mustang® GT Premium Fastback",
+        "2025 Super Duty® F-250 XLT",
+        "2024 Chassis Cab F-350® XL",
+        "2025 Escape Hybrid Platinum",
+        "2025 Bronco Sport® Badlands®",
     ]
     for name in vehicle_names:
         parsed = manual_parse_vehicle_name(name)
-        print(f"{name} => {parsed}") 
\ No newline at end of file
+        print(f"{name} => {parsed} (confidence {score_manual_parse(name, parsed)})")
@@ -0,0 +1,57 @@
+import json
+import os
+from typing import Dict, Any, Optional
+
+# Bump when manual_parse_vehicle_name changes so stale rule-based entries are dropped
+PARSER_VERSION = 2
+
+class NameParseCache:
+    """Disk-backed cache of parsed vehicle names, keyed by the raw vehicle name."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.entries: Dict[str, Dict[str, Any]] = {}
+        self.dirty = False
+        self._load()
+
+    def _load(self):
+        """Load cached entries, dropping rule-based ones from an older parser."""
+        if not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                stored = json.load(f)
+        except Exception as e:
+            print(f"Error loading name parse cache: {str(e)}")
+            return
+
+        entries = stored.get('entries', {})
+        if stored.get('parser_version') != PARSER_VERSION:
+            entries = {name: entry for name, entry in entries.items() if entry.get('source') != 'rules'}
+            self.dirty = True
+        self.entries = entries
+
+    def get(self, vehicle_name: str) -> Optional[Dict[str, str]]:
+        entry = self.entries.get(vehicle_name)
+        return dict(entry['parsed']) if entry else None
+
+    def put(self, vehicle_name: str, parsed: Dict[str, str], source: str, confidence: float):
+        self.entries[vehicle_name] = {
+            'parsed': dict(parsed),
+            'source': source,
+            'confidence': confidence
+        }
+        self.dirty = True
+
+    def save(self):
+        """Write the cache atomically if anything changed."""
+        if not self.dirty:
+            return
+        tmp_path = f"{self.path}.tmp"
+        try:
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump({'parser_version': PARSER_VERSION, 'entries': self.entries}, f, indent=2, ensure_ascii=False)
+            os.replace(tmp_path, self.path)
+            self.dirty = False
+        except Exception as e:
+            print(f"Error saving name parse cache: {str(e)}")
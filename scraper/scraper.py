@@ -1,7 +1,17 @@
 from playwright.sync_api import sync_playwright
 import json
+import os
+import sys
 from typing import Dict, List, Any
-from data_processor import process_vehicle_data, parse_vehicle_name
+from data_processor import process_vehicle_data, resolve_vehicle_name
+from inventory_json import (
+    is_inventory_response, extract_vehicles_from_responses, merge_vehicle_records,
+    is_complete_record, has_next_results_page, save_recorded_responses
+)
+
+# The inventory store lives in the project root next to api.py
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from inventory_store import publish_snapshot, write_atomic
 
 BASE_URL = "https://www.ford.com"
 # INVENTORY_URL = "https://shop.ford.com/showroom/#/"
@@ -9,6 +19,13 @@ BASE_URL = "https://www.ford.com"
 # Using the zip code of Marco Island, FL
 POSTAL_CODE = '34145'
 
+# "network" builds vehicles from the page's JSON responses and only falls back to the
+# DOM for vehicles the payloads don't fully describe; "dom" always scrapes the DOM.
+EXTRACTION_MODE = os.getenv("SCRAPER_EXTRACTION_MODE", "network").lower()
+
+# Optional path to save every recorded JSON response, for use as a fixture
+RECORD_RESPONSES_PATH = os.getenv("SCRAPER_RECORD_RESPONSES")
+
 def build_url(model: str, offset: int = 0) -> str:
     return f"{BASE_URL}/inventory/{model}/results?postalCode={POSTAL_CODE}&radius=20&sort=distance-asc&offset={offset}"
 
@@ -116,7 +133,7 @@ def extract_vehicle_data(page) -> Dict[str, Any]:
                 data['vehicle_name'] = vehicle_name
                 page.wait_for_timeout(5000)  # Wait after getting name
                 # Parse the name immediately
-                parsed_name = parse_vehicle_name(vehicle_name)
+                parsed_name = resolve_vehicle_name(vehicle_name)
                 data['parsed_name'] = parsed_name
         except Exception as e:
             print(f"Error getting/parsing vehicle name: {str(e)}")
@@ -293,6 +310,95 @@ def extract_vehicle_data(page) -> Dict[str, Any]:
     
     return data
 
+def record_inventory_responses(page) -> List[Dict[str, Any]]:
+    """Record the inventory JSON responses the page receives."""
+    recorded = []
+
+    def on_response(response):
+        try:
+            if response.ok and is_inventory_response(response.url, response.headers.get('content-type', '')):
+                recorded.append({'url': response.url, 'status': response.status, 'body': response.json()})
+        except Exception as e:
+            print(f"Error recording response {response.url}: {str(e)}")
+
+    page.on("response", on_response)
+    return recorded
+
+def store_vehicle(model_data: Dict[str, Dict[str, Any]], model: str, vin: str, vehicle_data: Dict[str, Any]):
+    """Add a vehicle to the model data and save progress."""
+    vehicle_data['vin'] = vin
+
+    # Print parsed name information
+    if 'parsed_name' in vehicle_data:
+        parsed = vehicle_data['parsed_name']
+        print(f"  Year: {parsed['year']}")
+        print(f"  Make: {parsed['make']}")
+        print(f"  Model: {parsed['model']}")
+        print(f"  Trim: {parsed['trim']}")
+
+    # Use vehicle_name as the key instead of VIN
+    if 'vehicle_name' in vehicle_data:
+        model_data[model][vehicle_data['vehicle_name']] = vehicle_data
+    else:
+        # Fallback to VIN if vehicle_name is not available
+        model_data[model][vin] = vehicle_data
+
+    # Save progress after each vehicle
+    try:
+        write_atomic('vehicle_data.json', json.dumps(model_data, indent=2).encode('utf-8'))
+        print("  Saved.")
+    except Exception as e:
+        print(f"Error saving progress: {str(e)}")
+
+def scrape_results_page_dom(page, model_data: Dict[str, Dict[str, Any]], model: str, current_url: str,
+                            json_vehicles: Dict[str, Dict[str, Any]], recorded: List[Dict[str, Any]]):
+    """Open every vehicle on the results page the JSON didn't fully describe and scrape it."""
+    # Wait for the vehicle details section to load
+    page.wait_for_selector('.ford-baseball-card_detailsButtonSection__dUz3X', timeout=120000)
+    page.wait_for_timeout(5000)  # Wait after details section loads
+
+    # Get all vehicle details elements
+    vehicle_elements = page.locator('.ford-baseball-card_detailsButtonSection__dUz3X').all()
+
+    for element in vehicle_elements:
+        # Get the link element
+        link = element.locator('a').first
+        if link:
+            href = link.get_attribute('href')
+            # Extract VIN from the URL
+            vin = href.split('/vin/')[1].split('/')[0] if '/vin/' in href else href
+
+            if vin in json_vehicles and is_complete_record(json_vehicles[vin]):
+                continue
+
+            # Navigate to the vehicle details page
+            vehicle_url = f"{BASE_URL}{href}"
+            try:
+                print(f"Processing VIN: {vin}")
+                recorded_before = len(recorded)
+                page.goto(vehicle_url, wait_until="networkidle", timeout=120000)
+                page.wait_for_timeout(5000)  # Wait after navigating to vehicle page
+
+                # The details page's own JSON may complete the record
+                vehicle_data = json_vehicles.get(vin, {})
+                if EXTRACTION_MODE == "network":
+                    details = extract_vehicles_from_responses(recorded[recorded_before:])
+                    if vin in details:
+                        vehicle_data = merge_vehicle_records(vehicle_data, details[vin])
+
+                if not is_complete_record(vehicle_data):
+                    # Fall back to the DOM for whatever the JSON left empty
+                    vehicle_data = merge_vehicle_records(vehicle_data, extract_vehicle_data(page))
+
+                store_vehicle(model_data, model, vin, vehicle_data)
+                page.wait_for_timeout(5000)  # 5-second delay after saving
+
+                page.goto(current_url, wait_until="networkidle", timeout=120000)
+                page.wait_for_timeout(5000)  # Wait after returning to main page
+            except Exception as e:
+                print(f"Error processing vehicle {vin}: {str(e)}")
+                continue
+
 def scrape_vehicle_data() -> Dict[str, Dict[str, Dict[str, Any]]]:
     """Scrape all vehicle data for each model."""
     model_data = {}
@@ -303,6 +409,8 @@ def scrape_vehicle_data() -> Dict[str, Dict[str, Dict[str, Any]]]:
             viewport={'width': 1920, 'height': 1080}
         )
         page = context.new_page()
+        recorded = record_inventory_responses(page)
+        all_recorded = []
         
         for model in models:
             print(f"\nScraping data for model: {model}")
@@ -314,6 +422,10 @@ def scrape_vehicle_data() -> Dict[str, Dict[str, Dict[str, Any]]]:
                 current_url = build_url(model, offset)
                 
                 try:
+                    if RECORD_RESPONSES_PATH:
+                        all_recorded.extend(recorded)
+                    recorded.clear()
+
                     # Try to load the page with retries
                     max_retries = 3
                     for attempt in range(max_retries):
@@ -327,70 +439,29 @@ def scrape_vehicle_data() -> Dict[str, Dict[str, Dict[str, Any]]]:
                             print(f"Retry {attempt + 1}/{max_retries} loading page: {str(e)}")
                             page.wait_for_timeout(5000)
                     
-                    # Wait for the vehicle details section to load
-                    page.wait_for_selector('.ford-baseball-card_detailsButtonSection__dUz3X', timeout=120000)
-                    page.wait_for_timeout(5000)  # Wait after details section loads
-        
-                    # Get all vehicle details elements
-                    vehicle_elements = page.locator('.ford-baseball-card_detailsButtonSection__dUz3X').all()
-                    
-                    for element in vehicle_elements:
-                        # Get the link element
-                        link = element.locator('a').first
-                        if link:
-                            href = link.get_attribute('href')
-                            # Extract VIN from the URL
-                            vin = href.split('/vin/')[1].split('/')[0] if '/vin/' in href else href
-                            
-                            # Navigate to the vehicle details page
-                            vehicle_url = f"{BASE_URL}{href}"
-                            try:
-                                print(f"Processing VIN: {vin}")
-                                page.goto(vehicle_url, wait_until="networkidle", timeout=120000)
-                                page.wait_for_timeout(5000)  # Wait after navigating to vehicle page
-                                
-                                # Extract and process the vehicle data
-                                vehicle_data = extract_vehicle_data(page)
-                                vehicle_data['vin'] = vin
-                                
-                                # Print parsed name information
-                                if 'parsed_name' in vehicle_data:
-                                    parsed = vehicle_data['parsed_name']
-                                    print(f"  Year: {parsed['year']}")
-                                    print(f"  Make: {parsed['make']}")
-                                    print(f"  Model: {parsed['model']}")
-                                    print(f"  Trim: {parsed['trim']}")
-                                
-                                # Use vehicle_name as the key instead of VIN
-                                if 'vehicle_name' in vehicle_data:
-                                    vehicle_name = vehicle_data['vehicle_name']
-                                    model_data[model][vehicle_name] = vehicle_data
-                                else:
-                                    # Fallback to VIN if vehicle_name is not available
-                                    model_data[model][vin] = vehicle_data
-                                
-                                # Save progress after each vehicle
-                                try:
-                                    with open('vehicle_data.json', 'w') as f:
-                                        json.dump(model_data, f, indent=2)
-                                    print("  Saved. Waiting 5 seconds...")
-                                    page.wait_for_timeout(5000)  # 5-second delay after saving
-                                except Exception as e:
-                                    print(f"Error saving progress: {str(e)}")
-                                
-                                page.goto(current_url, wait_until="networkidle", timeout=120000)
-                                page.wait_for_timeout(5000)  # Wait after returning to main page
-                            except Exception as e:
-                                print(f"Error processing vehicle {vin}: {str(e)}")
-                                continue
-
-                    # Check if next button is disabled
-                    next_button = page.locator('button[data-testid="next-button"]')
-                    is_disabled = next_button.get_attribute('disabled') is not None
-                    
-                    if is_disabled:
-                        has_next_page = False
+                    # Build whatever the results page's JSON already describes
+                    json_vehicles = {}
+                    if EXTRACTION_MODE == "network":
+                        json_vehicles = extract_vehicles_from_responses(recorded)
+                        for vin, vehicle_data in json_vehicles.items():
+                            if is_complete_record(vehicle_data):
+                                print(f"Processing VIN: {vin} (from JSON)")
+                                store_vehicle(model_data, model, vin, vehicle_data)
+                    results_responses = list(recorded)
+
+                    # The DOM is only needed for vehicles the JSON left missing or incomplete
+                    if not json_vehicles or not all(is_complete_record(v) for v in json_vehicles.values()):
+                        scrape_results_page_dom(page, model_data, model, current_url, json_vehicles, recorded)
+
+                    # In network mode the payload says whether another page follows
+                    if json_vehicles:
+                        has_next_page = has_next_results_page(results_responses, offset, len(json_vehicles))
                     else:
+                        # Check if next button is disabled
+                        next_button = page.locator('button[data-testid="next-button"]')
+                        has_next_page = next_button.get_attribute('disabled') is None
+
+                    if has_next_page:
                         offset += 12  # Increment offset for next page
                         page.wait_for_timeout(5000)  # Wait before next page
                 except Exception as e:
@@ -398,6 +469,11 @@ def scrape_vehicle_data() -> Dict[str, Dict[str, Dict[str, Any]]]:
                     has_next_page = False
         
         browser.close()
+
+    if RECORD_RESPONSES_PATH:
+        all_recorded.extend(recorded)
+        save_recorded_responses(all_recorded, RECORD_RESPONSES_PATH)
+        print(f"Recorded {len(all_recorded)} responses to {RECORD_RESPONSES_PATH}")
     return model_data
 
 if __name__ == "__main__":
@@ -416,3 +492,9 @@ if __name__ == "__main__":
         print("Processed results saved to processed_vehicle_data.json")
     except Exception as e:
         print(f"Error saving processed results: {str(e)}")
+
+    # Publish them to the API as a new inventory version
+    try:
+        publish_snapshot(processed_results)
+    except Exception as e:
+        print(f"Error publishing inventory snapshot: {str(e)}")
@@ -0,0 +1,110 @@
+import json
+import os
+import threading
+import pytest
+
+# The name parser runs on the offline backend; set before data_processor creates its agent
+os.environ.setdefault("DEALERBOT_LLM_BACKEND", "fake")
+
+import data_processor
+from data_processor import parse_vehicle_names_batch, _parse_batch_output
+from fake_llm import FakeBackend
+
+ESCAPE = '2025 Escape® ST-Line'
+BRONCO = '2025 Bronco® Outer Banks®'
+RANGER = '2024 Ranger® XLT'
+EDGE = '2024 Edge® Titanium'
+
+class RecordingBackend(FakeBackend):
+    """Fake backend that records every prompt and the peak number of calls in flight."""
+
+    def __init__(self, script=None, latency_ms=0):
+        super().__init__(latency_ms=latency_ms, jitter_ms=0, script_path=None, model_latency_ms={})
+        self.script = {'name_parser': script or []}
+        self.prompts = []
+        self.in_flight = 0
+        self.peak = 0
+        self._lock = threading.Lock()
+
+    def run(self, agent, task):
+        with self._lock:
+            self.prompts.append(task.description)
+            self.in_flight += 1
+            self.peak = max(self.peak, self.in_flight)
+        try:
+            return super().run(agent, task)
+        finally:
+            with self._lock:
+                self.in_flight -= 1
+
+    def single_parses(self):
+        return [prompt.split('Vehicle Name: ', 1)[1].split('\n', 1)[0].strip()
+                for prompt in self.prompts if 'Vehicle Name: ' in prompt]
+
+@pytest.fixture
+def backend(monkeypatch):
+    def install(**kwargs):
+        recording = RecordingBackend(**kwargs)
+        monkeypatch.setattr(data_processor, 'llm', recording)
+        return recording
+    return install
+
+def batch_prompt_for(*names):
+    return 'Vehicle Names (JSON array): ' + json.dumps(list(names), ensure_ascii=False)
+
+def test_one_malformed_item_is_retried_alone(backend):
+    response = json.dumps([
+        {'name': ESCAPE, 'year': '2025', 'make': 'Ford', 'model': 'Escape', 'trim': 'ST-Line', 'vehicle_type': 'SUV'},
+        {'name': BRONCO, 'year': '2025', 'make': 'Ford', 'model': '', 'trim': 'Outer Banks', 'vehicle_type': 'SUV'},
+        {'name': RANGER, 'year': '2024', 'make': 'Ford', 'model': 'Ranger', 'trim': 'XLT', 'vehicle_type': 'Truck'},
+    ], ensure_ascii=False)
+    recording = backend(script=[{'match': batch_prompt_for(ESCAPE, BRONCO, RANGER), 'response': response}])
+    stats = {}
+    results = parse_vehicle_names_batch([ESCAPE, BRONCO, RANGER], batch_size=3, stats=stats)
+
+    assert recording.single_parses() == [BRONCO]
+    assert results[BRONCO]['model'] == 'Bronco'
+    assert results[ESCAPE]['trim'] == 'ST-Line'
+    assert stats['llm_calls'] == 2
+
+def test_unparseable_batch_falls_back_only_for_its_own_names(backend):
+    recording = backend(script=[{'match': batch_prompt_for(ESCAPE, BRONCO), 'response': 'Sorry, I cannot help.'}])
+    stats = {}
+    results = parse_vehicle_names_batch([ESCAPE, BRONCO, RANGER, EDGE], batch_size=2, stats=stats)
+
+    assert sorted(recording.single_parses()) == sorted([ESCAPE, BRONCO])
+    assert {name: parsed['model'] for name, parsed in results.items()} == {
+        ESCAPE: 'Escape', BRONCO: 'Bronco', RANGER: 'Ranger', EDGE: 'Edge'}
+    assert stats['llm_calls'] == 4
+
+def test_failed_batch_request_falls_back_only_for_its_own_names(backend, monkeypatch):
+    recording = backend()
+    run_for_each = recording.run_for_each
+
+    def failing_run_for_each(agent, task, inputs):
+        if ESCAPE in inputs[0]['vehicle_names']:
+            raise TimeoutError("provider timed out")
+        return run_for_each(agent, task, inputs)
+
+    monkeypatch.setattr(recording, 'run_for_each', failing_run_for_each)
+    parse_vehicle_names_batch([ESCAPE, BRONCO, RANGER, EDGE], batch_size=2)
+    assert sorted(recording.single_parses()) == sorted([ESCAPE, BRONCO])
+
+def test_batches_respect_the_concurrency_bound(backend):
+    recording = backend(latency_ms=30)
+    names = [f"2025 Escape® Trim{i}" for i in range(10)]
+    results = parse_vehicle_names_batch(names, batch_size=1, max_concurrency=3)
+
+    assert set(results) == set(names)
+    assert len(recording.prompts) == 10
+    assert recording.peak == 3
+
+def test_mismatched_echo_is_malformed_not_matched_by_position():
+    output = json.dumps([
+        {'name': '2025 Escape ST-Line', 'year': '2025', 'model': 'Escape', 'trim': 'ST-Line'},
+        {'name': BRONCO, 'year': '2025', 'model': 'Bronco', 'trim': 'Outer Banks'},
+        {'year': '2024', 'model': 'Ranger', 'trim': 'XLT'},
+    ])
+    results = _parse_batch_output(output, [ESCAPE, BRONCO, RANGER])
+    assert results[ESCAPE] is None and results[RANGER] is None
+    assert results[BRONCO]['model'] == 'Bronco'
@@ -0,0 +1,143 @@
+import glob
+import json
+import os
+import pytest
+from inventory_json import (
+    extract_vehicles_from_responses, load_recorded_responses, is_complete_record, is_inventory_response,
+    merge_vehicle_records, has_next_results_page, PAGE_SIZE, _format_epa_range
+)
+
+# The sample fixture is hand-written in the shape of the results page's search
+# and vehicle-details responses, not captured from ford.com; it exercises the
+# alternate keys and value shapes the mapper accepts. Responses captured with
+# SCRAPER_RECORD_RESPONSES and saved as fixtures/recorded_*.json are checked
+# against the DOM-scraped records as well.
+SCRAPER_DIR = os.path.dirname(os.path.abspath(__file__))
+FIXTURE = os.path.join(SCRAPER_DIR, 'fixtures', 'sample_inventory_responses.json')
+RECORDED_FIXTURES = sorted(glob.glob(os.path.join(SCRAPER_DIR, 'fixtures', 'recorded_*.json')))
+DOM_VEHICLE_DATA = os.path.join(SCRAPER_DIR, 'vehicle_data.json')
+
+ESCAPE_VIN = '1FMCU0MN5SUB14686'
+BRONCO_VIN = '1FMEE8BP4SLA59534'
+SPARSE_VIN = '1FMCU9MN1RUA00001'
+
+def vehicles():
+    return extract_vehicles_from_responses(load_recorded_responses(FIXTURE))
+
+def test_only_vehicle_objects_become_records():
+    assert set(vehicles()) == {ESCAPE_VIN, BRONCO_VIN, SPARSE_VIN}
+
+def test_search_and_details_responses_merge_into_one_record():
+    escape = vehicles()[ESCAPE_VIN]
+    assert escape['vehicle_name'] == '2025 Escape® ST-Line'
+    assert escape['parsed_name'] == {
+        'year': '2025', 'make': 'Ford', 'model': 'Escape', 'trim': 'ST-Line', 'vehicle_type': 'SUV'
+    }
+    assert escape['price'] == '$31,968.45'
+    assert escape['annual_mileage'] == '10,500 miles'
+    assert escape['main_image'].endswith('/EXT/1/vehicle.png?imwidth=640')
+    assert len(escape['additional_images']) == 3
+    assert escape['specifications'] == {
+        'horsepower': '180 SAE net @ 6,000 rpm',
+        'epa_range': '27.0 City/34.0 Hwy',
+        'torque': '199 lb.-ft. @ 3,000 rpm',
+        'exterior_color': 'Space Silver Metallic',
+        'interior_color': 'Ebony with Red Stitching',
+        'wheel_type': '18” Rock Metallic painted Aluminum Wheels - ST-Line',
+        'drive': 'Front-Wheel Drive',
+    }
+    # Categories outside exterior/interior/functional are dropped
+    assert escape['features'] == {
+        'exterior': ['Black Roof-Rack Rails', 'Power Liftgate'],
+        'interior': ['8-Way Power Driver Seat', 'Lane Centering Assist'],
+        'functional': ['8-Speed Automatic Transmission', 'SYNC® 4'],
+    }
+    assert escape['warranty'] == (
+        "Bumper to Bumper: 3 years / 36,000 miles\n"
+        "Hybrid Component Warranty: 8 years / 100,000 miles\n"
+        "Powertrain: 5 years / 60,000 miles"
+    )
+    assert is_complete_record(escape)
+
+def test_search_only_record_falls_back_to_the_dom():
+    bronco = vehicles()[BRONCO_VIN]
+    assert bronco['price'] == '$54,020.00'
+    assert bronco['specifications']['epa_range'] == '19.0 City/21.0 Hwy'
+    assert 'features' not in bronco and 'warranty' not in bronco
+    assert not is_complete_record(bronco)
+
+def test_sparse_record_gets_a_name_from_year_and_model():
+    sparse = vehicles()[SPARSE_VIN]
+    assert sparse['vehicle_name'] == '2024 Escape'
+    assert sparse['parsed_name']['model'] == 'Escape'
+    assert not is_complete_record(sparse)
+
+def test_dom_scrape_fills_only_what_the_json_left_empty():
+    bronco = vehicles()[BRONCO_VIN]
+    dom = {
+        'vehicle_name': '2025 Bronco Outer Banks',
+        'price': '$54,020',
+        'main_image': 'https://build.ford.com/dom-main.png',
+        'additional_images': ['https://build.ford.com/dom-1.png', 'https://build.ford.com/dom-2.png'],
+        'annual_mileage': '12,000 miles',
+        'specifications': {'drive': 'Four-Wheel Drive', 'horsepower': '', 'seating': '5'},
+        'features': {'exterior': ['LED Headlamps'], 'interior': ['Heated Seats']},
+        'warranty': 'Bumper to Bumper: 3 years / 36,000 miles',
+    }
+    merged = merge_vehicle_records(bronco, dom)
+    # JSON values win where both have one
+    for field in ('vehicle_name', 'price', 'main_image'):
+        assert merged[field] == bronco[field]
+    assert merged['specifications'] == {**bronco['specifications'], 'seating': '5'}
+    # The DOM fills the fields the JSON never had
+    for field in ('additional_images', 'annual_mileage', 'features', 'warranty'):
+        assert merged[field] == dom[field]
+    assert is_complete_record(merged)
+
+def test_pagination_follows_the_reported_total():
+    responses = load_recorded_responses(FIXTURE)
+    assert not has_next_results_page(responses, 0, 3)
+    responses[0]['body']['data']['totalCount'] = PAGE_SIZE + 1
+    assert has_next_results_page(responses, 0, 3)
+    assert not has_next_results_page(responses, PAGE_SIZE, 1)
+
+def test_pagination_without_a_total_expects_more_after_a_full_page():
+    responses = [{'url': 'https://www.ford.com/cxservices/inventory/Inventory/Search.json', 'body': {'vehicles': []}}]
+    assert has_next_results_page(responses, 0, PAGE_SIZE)
+    assert not has_next_results_page(responses, 0, PAGE_SIZE - 1)
+
+def test_inventory_response_filter():
+    assert is_inventory_response('https://www.ford.com/cxservices/inventory/Inventory/Search.json', 'application/json')
+    assert not is_inventory_response('https://www.ford.com/cxservices/inventory/Inventory/Search.json', 'text/html')
+    assert not is_inventory_response('https://www.ford.com/cxservices/dealer/Dealers.json', 'application/json')
+
+def test_partial_epa_range_keeps_the_half_that_is_present():
+    assert _format_epa_range({'city': 27, 'highway': 34}) == '27.0 City/34.0 Hwy'
+    assert _format_epa_range({'city': 27}) == '27.0 City'
+    assert _format_epa_range({'highway': '34', 'city': None}) == '34.0 Hwy'
+    assert _format_epa_range({'city': 'n/a'}) is None
+
+def _dom_vehicles():
+    with open(DOM_VEHICLE_DATA, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+    return {vehicle['vin']: vehicle for category in data.values() for vehicle in category.values() if vehicle.get('vin')}
+
+@pytest.mark.parametrize('path', [FIXTURE] + RECORDED_FIXTURES, ids=os.path.basename)
+def test_json_records_agree_with_the_dom_scrape(path):
+    """A vehicle also scraped from the DOM gets the same values from its JSON; lists may hold fewer entries."""
+    dom = _dom_vehicles()
+    shared = {vin: record for vin, record in extract_vehicles_from_responses(load_recorded_responses(path)).items()
+              if vin in dom}
+    assert shared, "no vehicle in the fixture was also scraped from the DOM"
+    for vin, record in shared.items():
+        scraped = dom[vin]
+        for field in ('vehicle_name', 'parsed_name', 'price', 'annual_mileage', 'main_image'):
+            if field in record:
+                assert record[field] == scraped[field], (vin, field)
+        for name, value in record.get('specifications', {}).items():
+            assert value == scraped['specifications'][name], (vin, name)
+        assert set(record.get('additional_images', [])) <= set(scraped['additional_images'])
+        for category, items in record.get('features', {}).items():
+            assert set(items) <= set(scraped['features'][category]), (vin, category)
+        if 'warranty' in record:
+            assert set(record['warranty'].split('\n')) <= set(scraped['warranty'].split('\n'))
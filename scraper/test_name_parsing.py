@@ -0,0 +1,95 @@
+import os
+import pytest
+
+# The name parser runs on the offline backend; set before data_processor creates its agent
+os.environ.setdefault("DEALERBOT_LLM_BACKEND", "fake")
+
+import data_processor
+import name_parse_cache
+from data_processor import process_vehicle_data, resolve_vehicle_name_without_llm
+from fake_llm import FakeBackend
+from manual_vehicle_name_parser import manual_parse_vehicle_name, score_manual_parse
+from name_parse_cache import NameParseCache
+
+CLEAR_NAME = '2025 Super Duty® F-250 XLT'
+HYBRID_NAME = '2025 Escape Hybrid Platinum'
+
+class CountingBackend(FakeBackend):
+    def __init__(self):
+        super().__init__(latency_ms=0, jitter_ms=0, script_path=None, model_latency_ms={})
+        self.calls = 0
+
+    def run(self, agent, task):
+        self.calls += 1
+        return super().run(agent, task)
+
+@pytest.fixture
+def backend(monkeypatch):
+    counting = CountingBackend()
+    monkeypatch.setattr(data_processor, 'llm', counting)
+    return counting
+
+@pytest.fixture
+def cache_path(tmp_path):
+    return str(tmp_path / 'name_parse_cache.json')
+
+def test_manual_parse_keeps_the_truck_series_in_the_model():
+    parsed = manual_parse_vehicle_name(CLEAR_NAME)
+    assert parsed == {'year': '2025', 'make': 'Ford', 'model': 'Super Duty F-250', 'trim': 'XLT',
+                      'vehicle_type': 'Truck'}
+    assert score_manual_parse(CLEAR_NAME, parsed) == 1.0
+
+def test_type_words_left_in_the_trim_lower_the_score():
+    parsed = manual_parse_vehicle_name(HYBRID_NAME)
+    assert parsed['model'] == 'Escape' and parsed['trim'] == 'Hybrid Platinum'
+    assert score_manual_parse(HYBRID_NAME, parsed) < data_processor.NAME_PARSE_CONFIDENCE_THRESHOLD
+
+def test_confident_rule_parse_skips_the_llm_and_is_cached(cache_path):
+    cache, stats = NameParseCache(cache_path), {}
+    parsed = resolve_vehicle_name_without_llm(CLEAR_NAME, cache, stats)
+    assert parsed['model'] == 'Super Duty F-250'
+    assert stats == {'rules': 1}
+    assert cache.entries[CLEAR_NAME]['source'] == 'rules'
+
+def test_parse_below_the_threshold_is_left_for_the_llm(cache_path, monkeypatch):
+    cache = NameParseCache(cache_path)
+    assert resolve_vehicle_name_without_llm(HYBRID_NAME, cache, {}) is None
+    assert HYBRID_NAME not in cache.entries
+
+    monkeypatch.setattr(data_processor, 'NAME_PARSE_CONFIDENCE_THRESHOLD', 0.5)
+    assert resolve_vehicle_name_without_llm(HYBRID_NAME, cache, {})['model'] == 'Escape'
+
+def test_cached_parse_wins_over_the_rules(cache_path):
+    cache, stats = NameParseCache(cache_path), {}
+    llm_parse = {'year': '2025', 'make': 'Ford', 'model': 'Escape', 'trim': 'Platinum', 'vehicle_type': 'Hybrid'}
+    cache.put(HYBRID_NAME, llm_parse, 'llm', 0.6)
+    assert resolve_vehicle_name_without_llm(HYBRID_NAME, cache, stats) == llm_parse
+    assert stats == {'cached': 1}
+
+def test_parser_version_bump_drops_only_rule_based_entries(cache_path, monkeypatch):
+    cache = NameParseCache(cache_path)
+    resolve_vehicle_name_without_llm(CLEAR_NAME, cache, {})
+    cache.put(HYBRID_NAME, manual_parse_vehicle_name(HYBRID_NAME), 'llm', 0.6)
+    cache.save()
+    assert set(NameParseCache(cache_path).entries) == {CLEAR_NAME, HYBRID_NAME}
+
+    monkeypatch.setattr(name_parse_cache, 'PARSER_VERSION', name_parse_cache.PARSER_VERSION + 1)
+    reloaded = NameParseCache(cache_path)
+    assert set(reloaded.entries) == {HYBRID_NAME}
+    assert reloaded.dirty
+
+def test_reprocessing_an_unchanged_inventory_makes_no_llm_calls(backend, cache_path):
+    raw_data = {
+        'escape': {
+            'VIN1': {'vehicle_name': HYBRID_NAME},
+            'VIN2': {'vehicle_name': '2025 Escape® ST-Line'},
+        },
+        'superduty': {'VIN3': {'vehicle_name': CLEAR_NAME}},
+    }
+    first = process_vehicle_data(raw_data, NameParseCache(cache_path))
+    assert backend.calls == 1
+
+    backend.calls = 0
+    second = process_vehicle_data(raw_data, NameParseCache(cache_path))
+    assert backend.calls == 0
+    assert second == first
@@ -0,0 +1,165 @@
+import heapq
+import math
+import os
+import re
+import time
+from typing import Dict, List, Optional, Tuple
+from compact_inventory import CompactVehicle
+from inventory_store import InventorySnapshot, inventory_store
+from metrics import metrics
+
+# BM25 full-text search over the free-text vehicle fields (feature lists and
+# warranty text). One inverted index is built per inventory snapshot when the
+# snapshot is loaded, before it is served, so a search only looks it up.
+# Every posting stores its precomputed BM25 weight, so a query only sums
+# weights over the postings of its terms.
+
+SEARCH_FIELDS = ('features[exterior]', 'features[interior]', 'features[functional]', 'warranty')
+
+# Fraction of the query terms a vehicle must contain to pass a free-text filter
+SEARCH_MIN_MATCH = float(os.getenv("SEARCH_MIN_MATCH", "0.6"))
+
+# BM25 parameters
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+STOPWORDS = {
+    'a', 'an', 'and', 'any', 'are', 'as', 'at', 'be', 'by', 'can', 'do', 'does', 'for', 'from', 'has',
+    'have', 'i', 'in', 'is', 'it', 'me', 'my', 'of', 'on', 'or', 'show', 'that', 'the', 'them', 'to',
+    'want', 'need', 'which', 'with', 'you', 'your',
+}
+
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+
+search_latency = metrics.histogram(
+    'dealerbot_search_latency_ms', 'BM25 search latency in milliseconds', ('field',))
+
+def stem(word: str) -> str:
+    """Light suffix-stripping stemmer: seats/seating -> seat, heated -> heat, towing -> tow."""
+    if len(word) <= 3 or word.isdigit():
+        return word
+    if word.endswith('ies') and len(word) > 4:
+        word = word[:-3] + 'y'
+    elif word.endswith('sses'):
+        word = word[:-2]
+    elif word.endswith('s') and not word.endswith(('ss', 'us', 'is')):
+        word = word[:-1]
+    for suffix in ('ing', 'ed'):
+        if word.endswith(suffix) and len(word) - len(suffix) >= 3:
+            word = word[:-len(suffix)]
+            # stopped -> stopp -> stop
+            if len(word) > 3 and word[-1] == word[-2] and word[-1] not in 'lsz':
+                word = word[:-1]
+            break
+    if word.endswith('e') and len(word) > 4:
+        word = word[:-1]
+    return word
+
+def analyze(text: str) -> List[str]:
+    """Lowercase, split into words, drop stopwords and stem."""
+    return [stem(token) for token in TOKEN_PATTERN.findall(text.lower()) if token not in STOPWORDS]
+
+def _field_text(record: CompactVehicle, field: str) -> List[str]:
+    value = record.field(field)
+    if isinstance(value, list):
+        return [str(item) for item in value]
+    return [str(value)] if value else []
+
+class SearchIndex:
+    """Inverted index of one snapshot: term -> (document numbers, BM25 weights) per field."""
+
+    def __init__(self, records: List[CompactVehicle], fields: Tuple[str, ...] = SEARCH_FIELDS):
+        start = time.perf_counter()
+        # field() maps fields a legacy record lacks to None instead of the internal sentinel
+        self.vins = [record.field('vin') for record in records]
+        self.names = [record.field('vehicle_name') for record in records]
+        self.postings: Dict[str, Dict[str, Tuple[List[int], List[float]]]] = {}
+
+        # Feature strings repeat across vehicles, so each distinct text is analyzed once
+        analyzed: Dict[str, List[str]] = {}
+        for field in fields:
+            term_docs: Dict[str, List[int]] = {}
+            term_freqs: Dict[str, List[int]] = {}
+            lengths = []
+            for doc, record in enumerate(records):
+                counts: Dict[str, int] = {}
+                for text in _field_text(record, field):
+                    tokens = analyzed.get(text)
+                    if tokens is None:
+                        tokens = analyzed[text] = analyze(text)
+                    for token in tokens:
+                        counts[token] = counts.get(token, 0) + 1
+                lengths.append(sum(counts.values()))
+                for term, count in counts.items():
+                    term_docs.setdefault(term, []).append(doc)
+                    term_freqs.setdefault(term, []).append(count)
+            self.postings[field] = self._weigh(term_docs, term_freqs, lengths)
+        self.build_ms = (time.perf_counter() - start) * 1000
+
+    @staticmethod
+    def _weigh(term_docs, term_freqs, lengths) -> Dict[str, Tuple[List[int], List[float]]]:
+        total = len(lengths)
+        average = (sum(lengths) / total) if total else 0.0
+        norms = [BM25_K1 * (1 - BM25_B + BM25_B * length / average) if average else BM25_K1 for length in lengths]
+        postings = {}
+        for term, docs in term_docs.items():
+            idf = math.log(1 + (total - len(docs) + 0.5) / (len(docs) + 0.5))
+            weights = [idf * tf * (BM25_K1 + 1) / (tf + norms[doc]) for doc, tf in zip(docs, term_freqs[term])]
+            postings[term] = (docs, weights)
+        return postings
+
+    def search(self, query: str, field: Optional[str] = None, limit: Optional[int] = 20,
+               min_match: float = 0.0) -> List[Tuple[int, float]]:
+        """
+        Rank documents for `query` as (document number, score), best first.
+        `min_match` is the fraction of the distinct query terms a document
+        has to contain to be returned.
+        """
+        start = time.perf_counter()
+        terms = list(dict.fromkeys(analyze(query)))
+        fields = [field] if field else list(self.postings)
+        scores: Dict[int, float] = {}
+        matched: Dict[int, int] = {}
+        for term in terms:
+            term_matches = set()
+            for name in fields:
+                docs, weights = self.postings[name].get(term, ((), ()))
+                for doc, weight in zip(docs, weights):
+                    scores[doc] = scores.get(doc, 0.0) + weight
+                term_matches.update(docs)
+            for doc in term_matches:
+                matched[doc] = matched.get(doc, 0) + 1
+
+        required = math.ceil(min_match * len(terms))
+        candidates = ((doc, score) for doc, score in scores.items() if matched[doc] >= required)
+        if limit is None:
+            ranked = sorted(candidates, key=lambda item: -item[1])
+        else:
+            ranked = heapq.nlargest(limit, candidates, key=lambda item: item[1])
+        search_latency.observe((time.perf_counter() - start) * 1000, field=field or 'all')
+        return ranked
+
+    def field_scores(self, field: str, query: str,
+                     min_match: float = SEARCH_MIN_MATCH) -> Optional[Dict[str, float]]:
+        """BM25 score per VIN for a filter on one field; None if the query has no searchable terms."""
+        if not analyze(query):
+            return None
+        return {self.vins[doc]: score for doc, score in self.search(query, field, None, min_match)}
+
+class SearchIndexes:
+    """Builds the search index of each snapshot once and keeps it with the snapshot."""
+
+    @staticmethod
+    def _build(snapshot: InventorySnapshot) -> SearchIndex:
+        index = SearchIndex(snapshot.records)
+        print(f"[Search] Indexed {len(snapshot.records)} vehicles for {snapshot.version} "
+              f"in {index.build_ms:.1f}ms")
+        return index
+
+    def get(self, snapshot: InventorySnapshot) -> SearchIndex:
+        # Snapshots the store loaded are indexed already; others (benchmarks) are indexed here
+        return snapshot.derived('search', self._build)
+
+# Global search index, built for every snapshot before the API serves it
+search_indexes = SearchIndexes()
+inventory_store.on_load(search_indexes.get)
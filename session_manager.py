@@ -2,6 +2,7 @@ import uuid
 from datetime import datetime, timedelta
 import json
 from database import connect_db, release_connection
+from tracing import traced
 from typing import Dict, Any, Optional
 
 class SessionManager:
@@ -34,6 +35,7 @@ class SessionManager:
                 cursor.close()
                 release_connection(conn)
 
+    @traced('session_create')
     def create_session(self) -> str:
         """Create a new session."""
         session_id = str(uuid.uuid4())
@@ -63,6 +65,7 @@ class SessionManager:
                 cursor.close()
                 release_connection(conn)
 
+    @traced('session_read')
     def get_session(self, session_id: str) -> Optional[Dict[str, Any]]:
         """Get session data, updating last activity time."""
         conn = None
@@ -105,6 +108,7 @@ class SessionManager:
                 cursor.close()
                 release_connection(conn)
 
+    @traced('session_touch')
     def _update_last_activity(self, session_id: str):
         """Update the last activity timestamp for a session."""
         conn = None
@@ -126,6 +130,7 @@ class SessionManager:
                 cursor.close()
                 release_connection(conn)
 
+    @traced('session_write')
     def update_session(self, session_id: str, context_updates: Dict[str, Any]) -> bool:
         """Update session context."""
         conn = None
@@ -164,6 +169,7 @@ class SessionManager:
                 cursor.close()
                 release_connection(conn)
 
+    @traced('session_clear')
     def clear_session(self, session_id: str) -> bool:
         """Clear a session's context."""
         conn = None
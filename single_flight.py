@@ -0,0 +1,70 @@
+import re
+import threading
+from typing import Dict, Any, Callable, Hashable, Optional
+from metrics import metrics
+from tracing import span
+from deadlines import DeadlineExceeded, deadline_exceeded, request_time_left
+
+# Single-flight coalescing: while a call for a key is running, further calls
+# with the same key wait for it and share its result (or its exception)
+# instead of running again. Nothing is cached; once the call finishes, the
+# next caller starts a new one. Callers run in worker threads, so waiting
+# blocks the thread, not the event loop. A waiting caller gives up when its
+# own request deadline passes and raises DeadlineExceeded.
+
+coalesced_requests = metrics.counter(
+    'dealerbot_coalesced_requests_total', 'Requests that shared an identical in-flight computation', ('flight',))
+flight_calls = metrics.counter(
+    'dealerbot_single_flight_calls_total', 'Computations started by single-flight groups', ('flight',))
+
+PUNCTUATION_PATTERN = re.compile(r"[\s?!.,]+$")
+
+def normalize_query(query: str) -> str:
+    """Case, whitespace and trailing punctuation don't change what a query asks."""
+    return PUNCTUATION_PATTERN.sub('', ' '.join(query.lower().split()))
+
+class _Call:
+    __slots__ = ('done', 'result', 'error')
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result: Any = None
+        self.error: Optional[BaseException] = None
+
+class SingleFlight:
+    """One in-flight call per key; concurrent callers with the same key share it."""
+
+    def __init__(self, name: str):
+        self.name = name
+        self._calls: Dict[Hashable, _Call] = {}
+        self._lock = threading.Lock()
+
+    def run(self, key: Hashable, func: Callable[[], Any]) -> Any:
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+        if not leader:
+            coalesced_requests.inc(flight=self.name)
+            timeout = request_time_left()
+            with span('coalesced_wait', flight=self.name):
+                finished = call.done.wait(max(timeout, 0) if timeout is not None else None)
+            if not finished:
+                deadline_exceeded.inc(stage='coalesced_wait')
+                raise DeadlineExceeded(f"Gave up waiting for an identical {self.name} in flight")
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        flight_calls.inc(flight=self.name)
+        try:
+            call.result = func()
+            return call.result
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
@@ -0,0 +1,57 @@
+import os
+import re
+from typing import List
+from metrics import metrics
+
+# Single-pass answers. Routes listed in SINGLE_PASS_ROUTES tell their answering
+# agent to write the final user-facing reply itself, and the formatter agent
+# only runs when that reply fails the cheap checks in format_problems. Other
+# routes keep generating an answer and then reformatting it.
+
+# Comma separated routing decisions answered in a single pass; empty disables it
+SINGLE_PASS_ROUTES = {
+    route.strip() for route in os.getenv("SINGLE_PASS_ROUTES", "Ford Expert,Customer Relations,Specific Vehicle").split(',')
+    if route.strip()
+}
+# Replies longer than this are sent to the formatter to be shortened
+SINGLE_PASS_MAX_WORDS = int(os.getenv("SINGLE_PASS_MAX_WORDS", "160"))
+
+# Appended to the answering agent's prompt; mirrors what the formatter is asked for
+SINGLE_PASS_INSTRUCTIONS = (
+    "Write your answer as the final reply the customer will read:\n"
+    "- Plain conversational sentences, no headings, JSON, code or field names\n"
+    f"- At most {SINGLE_PASS_MAX_WORDS} words; assume the customer is impatient\n"
+    "- End with a short follow-up question or suggestion\n"
+    "- NEVER suggest visiting any external website or contacting another dealership\n"
+    "- If you don't know something, say: 'I'm sorry, I don't have that specific information right now. "
+    "Would you like me to pass along your inquiry to a team member and have them get in touch with you?'\n"
+)
+
+# Leftovers of structured or agent-internal output that a customer should never see
+STRUCTURE_PATTERN = re.compile(r"```|^\s*#{1,6}\s|^\s*[{\[]|\w+\[\w+\]|\b(Final Answer|Thought|Raw response)\s*:",
+                               re.MULTILINE | re.IGNORECASE)
+EXTERNAL_PATTERN = re.compile(r"https?://|www\.|\b(visit|contact|call) (another|a different|other) dealer",
+                              re.IGNORECASE)
+
+single_pass_answers = metrics.counter(
+    'dealerbot_single_pass_total', 'Single-pass answers by whether they needed the formatter',
+    ('route', 'outcome'))
+
+def single_pass_enabled(route: str) -> bool:
+    return route in SINGLE_PASS_ROUTES
+
+def format_problems(answer: str) -> List[str]:
+    """Reasons `answer` can't be shown to the user as is; empty when it can."""
+    text = (answer or '').strip()
+    if not text:
+        return ['empty']
+    problems = []
+    if len(text.split()) > SINGLE_PASS_MAX_WORDS:
+        problems.append('too_long')
+    if STRUCTURE_PATTERN.search(text):
+        problems.append('structured')
+    if EXTERNAL_PATTERN.search(text):
+        problems.append('external_referral')
+    if text[-1] not in '.!?)"\'”’':
+        problems.append('unfinished')
+    return problems
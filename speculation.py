@@ -0,0 +1,135 @@
+import contextvars
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, Future
+from typing import Dict, Any, Callable, Optional
+from admission import LLM_MAX_REQUESTS
+from deadlines import CallCancelled, cancellable
+from metrics import metrics
+
+# Speculative routing. With SPECULATIVE_ROUTING on, the routing decisions and
+# the filter extraction for a query start at the same time instead of one
+# after another, and the inventory filter runs as soon as the extracted
+# filters arrive. The pipeline then claims the results it turns out to need.
+# Tasks that were never claimed are cancelled: each carries a flag that its
+# LLM calls check before taking a concurrency slot and before calling the
+# provider, and dependent tasks check before they start. Only a task that got
+# an LLM call to the provider counts as wasted work, since calls in flight
+# can't be interrupted. Wasted work and estimated latency saved are reported
+# so the mode can be tuned or turned off.
+
+SPECULATIVE_ROUTING = os.getenv("SPECULATIVE_ROUTING", "false").lower() == "true"
+SPECULATION_WORKERS = int(os.getenv("SPECULATION_WORKERS", str(4 * LLM_MAX_REQUESTS)))
+
+SAVED_BUCKETS = (0, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+
+speculative_tasks = metrics.counter(
+    'dealerbot_speculative_tasks_total', 'Speculative tasks by whether their result was used', ('task', 'outcome'))
+speculative_work = metrics.counter(
+    'dealerbot_speculative_work_ms_total', 'Time spent in speculative tasks in milliseconds', ('outcome',))
+speculative_saved = metrics.histogram(
+    'dealerbot_speculative_saved_ms', 'Estimated latency saved per speculative request in milliseconds',
+    buckets=SAVED_BUCKETS)
+
+_executor = ThreadPoolExecutor(max_workers=SPECULATION_WORKERS, thread_name_prefix='speculation')
+
+class _Task:
+    __slots__ = ('future', 'duration_ms', 'used', 'cancelled', 'reached_provider')
+
+    def __init__(self):
+        self.future: Optional[Future] = None
+        self.duration_ms = 0.0
+        self.used = False
+        self.cancelled = threading.Event()
+        self.reached_provider = False
+
+class Speculation:
+    """Tasks started before a request knows whether it needs them."""
+
+    def __init__(self):
+        self.start = time.perf_counter()
+        # When the last claimed result reached the caller
+        self._claimed_at = self.start
+        self._tasks: Dict[str, _Task] = {}
+
+    def launch(self, name: str, func: Callable[..., Any], after: Optional[str] = None):
+        """Start `func` now, or as soon as task `after` is done, with its result as the argument."""
+        task = _Task()
+        parent = self._tasks[after] if after else None
+        # Tasks see the caller's trace and request deadline
+        task.future = _executor.submit(contextvars.copy_context().run, self._run, name, task, func, parent)
+        self._tasks[name] = task
+
+    @staticmethod
+    def _run(name: str, task: _Task, func: Callable[..., Any], parent: Optional[_Task]) -> Any:
+        args = (parent.future.result(),) if parent else ()
+        if task.cancelled.is_set():
+            raise CallCancelled(f"Speculative {name} no longer needed")
+        start = time.perf_counter()
+        with cancellable(name, task.cancelled) as scope:
+            try:
+                return func(*args)
+            finally:
+                task.duration_ms = (time.perf_counter() - start) * 1000
+                task.reached_provider = scope.reached_provider
+
+    def has(self, name: str) -> bool:
+        return name in self._tasks
+
+    def result(self, name: str) -> Any:
+        """Wait for a task and claim its result (or its exception)."""
+        task = self._tasks[name]
+        task.used = True
+        try:
+            return task.future.result()
+        finally:
+            self._claimed_at = max(self._claimed_at, time.perf_counter())
+
+    def finish(self):
+        """Cancel unclaimed tasks and record what speculating cost and saved."""
+        used_ms = 0.0
+        # Dependent tasks were launched after their parents, so they are cancelled first
+        for name, task in reversed(list(self._tasks.items())):
+            if task.used:
+                used_ms += task.duration_ms
+                speculative_tasks.inc(task=name, outcome='used')
+                continue
+            task.cancelled.set()
+            if task.future.cancel():
+                speculative_tasks.inc(task=name, outcome='cancelled')
+            else:
+                task.future.add_done_callback(lambda _, name=name, task=task: _settled(name, task))
+        speculative_work.inc(used_ms, outcome='used')
+        if used_ms:
+            # Run one after another, the claimed tasks would have taken the sum of their durations
+            speculative_saved.observe(max(0.0, used_ms - (self._claimed_at - self.start) * 1000))
+
+def _settled(name: str, task: _Task):
+    """An unclaimed task that had started is wasted work only if one of its LLM calls reached the provider."""
+    if task.reached_provider:
+        speculative_tasks.inc(task=name, outcome='wasted')
+        speculative_work.inc(task.duration_ms, outcome='wasted')
+    else:
+        speculative_tasks.inc(task=name, outcome='cancelled')
+
+def claim(speculation: Optional[Speculation], name: str, func: Callable[[], Any]) -> Any:
+    """The speculative result for `name` if there is one, otherwise `func()`."""
+    if speculation is not None and speculation.has(name):
+        return speculation.result(name)
+    return func()
+
+def speculation_stats() -> Dict[str, Any]:
+    used_ms = speculative_work.value(outcome='used')
+    wasted_ms = speculative_work.value(outcome='wasted')
+    tasks: Dict[str, Dict[str, float]] = {}
+    for labels, value in speculative_tasks.samples():
+        tasks.setdefault(labels['task'], {})[labels['outcome']] = value
+    return {
+        'enabled': SPECULATIVE_ROUTING,
+        'used_ms': round(used_ms, 1),
+        'wasted_ms': round(wasted_ms, 1),
+        'wasted_ratio': round(wasted_ms / (used_ms + wasted_ms), 4) if used_ms + wasted_ms else 0.0,
+        'tasks': tasks,
+        'saved_ms': speculative_saved.summary().get('all', {}),
+    }
@@ -0,0 +1,106 @@
+import threading
+import time
+import pytest
+from admission import (
+    RequestAdmission, ConcurrencyLimiter, SessionTurns, Overloaded, SessionBusy, QueueTimeout
+)
+
+def test_requests_beyond_the_limit_are_rejected_up_front():
+    admission = RequestAdmission(limit=1)
+    with admission.admit('a'):
+        with pytest.raises(Overloaded) as rejected:
+            with admission.admit('b'):
+                pass
+        assert rejected.value.status_code == 503 and rejected.value.retry_after > 0
+    with admission.admit('b'):
+        assert admission.stats() == {'admitted': 1, 'limit': 1}
+    assert admission.stats()['admitted'] == 0
+
+def test_overlapping_turns_of_one_session_are_rejected():
+    turns = SessionTurns(limit=1)
+    with turns.turn('a'):
+        with pytest.raises(SessionBusy) as rejected:
+            with turns.turn('a'):
+                pass
+        assert rejected.value.status_code == 429
+        with turns.turn('b'):
+            pass
+        # Requests without a session are never limited
+        with turns.turn(None), turns.turn(None):
+            pass
+    with turns.turn('a'):
+        pass
+
+def test_call_waits_for_a_freed_slot():
+    limiter = ConcurrencyLimiter(limit=1, session_limit=4, timeout_s=2)
+    acquired = threading.Event()
+    release = threading.Event()
+
+    def hold():
+        with limiter.slot():
+            acquired.set()
+            release.wait(2)
+
+    holder = threading.Thread(target=hold)
+    holder.start()
+    acquired.wait(2)
+    assert not limiter.has_capacity()
+    threading.Timer(0.05, release.set).start()
+    start = time.perf_counter()
+    with limiter.slot():
+        assert limiter.stats()['in_flight'] == 1
+    assert time.perf_counter() - start < 1
+    holder.join()
+    assert limiter.stats()['in_flight'] == 0
+
+def test_call_gives_up_after_its_timeout():
+    limiter = ConcurrencyLimiter(limit=1, session_limit=4, timeout_s=5)
+    with limiter.slot():
+        start = time.perf_counter()
+        # A nearer stage deadline shortens the wait
+        with pytest.raises(QueueTimeout):
+            with limiter.slot(timeout_s=0.05):
+                pass
+        assert time.perf_counter() - start < 1
+        assert limiter.stats()['queued'] == 0
+
+def test_session_limit_applies_within_an_admitted_request():
+    admission = RequestAdmission(limit=4)
+    limiter = ConcurrencyLimiter(limit=4, session_limit=1, timeout_s=0.05)
+    with admission.admit('a'):
+        with limiter.slot():
+            with pytest.raises(QueueTimeout):
+                with limiter.slot():
+                    pass
+    # Another session still gets a slot
+    with admission.admit('b'), limiter.slot():
+        assert limiter.stats()['sessions'] == 1
+
+def test_call_beyond_the_wait_queue_is_rejected_at_once():
+    limiter = ConcurrencyLimiter(limit=1, session_limit=4, timeout_s=2, max_queue=1)
+
+    def wait_for_slot():
+        with limiter.slot():
+            pass
+
+    with limiter.slot():
+        waiter = threading.Thread(target=wait_for_slot)
+        waiter.start()
+        end = time.perf_counter() + 2
+        while limiter.stats()['queued'] < 1 and time.perf_counter() < end:
+            time.sleep(0.01)
+        start = time.perf_counter()
+        with pytest.raises(Overloaded) as rejected:
+            with limiter.slot():
+                pass
+        assert time.perf_counter() - start < 0.5
+        assert rejected.value.status_code == 503 and rejected.value.retry_after > 0
+    waiter.join()
+    assert limiter.stats()['queued'] == 0
+
+def test_queue_timeout_is_a_503_rejection():
+    limiter = ConcurrencyLimiter(limit=0, session_limit=4, timeout_s=0.01)
+    with pytest.raises(QueueTimeout) as rejected:
+        with limiter.slot():
+            pass
+    assert rejected.value.status_code == 503 and rejected.value.retry_after > 0
@@ -0,0 +1,36 @@
+import os
+import tempfile
+import pytest
+
+# Offline LLM, in-memory database and a throwaway feedback database, set before api is imported
+os.environ.setdefault("DEALERBOT_LLM_BACKEND", "fake")
+os.environ.setdefault("DEALERBOT_DB_BACKEND", "memory")
+os.environ.setdefault("DEALERBOT_FEEDBACK_DB", os.path.join(tempfile.mkdtemp(prefix="dealerbot-test-"), "feedback.db"))
+
+import dealerbot
+from fastapi.testclient import TestClient
+from admission import ConcurrencyLimiter
+from api import app
+
+QUERY = "Which Ford would you recommend for a family of five?"
+
+@pytest.fixture
+def client():
+    return TestClient(app)
+
+def test_full_llm_queue_answers_503_with_retry_after(client, monkeypatch):
+    monkeypatch.setattr(dealerbot, 'llm_limiter', ConcurrencyLimiter(limit=0, timeout_s=1, max_queue=0))
+    response = client.post('/user_query', json={'query': QUERY})
+    assert response.status_code == 503
+    assert int(response.headers['Retry-After']) > 0
+
+def test_queue_timeout_answers_503_instead_of_a_fallback(client, monkeypatch):
+    monkeypatch.setattr(dealerbot, 'llm_limiter', ConcurrencyLimiter(limit=0, timeout_s=0.05, max_queue=8))
+    response = client.post('/user_query', json={'query': QUERY})
+    assert response.status_code == 503
+    assert int(response.headers['Retry-After']) > 0
+
+def test_query_with_free_slots_is_answered(client):
+    response = client.post('/user_query', json={'query': QUERY})
+    assert response.status_code == 200
+    assert response.json()['message']
@@ -0,0 +1,34 @@
+from availability import availability_response, describe
+from compact_inventory import CompactVehicle, StringPool
+from facets import FacetIndex
+
+def vehicle(vin, model, color, vehicle_type='SUV'):
+    return {'vin': vin, 'parsed_name': {'make': 'Ford', 'model': model, 'year': '2025', 'vehicle_type': vehicle_type},
+            'specifications': {'exterior_color': color}}
+
+POOL = StringPool()
+FACETS = FacetIndex([CompactVehicle.from_dict(v, POOL) for v in (
+    vehicle('VIN1', 'Escape', 'Atlas Blue Metallic'),
+    vehicle('VIN2', 'Escape', 'Space Silver Metallic'),
+    vehicle('VIN3', 'F-150', 'Atlas Blue Metallic', 'Truck'),
+)])
+
+def test_no_filters_goes_to_the_llm():
+    assert availability_response("Do you have any blue SUVs?", FACETS, {}) is None
+    assert availability_response("Do you have any blue SUVs?", FACETS, None) is None
+
+def test_questions_with_nuance_go_to_the_llm():
+    assert availability_response("Which Escape is best for a family?", FACETS, {'model': 'Escape'}) is None
+
+def test_in_stock_answer_names_the_count_and_vehicles():
+    response = availability_response("Do you have the Escape?", FACETS, {'model': 'Escape'})
+    assert "2 Escape SUVs" in response
+    assert response == availability_response("do you have the escape?  ", FACETS, {'model': 'Escape'})
+
+def test_out_of_stock_answer_offers_the_closest_match():
+    response = availability_response("Any red Escape?", FACETS, {'model': 'Escape', 'exterior_color': 'Red'})
+    assert "Red Escape" in response and "2 Escape SUVs" in response
+
+def test_label_names_the_make():
+    assert describe(FACETS, {'make': 'ford', 'vehicle_type': 'suv'}, 2) == "Ford SUVs"
+    assert describe(FACETS, {'make': 'Ford'}, 3) == "Ford vehicles"
@@ -0,0 +1,38 @@
+import json
+import os
+from compact_inventory import CompactVehicle, ImageSet, StringPool
+
+VEHICLE_DATA = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'vehicle_data.json')
+BASE = "https://build.ford.com/dig/Ford/Escape/2025/HD-THUMB[INTBCK]/Image[%7CFord%7CEscape%7C2025]"
+
+def test_every_inventory_vehicle_round_trips():
+    with open(VEHICLE_DATA, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+    pool = StringPool()
+    for category in data.values():
+        for vehicle in category.values():
+            assert CompactVehicle.from_dict(vehicle, pool).to_dict() == vehicle
+
+def test_image_urls_are_templated():
+    urls = [f"{BASE}/EXT/1/vehicle.png", f"{BASE}/EXT/2/vehicle.png", f"{BASE}/INT/1/vehicle.png"]
+    images = ImageSet.from_urls(urls, StringPool())
+    assert images.urls is None and len(images.codes) == 3
+    assert images.to_list() == urls
+
+def test_leading_zero_image_index_keeps_the_literal_urls():
+    urls = [f"{BASE}/EXT/01/vehicle.png", f"{BASE}/EXT/2/vehicle.png"]
+    images = ImageSet.from_urls(urls, StringPool())
+    assert images.urls is not None
+    assert images.to_list() == urls
+
+def test_mixed_prefixes_keep_the_literal_urls():
+    urls = [f"{BASE}/EXT/1/vehicle.png", "https://example.com/other/EXT/2/vehicle.png"]
+    assert ImageSet.from_urls(urls, StringPool()).to_list() == urls
+
+def test_missing_fields_stay_missing():
+    vehicle = {'vin': 'VIN1', 'parsed_name': {'model': 'Escape'}, 'price': None}
+    record = CompactVehicle.from_dict(vehicle, StringPool())
+    assert record.to_dict() == vehicle
+    assert not record.has('warranty')
+    assert record.has('price') and record.field('price') is None
+    assert record.field('parsed_name[year]', 'Unknown') == 'Unknown'
@@ -0,0 +1,54 @@
+from compact_inventory import CompactVehicle, StringPool
+from comparison_cache import ComparisonCache, ChatComparisonTables, comparison_key, context_fingerprint
+
+class Snapshot:
+    def __init__(self, version, records):
+        self.version = version
+        self.by_vin = {record.vin: record for record in records}
+
+def vehicle(vin, name, price):
+    return CompactVehicle.from_dict({'vin': vin, 'vehicle_name': name, 'price': price,
+                                     'parsed_name': {'model': name}, 'warranty': 'Basic: 3 years\nPowertrain: 5 years'},
+                                    StringPool())
+
+ESCAPE = vehicle('VIN1', 'Escape', '$30,000')
+BRONCO = vehicle('VIN2', 'Bronco', '$45,000')
+
+def test_key_ignores_vin_order_but_not_version():
+    assert comparison_key([ESCAPE, BRONCO], 'v1', '') == comparison_key([BRONCO, ESCAPE], 'v1', '')
+    assert comparison_key([ESCAPE, BRONCO], 'v1', '') != comparison_key([ESCAPE, BRONCO], 'v2', '')
+    assert comparison_key([ESCAPE, BRONCO], 'v1', '') != comparison_key([ESCAPE], 'v1', '')
+
+def test_context_fingerprint_keeps_only_interests():
+    assert context_fingerprint("I'm a mother of three kids") == context_fingerprint("We have children")
+    assert context_fingerprint("Towing a boat, good mpg") == 'efficiency,towing'
+    assert context_fingerprint("Hello there") == context_fingerprint(None) == 'none'
+    assert comparison_key([ESCAPE], 'v1', 'kids') != comparison_key([ESCAPE], 'v1', 'towing')
+
+def test_put_for_a_new_version_drops_older_results():
+    cache = ComparisonCache('test', 10)
+    cache.put((('VIN1',), 'v1', 'none'), 'old')
+    cache.put((('VIN1',), 'v2', 'none'), 'new')
+    assert cache.get((('VIN1',), 'v1', 'none')) is None
+    assert cache.get((('VIN1',), 'v2', 'none')) == 'new'
+    assert len(cache) == 1
+
+def test_chat_table_columns_follow_the_requested_order():
+    tables = ChatComparisonTables()
+    snapshot = Snapshot('v1', [ESCAPE, BRONCO])
+    forward = tables.compare(snapshot, [ESCAPE, BRONCO])
+    backward = tables.compare(snapshot, [BRONCO, ESCAPE])
+    assert forward['headers'] == ['Feature', 'Escape', 'Bronco']
+    assert backward['headers'] == ['Feature', 'Bronco', 'Escape']
+    price = forward['rows'][0]
+    assert price == {'Feature': 'Price', 'Escape': '$30,000', 'Bronco': '$45,000'}
+    warranty = forward['rows'][-1]
+    assert warranty['Escape'] == 'Basic: 3 years'
+    assert tables.compare(snapshot, [ESCAPE, BRONCO]) is forward
+
+def test_chat_table_is_rebuilt_for_a_new_snapshot():
+    tables = ChatComparisonTables()
+    tables.compare(Snapshot('v1', [ESCAPE, BRONCO]), [ESCAPE, BRONCO])
+    repriced = vehicle('VIN1', 'Escape', '$28,000')
+    table = tables.compare(Snapshot('v2', [repriced, BRONCO]), [repriced, BRONCO])
+    assert table['rows'][0]['Escape'] == '$28,000'
@@ -0,0 +1,87 @@
+import threading
+import time
+import pytest
+import deadlines
+from deadlines import (
+    DeadlineRunner, DeadlineExceeded, CallCancelled, begin_provider_call, request_deadline, cancelled_calls
+)
+
+@pytest.fixture
+def runner(monkeypatch):
+    monkeypatch.setenv('STAGE_DEADLINE_TEST', '0.1')
+    monkeypatch.setenv('STAGE_DEADLINE_INTEREST', '2')
+    monkeypatch.setattr(deadlines, 'HEDGE_DEFAULT_AFTER_S', 0.05)
+    return DeadlineRunner(max_workers=4)
+
+def test_call_within_its_deadline_returns_its_result(runner):
+    assert runner.run('test', lambda: 'answer') == 'answer'
+
+def test_errors_are_raised_to_the_caller(runner):
+    def fail():
+        raise ValueError('bad output')
+    with pytest.raises(ValueError):
+        runner.run('test', fail)
+
+def test_abandoned_call_stops_before_reaching_the_provider(runner):
+    outcome = []
+    woke = threading.Event()
+
+    def queued_call():
+        # Still waiting for a concurrency slot when the caller gives up
+        time.sleep(0.3)
+        try:
+            begin_provider_call()
+            outcome.append('provider')
+        except CallCancelled:
+            outcome.append('cancelled')
+        woke.set()
+
+    before = cancelled_calls.value(stage='test')
+    start = time.perf_counter()
+    with pytest.raises(DeadlineExceeded):
+        runner.run('test', queued_call)
+    assert time.perf_counter() - start < 0.25
+    assert woke.wait(2)
+    assert outcome == ['cancelled']
+    assert cancelled_calls.value(stage='test') == before + 1
+
+def test_request_budget_caps_the_stage_deadline(runner, monkeypatch):
+    monkeypatch.setenv('STAGE_DEADLINE_TEST', '10')
+    start = time.perf_counter()
+    with request_deadline(0.1):
+        with pytest.raises(DeadlineExceeded):
+            runner.run('test', lambda: time.sleep(0.5))
+    assert time.perf_counter() - start < 0.4
+
+def test_no_time_left_fails_without_starting_the_call(runner):
+    calls = []
+    with request_deadline(0):
+        with pytest.raises(DeadlineExceeded):
+            runner.run('test', lambda: calls.append(1))
+    assert calls == []
+
+def test_slow_classification_is_hedged_and_the_loser_cancelled(runner):
+    attempts, outcome = [], []
+    lock = threading.Lock()
+    loser_done = threading.Event()
+
+    def classify():
+        with lock:
+            attempts.append(1)
+            first = len(attempts) == 1
+        if first:
+            time.sleep(0.4)
+            try:
+                begin_provider_call()
+                outcome.append('provider')
+            except CallCancelled:
+                outcome.append('cancelled')
+            loser_done.set()
+            return 'slow'
+        return 'hedge'
+
+    start = time.perf_counter()
+    assert runner.run('interest', classify) == 'hedge'
+    assert time.perf_counter() - start < 0.35
+    assert loser_done.wait(2)
+    assert outcome == ['cancelled']
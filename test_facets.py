@@ -0,0 +1,43 @@
+from compact_inventory import CompactVehicle, StringPool
+from facets import FacetIndex, price_band
+
+def vehicle(vin, model, year, color, price):
+    return {'vin': vin, 'price': price,
+            'parsed_name': {'make': 'Ford', 'model': model, 'year': year, 'vehicle_type': 'SUV'},
+            'specifications': {'exterior_color': color}}
+
+POOL = StringPool()
+INDEX = FacetIndex([CompactVehicle.from_dict(v, POOL) for v in (
+    vehicle('VIN1', 'Escape', '2025', 'Space Silver Metallic', '$31,968.45'),
+    vehicle('VIN2', 'Escape Hybrid', '2024', 'Atlas Blue Metallic', '$38,500.00'),
+    vehicle('VIN3', 'Bronco', '2025', 'Atlas Blue Metallic', '$54,020.00'),
+    {'vin': 'VIN4', 'price': None},
+)])
+
+def test_counts_match_substrings_case_insensitively():
+    # The same substring match return_vehicle_data makes
+    assert INDEX.count({'model': 'escape'}) == 2
+    assert INDEX.count({'exterior_color': 'blue', 'year': '2025'}) == 1
+    assert INDEX.count({'model': 'Mustang'}) == 0
+    assert INDEX.count({}) == 4
+
+def test_records_come_back_in_snapshot_order():
+    assert [r.vin for r in INDEX.records_for(INDEX.match({'exterior_color': 'blue'}))] == ['VIN2', 'VIN3']
+
+def test_facet_counts_within_a_filter():
+    counts = INDEX.counts({'make': 'Ford'})
+    assert counts['model'] == {'Escape': 1, 'Escape Hybrid': 1, 'Bronco': 1}
+    assert counts['exterior_color'] == {'Atlas Blue Metallic': 2, 'Space Silver Metallic': 1}
+    assert counts['price_band'] == {'30k_40k': 2, '50k_60k': 1}
+
+def test_price_bands():
+    assert price_band('$29,999.99') == 'under_30k'
+    assert price_band('$31,968.45') == '30k_40k'
+    assert price_band(None) == 'unknown'
+    assert INDEX.count({'price_band': 'under_30k'}) == 0
+
+def test_inquiry_filters():
+    assert INDEX.inquiry_filters({'parsed_name[model]': 'Escape', 'parsed_name[trim]': 'Unknown'}) == {'model': 'Escape'}
+    assert INDEX.inquiry_filters({}) == {}
+    # A field the facets don't cover sends the search to the scan
+    assert INDEX.inquiry_filters({'specifications[horsepower]': '250'}) is None
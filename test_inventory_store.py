@@ -0,0 +1,102 @@
+import json
+import pytest
+from facets import FacetIndexes
+from inventory_store import InventoryStore, publish_snapshot, CURRENT_POINTER
+from search_index import SearchIndexes
+from vector_retrieval import VectorIndexes
+
+def inventory(*vehicles):
+    return {'escape': {f"{model} {vin}": {'vin': vin, 'vehicle_name': model, 'parsed_name': {'model': model},
+                                          'features': {'functional': features}}
+                       for vin, model, features in vehicles}}
+
+V1 = inventory(('VIN1', 'Escape', ['Adaptive Cruise Control']), ('VIN2', 'Escape', ['Heated Seats']))
+V2 = inventory(('VIN1', 'Escape', ['Adaptive Cruise Control']), ('VIN3', 'Bronco', ['Heated Seats']))
+
+FACETS, SEARCH, VECTORS = FacetIndexes(), SearchIndexes(), VectorIndexes()
+
+@pytest.fixture
+def store(tmp_path):
+    store = InventoryStore(snapshot_dir=tmp_path, legacy_path=tmp_path / 'vehicle_data.json', refresh_interval=0)
+    store.on_load(FACETS.get)
+    store.on_load(SEARCH.get)
+    store.on_load(VECTORS.get)
+    return store
+
+def publish(store, data):
+    return publish_snapshot(data, store.snapshot_dir, legacy_path=None)
+
+def test_published_version_is_served_with_its_indexes(store):
+    version = publish(store, V1)
+    snapshot = store.refresh()
+    assert snapshot.version == version
+    assert set(snapshot.by_vin) == {'VIN1', 'VIN2'}
+    # Built by the load listeners before the snapshot was served
+    assert {'facets', 'search', 'vectors'} <= set(snapshot._derived)
+    assert FACETS.get(snapshot).count({'model': 'Escape'}) == 2
+
+def test_swap_rebuilds_indexes_and_leaves_the_old_snapshot_intact(store):
+    publish(store, V1)
+    old = store.refresh()
+    old_facets = FACETS.get(old)
+    version = publish(store, V2)
+    new = store.refresh()
+
+    assert new is not old and new.version == version
+    assert store.current() is new
+    facets, search = FACETS.get(new), SEARCH.get(new)
+    assert facets is not old_facets
+    assert facets.count({'model': 'Bronco'}) == 1 and facets.count({'model': 'Escape'}) == 1
+    assert [search.vins[doc] for doc, _ in search.search('heated seats')] == ['VIN3']
+    # A request that took the old snapshot keeps seeing the old data
+    assert set(old.by_vin) == {'VIN1', 'VIN2'}
+    assert FACETS.get(old) is old_facets and old_facets.count({'model': 'Escape'}) == 2
+
+def test_requests_on_either_side_of_a_swap_keep_their_own_vectors(store):
+    publish(store, V1)
+    old = store.refresh()
+    old_vectors = VECTORS.get(old)
+    publish(store, V2)
+    new = store.refresh()
+
+    new_vectors = VECTORS.get(new)
+    assert new_vectors is not old_vectors and new_vectors.records is new.records
+    # Alternating between the snapshots reuses each one's vectors instead of re-embedding
+    assert VECTORS.get(old) is old_vectors and VECTORS.get(new) is new_vectors
+    assert VECTORS.ground(new, 'bronco heated seats', k=1)[0].startswith('Bronco | VIN: VIN3')
+    assert VECTORS.ground(old, 'bronco heated seats', k=1)[0].startswith('Escape | VIN: VIN2')
+
+def test_refresh_without_a_new_version_keeps_the_snapshot(store):
+    publish(store, V1)
+    snapshot = store.refresh()
+    assert store.refresh() is snapshot
+
+def test_unreadable_version_keeps_serving_the_current_one(store):
+    publish(store, V1)
+    snapshot = store.refresh()
+    (store.snapshot_dir / 'vehicle_data-broken.json').write_text('{not json', encoding='utf-8')
+    (store.snapshot_dir / CURRENT_POINTER).write_text('broken', encoding='utf-8')
+    assert store.refresh() is snapshot
+
+def test_invalid_inventory_is_not_published(store):
+    version = publish(store, V1)
+    with pytest.raises(ValueError):
+        publish(store, {'escape': {'no vin': {'vehicle_name': 'Escape'}}})
+    assert (store.snapshot_dir / CURRENT_POINTER).read_text(encoding='utf-8') == version
+
+def test_legacy_file_is_served_without_snapshots(tmp_path):
+    legacy = tmp_path / 'vehicle_data.json'
+    legacy.write_text(json.dumps(V1), encoding='utf-8')
+    store = InventoryStore(snapshot_dir=tmp_path / 'snapshots', legacy_path=legacy, refresh_interval=0)
+    snapshot = store.current()
+    assert snapshot.version.startswith('legacy-')
+    assert snapshot.get_vehicle('VIN2')['vehicle_name'] == 'Escape'
+
+def test_derived_value_is_built_once(store):
+    publish(store, V1)
+    snapshot = store.refresh()
+    calls = []
+    build = lambda s: calls.append(s.version) or len(s.records)
+    assert snapshot.derived('count', build) == 2
+    assert snapshot.derived('count', build) == 2
+    assert calls == [snapshot.version]
@@ -0,0 +1,41 @@
+import json
+import pytest
+from model_registry import ModelRegistry, MODEL_CONFIG_PATH, MODEL_TIMEOUT_FLOOR_S, MODEL_TIMEOUT_MARGIN
+
+@pytest.fixture
+def registry(tmp_path):
+    path = tmp_path / 'model_config.json'
+    path.write_text(json.dumps({
+        'default': {'model': 'gpt-4', 'fallback': 'gpt-3.5-turbo'},
+        'agents': {'controller': {'temperature': 0}, 'comparison': {'max_tokens': 600},
+                   'name_parser': {'timeout': 120}},
+        'models': {'gpt-4': {'first_token_s': 1.2, 'tokens_per_s': 25},
+                   'gpt-3.5-turbo': {'first_token_s': 0.8, 'tokens_per_s': 70}},
+    }), encoding='utf-8')
+    return ModelRegistry(str(path))
+
+def test_shipped_config_leaves_max_tokens_uncapped():
+    shipped = ModelRegistry(MODEL_CONFIG_PATH)
+    assert all(settings['max_tokens'] is None for settings in shipped.describe()['agents'].values())
+
+def test_uncapped_agent_gets_no_derived_timeout(registry):
+    assert registry.get('controller').timeout is None
+    assert registry.get('controller').temperature == 0
+
+def test_timeout_follows_max_tokens_and_model_speed(registry):
+    assert registry.get('comparison').timeout == round(MODEL_TIMEOUT_MARGIN * (1.2 + 600 / 25), 2)
+    # The retry is timed by the fallback model's own speed
+    fallback = registry.fallback('comparison')
+    assert fallback.model == 'gpt-3.5-turbo' and fallback.fallback is None
+    assert fallback.timeout == max(MODEL_TIMEOUT_FLOOR_S, round(MODEL_TIMEOUT_MARGIN * (0.8 + 600 / 70), 2))
+
+def test_short_outputs_get_the_timeout_floor(registry):
+    registry.override({'controller': {'max_tokens': 16}})
+    assert registry.get('controller').timeout == MODEL_TIMEOUT_FLOOR_S
+
+def test_explicit_timeout_wins(registry):
+    assert registry.get('name_parser').timeout == 120
+
+def test_unknown_setting_is_rejected(registry):
+    with pytest.raises(ValueError):
+        registry.override({'controller': {'max_token': 16}})
@@ -0,0 +1,29 @@
+from prompt_builder import Section, build_prompt, user_queries_only
+
+def test_prompt_under_budget_is_joined_unchanged():
+    sections = [Section('task', "Answer the question.\n"), Section('query', "Query: hi\n", priority=1)]
+    assert build_prompt('test', sections, budget=1000) == "Answer the question.\nQuery: hi\n"
+
+def test_lowest_priority_section_is_trimmed_first():
+    history = "User: " + "word " * 400 + "\n"
+    data = "Data: " + "value " * 100 + "\n"
+    sections = [
+        Section('task', "Answer the question.\n"),
+        Section('data', data, priority=1),
+        Section('history', history, priority=2),
+    ]
+    prompt = build_prompt('test', sections, budget=300)
+    assert prompt.startswith("Answer the question.\nData: ")
+    assert data in prompt
+    assert history not in prompt
+
+def test_summary_is_tried_before_clipping():
+    history = "User: hi\nAssistant: " + "long answer " * 300 + "\nUser: thanks\n"
+    sections = [Section('task', "Task.\n"), Section('history', history, priority=1, summarize=user_queries_only)]
+    assert build_prompt('test', sections, budget=100) == "Task.\nUser: hi\nUser: thanks\n"
+
+def test_callers_sections_are_not_modified():
+    history = "User: " + "word " * 400 + "\n"
+    sections = [Section('task', "Task.\n"), Section('history', history, priority=1, summarize=str.upper)]
+    build_prompt('test', sections, budget=50)
+    assert sections[1].text == history
@@ -0,0 +1,65 @@
+import gzip
+import json
+from inventory_views import parse_fields, build_etag
+from response_cache import ResponseCache, RenderedBody, dumps
+
+class Snapshot:
+    version = 'v1'
+
+def builder(content, calls):
+    def build():
+        calls.append(content)
+        return content
+    return build
+
+def test_field_spellings_share_one_key():
+    assert parse_fields(' vin , price,vin,parsed_name[model]') == parse_fields('parsed_name[model],price,vin')
+    assert parse_fields('') is None and parse_fields(' , ') is None
+
+def test_etag_depends_on_version_and_variant():
+    etag = build_etag(Snapshot, '/all_vehicles|price,vin|0:20')
+    assert etag == build_etag(Snapshot, '/all_vehicles|price,vin|0:20')
+    assert etag != build_etag(Snapshot, '/all_vehicles|price,vin|20:40')
+    assert etag.startswith('"v1-')
+
+def test_body_is_rendered_once_per_version_and_variant():
+    cache, calls = ResponseCache(), []
+    first = cache.get_or_render('v1', 'a', builder({'page': 1}, calls))
+    assert cache.get_or_render('v1', 'a', builder({'page': 1}, calls)) is first
+    cache.get_or_render('v1', 'b', builder({'page': 2}, calls))
+    assert calls == [{'page': 1}, {'page': 2}]
+    assert cache.stats() == {'entries': 2, 'hits': 1, 'misses': 2}
+
+def test_new_version_drops_the_old_bodies():
+    cache, calls = ResponseCache(), []
+    cache.get_or_render('v1', 'a', builder({'v': 1}, calls), lambda: 'v1')
+    cache.get_or_render('v2', 'a', builder({'v': 2}, calls), lambda: 'v2')
+    assert cache.stats()['entries'] == 1
+    cache.get_or_render('v2', 'a', builder({'v': 2}, calls), lambda: 'v2')
+    assert len(calls) == 2
+
+def test_request_on_a_replaced_snapshot_does_not_evict_the_live_one():
+    cache, calls = ResponseCache(), []
+    cache.get_or_render('v2', 'a', builder({'v': 2}, calls), lambda: 'v2')
+    stale = cache.get_or_render('v1', 'a', builder({'v': 1}, calls), lambda: 'v2')
+    assert json.loads(stale.encodings['identity']) == {'v': 1}
+    cache.get_or_render('v2', 'a', builder({'v': 2}, calls), lambda: 'v2')
+    assert calls == [{'v': 2}, {'v': 1}]
+
+def test_least_recently_used_body_is_evicted():
+    cache, calls = ResponseCache(max_entries=2), []
+    for variant in ('a', 'b'):
+        cache.get_or_render('v1', variant, builder(variant, calls))
+    cache.get_or_render('v1', 'a', builder('a', calls))
+    cache.get_or_render('v1', 'c', builder('c', calls))
+    cache.get_or_render('v1', 'a', builder('a', calls))
+    assert calls == ['a', 'b', 'c']
+
+def test_encoding_follows_accept_encoding():
+    body = dumps({'vehicles': ['x' * 40] * 100})
+    rendered = RenderedBody(body)
+    encoding, compressed = rendered.select('gzip;q=1.0, identity')
+    assert encoding == 'gzip' and gzip.decompress(compressed) == body
+    assert rendered.select('gzip;q=0') == ('identity', body)
+    assert rendered.select(None) == ('identity', body)
+    assert RenderedBody(b'{}').select('gzip') == ('identity', b'{}')
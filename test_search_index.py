@@ -0,0 +1,39 @@
+from compact_inventory import CompactVehicle, StringPool
+from search_index import SearchIndex, analyze, stem
+
+def records(*vehicles):
+    pool = StringPool()
+    return [CompactVehicle.from_dict({'vin': vin, 'vehicle_name': vin, **fields}, pool) for vin, fields in vehicles]
+
+INDEX = SearchIndex(records(
+    ('VIN1', {'features': {'interior': ['Heated Front Seats', 'Heated Steering Wheel']}}),
+    ('VIN2', {'features': {'interior': ['Heated Front Seats'], 'functional': ['Trailer Tow Package']}}),
+    ('VIN3', {'features': {'interior': ['Cloth Seats']}, 'warranty': 'Powertrain: 5 years / 60,000 miles'}),
+    ('VIN4', {'vehicle_name': 'No features'}),
+))
+
+def ranked(query, **kwargs):
+    return [INDEX.vins[doc] for doc, _ in INDEX.search(query, **kwargs)]
+
+def test_stemming_matches_word_forms():
+    assert stem('seats') == stem('seating') == 'seat'
+    assert stem('towing') == stem('tow') == 'tow'
+    assert analyze('Do you have heated seats?') == ['heat', 'seat']
+
+def test_more_matching_terms_rank_higher():
+    results = ranked('heated seats')
+    assert set(results[:2]) == {'VIN1', 'VIN2'} and results[2:] == ['VIN3']
+    assert ranked('heated seating') == results
+
+def test_min_match_drops_partial_matches():
+    assert set(ranked('heated seats', min_match=1.0)) == {'VIN1', 'VIN2'}
+
+def test_search_is_limited_to_a_field():
+    assert ranked('towing', field='features[functional]') == ['VIN2']
+    assert ranked('towing', field='features[interior]') == []
+    assert ranked('powertrain warranty', field='warranty') == ['VIN3']
+
+def test_field_scores_are_keyed_by_vin():
+    scores = INDEX.field_scores('features[interior]', 'heated seats')
+    assert set(scores) == {'VIN1', 'VIN2'}
+    assert INDEX.field_scores('features[interior]', 'the and') is None
@@ -0,0 +1,64 @@
+import threading
+import time
+import pytest
+from deadlines import DeadlineExceeded, request_deadline
+from single_flight import SingleFlight, normalize_query
+
+def start_leader(flight, key, release, result='answer'):
+    """Start a call for `key` in another thread that runs until `release` is set."""
+    started = threading.Event()
+
+    def slow():
+        started.set()
+        release.wait(2)
+        if isinstance(result, Exception):
+            raise result
+        return result
+
+    def lead():
+        try:
+            flight.run(key, slow)
+        except Exception:
+            pass
+
+    thread = threading.Thread(target=lead)
+    thread.start()
+    assert started.wait(2)
+    return thread
+
+def test_query_spellings_normalize_to_one_key():
+    assert normalize_query("  What colors does the Escape come in?? ") == \
+        normalize_query("what colors  does the escape come in")
+
+def test_concurrent_callers_share_one_call():
+    flight, release = SingleFlight('test'), threading.Event()
+    leader = start_leader(flight, 'q', release)
+    calls = []
+    threading.Timer(0.05, release.set).start()
+    assert flight.run('q', lambda: calls.append(1) or 'own answer') == 'answer'
+    leader.join()
+    assert calls == []
+
+def test_followers_get_the_leaders_error():
+    flight, release = SingleFlight('test'), threading.Event()
+    leader = start_leader(flight, 'q', release, ValueError('provider down'))
+    threading.Timer(0.05, release.set).start()
+    with pytest.raises(ValueError):
+        flight.run('q', lambda: 'own answer')
+    leader.join()
+
+def test_nothing_is_cached_after_the_call_finishes():
+    flight = SingleFlight('test')
+    assert flight.run('q', lambda: 1) == 1
+    assert flight.run('q', lambda: 2) == 2
+
+def test_follower_gives_up_at_its_own_deadline():
+    flight, release = SingleFlight('test'), threading.Event()
+    leader = start_leader(flight, 'q', release)
+    start = time.perf_counter()
+    with request_deadline(0.05):
+        with pytest.raises(DeadlineExceeded):
+            flight.run('q', lambda: 'own answer')
+    assert time.perf_counter() - start < 1
+    release.set()
+    leader.join()
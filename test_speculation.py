@@ -0,0 +1,73 @@
+import threading
+import time
+from deadlines import begin_provider_call, CallCancelled
+from speculation import Speculation, claim, speculative_tasks
+
+def outcome_count(task, outcome):
+    return speculative_tasks.value(task=task, outcome=outcome)
+
+def wait_for(condition, timeout=2.0):
+    end = time.perf_counter() + timeout
+    while not condition() and time.perf_counter() < end:
+        time.sleep(0.01)
+    return condition()
+
+def test_claimed_results_are_used():
+    speculation = Speculation()
+    speculation.launch('spec_route', lambda: 'Inventory Search')
+    speculation.launch('spec_filter', lambda route: f"{route} results", after='spec_route')
+    assert claim(speculation, 'spec_filter', lambda: 'computed') == 'Inventory Search results'
+    assert claim(speculation, 'spec_other', lambda: 'computed') == 'computed'
+    before = outcome_count('spec_filter', 'used')
+    speculation.finish()
+    assert outcome_count('spec_filter', 'used') == before + 1
+
+def test_unclaimed_task_stops_before_its_llm_call():
+    release, outcome = threading.Event(), []
+
+    def extraction():
+        # Waiting for a concurrency slot when the request decides it doesn't need this
+        release.wait(2)
+        try:
+            begin_provider_call()
+            outcome.append('provider')
+        except CallCancelled:
+            outcome.append('cancelled')
+            raise
+
+    before = outcome_count('spec_extraction', 'cancelled')
+    speculation = Speculation()
+    speculation.launch('spec_extraction', extraction)
+    time.sleep(0.05)
+    speculation.finish()
+    release.set()
+    assert wait_for(lambda: outcome_count('spec_extraction', 'cancelled') == before + 1)
+    assert outcome == ['cancelled']
+
+def test_unclaimed_task_that_reached_the_provider_is_wasted_work():
+    called, release = threading.Event(), threading.Event()
+
+    def extraction():
+        begin_provider_call()
+        called.set()
+        release.wait(2)
+        return {'parsed_name[model]': 'Escape'}
+
+    before = outcome_count('spec_wasted', 'wasted')
+    speculation = Speculation()
+    speculation.launch('spec_wasted', extraction)
+    assert called.wait(2)
+    speculation.finish()
+    release.set()
+    assert wait_for(lambda: outcome_count('spec_wasted', 'wasted') == before + 1)
+
+def test_dependent_task_is_not_started_once_cancelled():
+    release, ran = threading.Event(), []
+    speculation = Speculation()
+    speculation.launch('spec_parent', lambda: release.wait(2))
+    speculation.launch('spec_child', lambda _: ran.append(1), after='spec_parent')
+    before = outcome_count('spec_child', 'cancelled')
+    speculation.finish()
+    release.set()
+    assert wait_for(lambda: outcome_count('spec_child', 'cancelled') == before + 1)
+    assert ran == []
@@ -0,0 +1,46 @@
+import os
+
+try:
+    import tiktoken
+except ImportError:
+    tiktoken = None
+
+# Token counting and clipping for prompt sections. Uses tiktoken when it is
+# installed and falls back to the usual ~4 characters per token estimate.
+
+DEFAULT_TOKEN_MODEL = os.getenv("TOKEN_COUNT_MODEL", "gpt-4")
+
+_encodings = {}
+
+def _encoding(model: str):
+    if tiktoken is None:
+        return None
+    if model not in _encodings:
+        try:
+            _encodings[model] = tiktoken.encoding_for_model(model)
+        except Exception as e:
+            print(f"[Tokens] No tokenizer for {model}, estimating: {e}")
+            _encodings[model] = None
+    return _encodings[model]
+
+def count_tokens(text: str, model: str = DEFAULT_TOKEN_MODEL) -> int:
+    """Number of tokens `text` takes up in a prompt for `model`."""
+    if not text:
+        return 0
+    encoding = _encoding(model)
+    if encoding is None:
+        return (len(text) + 3) // 4
+    return len(encoding.encode(text))
+
+def clip_to_budget(text: str, budget: int, model: str = DEFAULT_TOKEN_MODEL,
+                   marker: str = "...") -> str:
+    """Cut `text` down to at most `budget` tokens, keeping the start."""
+    if budget <= 0 or not text:
+        return ""
+    if count_tokens(text, model) <= budget:
+        return text
+    encoding = _encoding(model)
+    if encoding is None:
+        return text[:max(0, budget * 4 - len(marker))] + marker
+    marker_tokens = len(encoding.encode(marker))
+    return encoding.decode(encoding.encode(text)[:max(0, budget - marker_tokens)]) + marker
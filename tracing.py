@@ -0,0 +1,136 @@
+import contextvars
+import functools
+import json
+import os
+import time
+import uuid
+from contextlib import contextmanager
+from typing import Dict, List, Any, Optional
+from metrics import metrics
+
+# Lightweight request tracing. Each request gets a trace ID and collects spans
+# (crew kickoffs, session reads/writes, inventory filtering, ...). When the trace
+# ends, every span is recorded in a latency histogram labelled with its stage and
+# the route the request ended up taking, and optionally logged as one JSON line.
+
+TRACE_JSON_LOGS = os.getenv("TRACE_JSON_LOGS", "false").lower() == "true"
+
+stage_latency = metrics.histogram(
+    'dealerbot_stage_latency_ms', 'Latency of each traced stage in milliseconds', ('stage', 'route'))
+stage_errors = metrics.counter(
+    'dealerbot_stage_errors_total', 'Traced stages that raised an exception', ('stage', 'route'))
+
+class Span:
+    __slots__ = ('stage', 'parent', 'start', 'duration_ms', 'error', 'attributes')
+
+    def __init__(self, stage: str, parent: Optional[str], attributes: Dict[str, Any]):
+        self.stage = stage
+        self.parent = parent
+        self.start = time.perf_counter()
+        self.duration_ms = 0.0
+        self.error: Optional[str] = None
+        self.attributes = attributes
+
+class Trace:
+    """Spans of one request plus the route it was handled by."""
+
+    def __init__(self, trace_id: Optional[str] = None, name: str = ''):
+        self.trace_id = trace_id or uuid.uuid4().hex[:16]
+        self.name = name
+        self.route = ''
+        # Decisions made while handling the request (e.g. the LLM's routing label), for logging
+        self.labels: Dict[str, Any] = {}
+        self.start = time.perf_counter()
+        self.spans: List[Span] = []
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'trace_id': self.trace_id,
+            'name': self.name,
+            'route': self.route,
+            'duration_ms': round((time.perf_counter() - self.start) * 1000, 2),
+            'spans': [{
+                'stage': span.stage,
+                'parent': span.parent,
+                'offset_ms': round((span.start - self.start) * 1000, 2),
+                'duration_ms': round(span.duration_ms, 2),
+                **({'error': span.error} if span.error else {}),
+                **span.attributes,
+            } for span in self.spans],
+        }
+
+_current_trace: contextvars.ContextVar[Optional[Trace]] = contextvars.ContextVar('dealerbot_trace', default=None)
+# Innermost open stage; a context variable so stages running in parallel threads get the right parent
+_current_stage: contextvars.ContextVar[Optional[str]] = contextvars.ContextVar('dealerbot_stage', default=None)
+
+def current_trace() -> Optional[Trace]:
+    return _current_trace.get()
+
+def current_trace_id() -> Optional[str]:
+    trace = _current_trace.get()
+    return trace.trace_id if trace else None
+
+def set_route(route: str):
+    """Label the current trace's spans with the route the request took."""
+    trace = _current_trace.get()
+    if trace is not None:
+        trace.route = route
+
+def set_label(name: str, value: Any):
+    """Attach a decision to the current trace, e.g. set_label('route', 'Ford Expert')."""
+    trace = _current_trace.get()
+    if trace is not None:
+        trace.labels[name] = value
+
+def current_labels() -> Dict[str, Any]:
+    trace = _current_trace.get()
+    return dict(trace.labels) if trace else {}
+
+def _record(span: Span, route: str):
+    stage_latency.observe(span.duration_ms, stage=span.stage, route=route)
+    if span.error:
+        stage_errors.inc(stage=span.stage, route=route)
+
+@contextmanager
+def start_trace(name: str = '', trace_id: Optional[str] = None):
+    """Run a request under a new trace; spans are exported when it ends."""
+    trace = Trace(trace_id, name)
+    token = _current_trace.set(trace)
+    try:
+        yield trace
+    finally:
+        _current_trace.reset(token)
+        # The route is only known once routing is done, so spans are recorded at the end
+        for span in trace.spans:
+            _record(span, trace.route)
+        if TRACE_JSON_LOGS:
+            print(json.dumps(trace.to_dict(), ensure_ascii=False, default=str))
+
+@contextmanager
+def span(stage: str, **attributes):
+    """Time one stage of the current request."""
+    trace = _current_trace.get()
+    current = Span(stage, _current_stage.get() if trace else None, attributes)
+    token = _current_stage.set(stage)
+    try:
+        yield current
+    except BaseException as e:
+        current.error = type(e).__name__
+        raise
+    finally:
+        current.duration_ms = (time.perf_counter() - current.start) * 1000
+        _current_stage.reset(token)
+        if trace is not None:
+            trace.spans.append(current)
+        else:
+            _record(current, '')
+
+def traced(stage: str):
+    """Decorator form of span()."""
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with span(stage):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
@@ -0,0 +1,207 @@
+import argparse
+import json
+import random
+import time
+import zlib
+from typing import Dict, List, Any, Optional
+from intent_classifier import (
+    IntentModel, features, softmax, sigmoid, ROUTES, INTENT_HASH_DIM, INTENT_MODEL_PATH,
+    INTENT_ROUTE_THRESHOLD, INTENT_ALL_VEHICLES_THRESHOLD
+)
+
+# Offline pipeline for the local intent classifier:
+#
+#   python train_intent_classifier.py --export routing_labels.jsonl   # messages table -> JSONL
+#   python train_intent_classifier.py --data routing_labels.jsonl     # train, evaluate, write the model
+#
+# Without --data the labels are read straight from the database. Examples are
+# split into train and held-out sets by a hash of the query text, so repeats
+# of the same question never end up on both sides. Both classifiers are
+# logistic regressions (softmax over the six routes, sigmoid for the
+# all-vehicles flag) trained with SGD; the held-out report is written into
+# the model file and printed.
+
+THRESHOLDS = (0.5, 0.7, 0.8, 0.9, 0.95, 0.99)
+# Weights smaller than this are dropped from the model file
+MIN_WEIGHT = 1e-4
+
+def export_labels(path: Optional[str] = None) -> List[Dict[str, Any]]:
+    """Labelled user messages from the database, optionally written to `path` as JSONL."""
+    from database import fetch_routing_labels
+    examples = []
+    seen_sessions = set()
+    for row in fetch_routing_labels():
+        # Same signal the runtime has: whether the session already had a message
+        has_history = row['session_id'] in seen_sessions
+        seen_sessions.add(row['session_id'])
+        if row['route'] is None and row['all_vehicles'] is None:
+            continue
+        examples.append({'query': row['message'], 'has_history': has_history,
+                         'route': row['route'], 'all_vehicles': row['all_vehicles']})
+    if path:
+        with open(path, 'w', encoding='utf-8') as f:
+            for example in examples:
+                f.write(json.dumps(example, ensure_ascii=False) + '\n')
+        print(f"[Intent] Exported {len(examples)} labelled queries to {path}")
+    return examples
+
+def load_examples(path: str) -> List[Dict[str, Any]]:
+    with open(path, 'r', encoding='utf-8') as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+def is_held_out(query: str, holdout: float) -> bool:
+    return zlib.crc32(query.strip().lower().encode('utf-8')) % 1000 < holdout * 1000
+
+def train_route(examples: List[Dict[str, Any]], epochs: int, rate: float, l2: float, seed: int):
+    """Softmax regression over the routes; returns (bias, feature -> weight per route)."""
+    rng = random.Random(seed)
+    index = {route: i for i, route in enumerate(ROUTES)}
+    data = [(features(e['query'], e['has_history']), index[e['route']]) for e in examples]
+    bias = [0.0] * len(ROUTES)
+    weights: Dict[int, List[float]] = {}
+    for epoch in range(epochs):
+        rng.shuffle(data)
+        step = rate / (1 + epoch)
+        for feature_ids, label in data:
+            scores = list(bias)
+            for feature in feature_ids:
+                row = weights.get(feature)
+                if row:
+                    for i, weight in enumerate(row):
+                        scores[i] += weight
+            probabilities = softmax(scores)
+            gradient = [p - (1.0 if i == label else 0.0) for i, p in enumerate(probabilities)]
+            for i, g in enumerate(gradient):
+                bias[i] -= step * g
+            for feature in feature_ids:
+                row = weights.setdefault(feature, [0.0] * len(ROUTES))
+                for i, g in enumerate(gradient):
+                    row[i] -= step * (g + l2 * row[i])
+    return bias, weights
+
+def train_all_vehicles(examples: List[Dict[str, Any]], epochs: int, rate: float, l2: float, seed: int):
+    """Logistic regression for the all-vehicles flag; returns (bias, feature -> weight)."""
+    rng = random.Random(seed)
+    data = [(features(e['query'], e['has_history']), 1.0 if e['all_vehicles'] else 0.0) for e in examples]
+    bias = 0.0
+    weights: Dict[int, float] = {}
+    for epoch in range(epochs):
+        rng.shuffle(data)
+        step = rate / (1 + epoch)
+        for feature_ids, label in data:
+            gradient = sigmoid(bias + sum(weights.get(feature, 0.0) for feature in feature_ids)) - label
+            bias -= step * gradient
+            for feature in feature_ids:
+                weight = weights.get(feature, 0.0)
+                weights[feature] = weight - step * (gradient + l2 * weight)
+    return bias, weights
+
+def _coverage(predictions: List[tuple]) -> Dict[str, Any]:
+    """Share of queries answered locally, and their accuracy, at each confidence threshold."""
+    table = {}
+    for threshold in THRESHOLDS:
+        covered = [correct for correct, confidence in predictions if confidence >= threshold]
+        table[str(threshold)] = {
+            'coverage': round(len(covered) / len(predictions), 4) if predictions else 0.0,
+            'accuracy': round(sum(covered) / len(covered), 4) if covered else None,
+        }
+    return table
+
+def evaluate(model: IntentModel, route_test: List[Dict[str, Any]], flag_test: List[Dict[str, Any]]) -> Dict[str, Any]:
+    report: Dict[str, Any] = {}
+    if route_test:
+        predictions, per_route = [], {route: {'support': 0, 'correct': 0, 'predicted': 0} for route in ROUTES}
+        start = time.perf_counter()
+        for example in route_test:
+            route, confidence = model.predict_route(example['query'], example['has_history'])
+            correct = route == example['route']
+            predictions.append((correct, confidence))
+            per_route[example['route']]['support'] += 1
+            per_route[example['route']]['correct'] += correct
+            per_route[route]['predicted'] += 1
+        elapsed_us = (time.perf_counter() - start) / len(route_test) * 1e6
+        report['route'] = {
+            'held_out': len(route_test),
+            'accuracy': round(sum(correct for correct, _ in predictions) / len(predictions), 4),
+            'per_route': {route: {
+                'support': stats['support'],
+                'recall': round(stats['correct'] / stats['support'], 4) if stats['support'] else None,
+                'precision': round(stats['correct'] / stats['predicted'], 4) if stats['predicted'] else None,
+            } for route, stats in per_route.items()},
+            'by_threshold': _coverage(predictions),
+            'runtime_threshold': INTENT_ROUTE_THRESHOLD,
+            'predict_us': round(elapsed_us, 1),
+        }
+    if flag_test:
+        predictions = []
+        start = time.perf_counter()
+        for example in flag_test:
+            flag, confidence = model.predict_all_vehicles(example['query'], example['has_history'])
+            predictions.append((flag == bool(example['all_vehicles']), confidence))
+        elapsed_us = (time.perf_counter() - start) / len(flag_test) * 1e6
+        report['all_vehicles'] = {
+            'held_out': len(flag_test),
+            'positives': sum(1 for example in flag_test if example['all_vehicles']),
+            'accuracy': round(sum(correct for correct, _ in predictions) / len(predictions), 4),
+            'by_threshold': _coverage(predictions),
+            'runtime_threshold': INTENT_ALL_VEHICLES_THRESHOLD,
+            'predict_us': round(elapsed_us, 1),
+        }
+    return report
+
+def train(examples: List[Dict[str, Any]], holdout: float = 0.2, epochs: int = 15, rate: float = 0.5,
+          l2: float = 1e-5, seed: int = 13) -> IntentModel:
+    """Train both classifiers on the non-held-out examples and attach the held-out report."""
+    for example in examples:
+        if isinstance(example.get('route'), str):
+            example['route'] = example['route'].strip().strip("'\"")
+    routed = [e for e in examples if e.get('route') in ROUTES]
+    flagged = [e for e in examples if e.get('all_vehicles') is not None]
+    route_train = [e for e in routed if not is_held_out(e['query'], holdout)]
+    flag_train = [e for e in flagged if not is_held_out(e['query'], holdout)]
+    if not route_train or not flag_train:
+        raise SystemExit("Need labelled examples for both the routes and the all-vehicles flag to train")
+
+    route_bias, route_weights = train_route(route_train, epochs, rate, l2, seed)
+    flag_bias, flag_weights = train_all_vehicles(flag_train, epochs, rate, l2, seed)
+    model = IntentModel({
+        'dim': INTENT_HASH_DIM,
+        'route': {
+            'labels': list(ROUTES),
+            'bias': [round(value, 5) for value in route_bias],
+            'weights': {feature: [round(w, 5) for w in row] for feature, row in route_weights.items()
+                        if max(abs(w) for w in row) >= MIN_WEIGHT},
+        },
+        'all_vehicles': {
+            'bias': round(flag_bias, 5),
+            'weights': {feature: round(w, 5) for feature, w in flag_weights.items() if abs(w) >= MIN_WEIGHT},
+        },
+    })
+    model.report = {
+        'trained_on': {'route': len(route_train), 'all_vehicles': len(flag_train)},
+        **evaluate(model,
+                   [e for e in routed if is_held_out(e['query'], holdout)],
+                   [e for e in flagged if is_held_out(e['query'], holdout)]),
+    }
+    return model
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Train the local intent classifier from logged routing labels")
+    parser.add_argument("--export", help="Write the labelled queries from the database to this JSONL file and stop")
+    parser.add_argument("--data", help="Train from this JSONL file instead of the database")
+    parser.add_argument("--model", default=INTENT_MODEL_PATH, help="Where to write the trained model")
+    parser.add_argument("--holdout", type=float, default=0.2, help="Fraction of distinct queries held out")
+    parser.add_argument("--epochs", type=int, default=15)
+    parser.add_argument("--rate", type=float, default=0.5)
+    parser.add_argument("--l2", type=float, default=1e-5)
+    args = parser.parse_args()
+
+    if args.export:
+        export_labels(args.export)
+        raise SystemExit(0)
+    examples = load_examples(args.data) if args.data else export_labels()
+    model = train(examples, args.holdout, args.epochs, args.rate, args.l2)
+    with open(args.model, 'w', encoding='utf-8') as f:
+        json.dump(model.to_dict(), f, separators=(',', ':'))
+    print(json.dumps(model.report, indent=2))
+    print(f"[Intent] Wrote {args.model}")
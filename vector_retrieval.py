@@ -0,0 +1,193 @@
+import math
+import os
+import time
+import zlib
+from typing import Dict, List, Optional, Tuple
+from compact_inventory import CompactVehicle
+from inventory_store import InventorySnapshot, inventory_store
+from metrics import metrics
+from search_index import analyze
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+# Local retrieval for Ford Expert questions. Every vehicle in a snapshot gets a
+# hashed TF-IDF vector over its name, specs and feature text (unigrams and
+# bigrams hashed into a fixed number of columns). A question is embedded the
+# same way and its cosine similarity with every vehicle is computed in one
+# vectorized pass over the sparse vectors; the best matching distinct vehicles
+# are put into the prompt as one-line summaries. The vectors are built when a
+# snapshot is loaded, before it is served, like the search and facet indexes.
+# Retrieval is skipped when NumPy is not installed.
+
+RETRIEVAL_HASH_DIM = int(os.getenv("RETRIEVAL_HASH_DIM", str(2 ** 18)))
+RETRIEVAL_TOP_K = int(os.getenv("RETRIEVAL_TOP_K", "5"))
+# Vehicles scoring below this cosine similarity are not worth grounding on
+RETRIEVAL_MIN_SCORE = float(os.getenv("RETRIEVAL_MIN_SCORE", "0.02"))
+# Name and spec terms count more than individual feature terms
+NAME_WEIGHT = 3
+SUMMARY_FEATURES = 4
+
+retrieval_latency = metrics.histogram(
+    'dealerbot_retrieval_latency_ms', 'Vector retrieval latency in milliseconds')
+
+def _terms(text: str) -> List[str]:
+    tokens = analyze(text)
+    return tokens + [f"{a} {b}" for a, b in zip(tokens, tokens[1:])]
+
+def _bucket(term: str, dim: int) -> int:
+    # crc32 is stable across processes, unlike hash()
+    return zlib.crc32(term.encode('utf-8')) % dim
+
+def _vehicle_texts(record: CompactVehicle) -> Tuple[List[str], List[str]]:
+    """(name and spec texts, feature texts) of a vehicle."""
+    names = [str(record.field('vehicle_name', ''))]
+    names += [str(record.field(f'parsed_name[{field}]', '')) for field in ('model', 'trim', 'vehicle_type')]
+    names += [str(record.field(f'specifications[{field}]', '')) for field in ('drive', 'exterior_color')]
+    features = [str(item) for items in (record.field('features') or {}).values() for item in items]
+    return names, features
+
+def summarize_vehicle(record: CompactVehicle, query_terms: Optional[set] = None) -> str:
+    """One-line summary of a vehicle, listing the features that match the question first."""
+    parts = [str(record.field('vehicle_name', 'Unknown vehicle'))]
+    for label, key in (('VIN', 'vin'), ('Price', 'price'), ('Type', 'parsed_name[vehicle_type]'),
+                       ('Drive', 'specifications[drive]'), ('HP', 'specifications[horsepower]'),
+                       ('MPG', 'specifications[epa_range]')):
+        value = record.field(key)
+        if value:
+            parts.append(f"{label}: {value}")
+    features = [str(item) for items in (record.field('features') or {}).values() for item in items]
+    if query_terms:
+        features.sort(key=lambda feature: -len(query_terms.intersection(analyze(feature))))
+    if features:
+        parts.append("Features: " + ", ".join(features[:SUMMARY_FEATURES]))
+    return " | ".join(parts)
+
+class VehicleVectors:
+    """
+    Row-normalized hashed TF-IDF vectors of one snapshot's vehicles, stored
+    sparse and sorted by column so a query only touches the columns it uses.
+    """
+
+    def __init__(self, records: List[CompactVehicle], dim: int = RETRIEVAL_HASH_DIM):
+        start = time.perf_counter()
+        self.records = records
+        self.dim = dim
+        buckets: Dict[str, int] = {}
+        rows, cols, values = [], [], []
+        # Feature strings repeat across vehicles, so each distinct text is hashed once
+        hashed: Dict[str, List[int]] = {}
+
+        def columns(text: str) -> List[int]:
+            cached = hashed.get(text)
+            if cached is None:
+                cached = hashed[text] = [buckets.setdefault(term, _bucket(term, dim)) for term in _terms(text)]
+            return cached
+
+        for row, record in enumerate(records):
+            counts: Dict[int, float] = {}
+            names, features = _vehicle_texts(record)
+            for text, weight in [(text, NAME_WEIGHT) for text in names] + [(text, 1) for text in features]:
+                for column in columns(text):
+                    counts[column] = counts.get(column, 0) + weight
+            rows.extend([row] * len(counts))
+            cols.extend(counts)
+            values.extend(counts.values())
+
+        rows = np.asarray(rows, dtype=np.int32)
+        cols = np.asarray(cols, dtype=np.int64)
+        # Sublinear term frequency times inverse document frequency
+        self.idf = (np.log((1 + len(records)) / (1 + np.bincount(cols, minlength=dim))) + 1).astype(np.float32)
+        values = (1 + np.log(np.asarray(values, dtype=np.float32))) * self.idf[cols]
+        norms = np.sqrt(np.bincount(rows, weights=values * values, minlength=len(records))).astype(np.float32)
+        norms[norms == 0] = 1
+        values /= norms[rows]
+
+        order = np.argsort(cols, kind='stable')
+        self.column_rows = rows[order]
+        self.column_values = values[order].astype(np.float32)
+        self.column_starts = np.searchsorted(cols[order], np.arange(dim + 1))
+        self.build_ms = (time.perf_counter() - start) * 1000
+
+    def embed(self, text: str) -> Optional[Tuple["np.ndarray", "np.ndarray"]]:
+        """(columns, weights) of the normalized query vector; None if no term is known."""
+        counts: Dict[int, int] = {}
+        for term in _terms(text):
+            column = _bucket(term, self.dim)
+            counts[column] = counts.get(column, 0) + 1
+        columns = np.fromiter(counts, dtype=np.int64, count=len(counts))
+        weights = (1 + np.log(np.fromiter(counts.values(), dtype=np.float32, count=len(counts)))) * self.idf[columns]
+        norm = np.linalg.norm(weights)
+        if not norm:
+            return None
+        return columns, weights / norm
+
+    def scores(self, text: str) -> Optional["np.ndarray"]:
+        """Cosine similarity of `text` with every vehicle."""
+        embedded = self.embed(text)
+        if embedded is None:
+            return None
+        columns, weights = embedded
+        starts, ends = self.column_starts[columns], self.column_starts[columns + 1]
+        lengths = ends - starts
+        # Gather the stored entries of every query column in one go
+        positions = np.repeat(starts - np.cumsum(lengths) + lengths, lengths) + np.arange(lengths.sum())
+        return np.bincount(self.column_rows[positions],
+                           weights=self.column_values[positions] * np.repeat(weights, lengths),
+                           minlength=len(self.records))
+
+    def top_k(self, query: str, k: int = RETRIEVAL_TOP_K,
+              min_score: float = RETRIEVAL_MIN_SCORE) -> List[Tuple[CompactVehicle, float]]:
+        """The k best matching vehicles, one per vehicle name, best first."""
+        start = time.perf_counter()
+        scores = self.scores(query) if self.records else None
+        if scores is None:
+            return []
+        # Same-name vehicles score alike, so look past the first k for distinct ones
+        candidates = min(len(scores), k * 20)
+        best = np.argpartition(-scores, candidates - 1)[:candidates]
+        best = best[np.argsort(-scores[best])]
+        results, seen = [], set()
+        for row in best:
+            score = float(scores[row])
+            if score < min_score or len(results) >= k:
+                break
+            record = self.records[row]
+            name = record.field('vehicle_name')
+            if name in seen:
+                continue
+            seen.add(name)
+            results.append((record, score))
+        retrieval_latency.observe((time.perf_counter() - start) * 1000)
+        return results
+
+class VectorIndexes:
+    """Builds the vectors of each snapshot once and keeps them with the snapshot."""
+
+    @staticmethod
+    def _build(snapshot: InventorySnapshot) -> VehicleVectors:
+        vectors = VehicleVectors(snapshot.records)
+        print(f"[Retrieval] Embedded {len(snapshot.records)} vehicles for {snapshot.version} "
+              f"in {vectors.build_ms:.1f}ms")
+        return vectors
+
+    def get(self, snapshot: InventorySnapshot) -> Optional[VehicleVectors]:
+        """The snapshot's vectors; None without NumPy."""
+        if np is None:
+            return None
+        # Snapshots the store loaded are embedded already; others (benchmarks) are embedded here
+        return snapshot.derived('vectors', self._build)
+
+    def ground(self, snapshot: InventorySnapshot, query: str, k: int = RETRIEVAL_TOP_K) -> List[str]:
+        """Summaries of the in-stock vehicles most relevant to `query`; empty without NumPy."""
+        vectors = self.get(snapshot)
+        if vectors is None or k <= 0:
+            return []
+        query_terms = set(analyze(query))
+        return [summarize_vehicle(record, query_terms) for record, _ in vectors.top_k(query, k)]
+
+# Global vector index, built for every snapshot before the API serves it
+vehicle_vectors = VectorIndexes()
+inventory_store.on_load(vehicle_vectors.get)